@@ -5,50 +5,71 @@ import sys
 
 # Добавляем папку с модулями в путь
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'modules'))
+# Общие модули RadioTools
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'common'))
 
-# Проверяем зависимости
-try:
-    from modules.dependencies import check_and_install
-except ImportError:
-    print("Не удалось найти модуль dependencies в папке modules")
-    sys.exit(1)
-
-if not check_and_install():
-    sys.exit(1)
+# Все действия выполняются только при запуске скрипта: процессы пула чтения тегов
+# повторно импортируют этот файл и не должны проверять зависимости и читать конфигурацию
+if __name__ == "__main__":
+    # Проверяем зависимости
+    try:
+        from modules.dependencies import check_and_install
+    except ImportError:
+        print("Не удалось найти модуль dependencies в папке modules")
+        sys.exit(1)
 
-# Загружаем конфигурацию
-try:
-    config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = json.load(f)
-except FileNotFoundError:
-    print("Создайте файл config.json")
-    print("Скопируйте пример из config.example.json")
-    sys.exit(1)
-except json.JSONDecodeError as e:
-    print(f"Ошибка в формате config.json: {e}")
-    sys.exit(1)
+    if not check_and_install():
+        sys.exit(1)
 
-# Запускаем обработку
-try:
-    from modules.unified_processor import UnifiedProcessor
-except ImportError as e:
-    print(f"Ошибка импорта unified_processor: {e}")
-    sys.exit(1)
+    # Загружаем конфигурацию
+    try:
+        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print("Создайте файл config.json")
+        print("Скопируйте пример из config.example.json")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Ошибка в формате config.json: {e}")
+        sys.exit(1)
 
-if __name__ == "__main__":
+    # Запускаем обработку
+    try:
+        from modules.unified_processor import UnifiedProcessor
+    except ImportError as e:
+        print(f"Ошибка импорта unified_processor: {e}")
+        sys.exit(1)
+    
+    processor = None
+    profiler = None
     try:
         print("=" * 60)
         print("Запуск объединенной обработки аудиофайлов...")
         print("=" * 60)
         
         # Определяем режим работы
-        if len(sys.argv) > 1:
+        args = sys.argv[1:]
+        watch_mode = '--watch' in args
+        profile_mode = '--profile' in args
+        args = [arg for arg in args if arg not in ('--watch', '--profile')]
+        
+        if profile_mode:
+            # Профилирование всего запуска (cProfile и tracemalloc), результаты - рядом с отчетом
+            from run_metrics import Profiler
+            profiler = Profiler()
+            profiler.start()
+        
+        if watch_mode:
+            # Режим наблюдения: новые файлы в папке обрабатываются по мере появления
+            print("Режим: наблюдение за папкой из конфигурации")
+            processor = UnifiedProcessor(config)
+            processor.watch()
+        elif args:
             # Режим drag-and-drop: обработка переданных файлов
-            print(f"Режим: обработка {len(sys.argv)-1} переданных файлов")
+            print(f"Режим: обработка {len(args)} переданных файлов")
             files_to_process = []
-            for i in range(1, len(sys.argv)):
-                file_path = sys.argv[i]
+            for file_path in args:
                 if os.path.exists(file_path):
                     files_to_process.append(file_path)
                     print(f"  Добавлен файл: {file_path}")
@@ -60,12 +81,19 @@ if __name__ == "__main__":
                 sys.exit(0)
                 
             processor = UnifiedProcessor(config)
-            processor.run_drag_and_drop(files_to_process)
+            if config.get('pipeline'):
+                processor.run_pipeline(files_to_process)
+            else:
+                processor.run_drag_and_drop(files_to_process)
         else:
             # Режим по умолчанию: сканирование папки
             print("Режим: сканирование папки из конфигурации")
             processor = UnifiedProcessor(config)
-            processor.run()
+            if config.get('pipeline'):
+                # Конвейерный режим: этапы выполняются с перекрытием
+                processor.run_pipeline()
+            else:
+                processor.run()
         
         print("=" * 60)
         print("Обработка завершена")
@@ -77,4 +105,8 @@ if __name__ == "__main__":
         print(f"\nКритическая ошибка: {e}")
         import traceback
         traceback.print_exc()
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        if profiler:
+            profiler.stop()
+            profiler.save(processor.report_base if processor else None)
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+Наблюдение за папкой с музыкой: поиск новых аудиофайлов без полного сканирования
+
+В Linux изменения приходят от inotify (через ctypes, без сторонних пакетов),
+в остальных системах и при ошибке inotify папка периодически пересканируется.
+Файл выдается только после того, как его размер и время изменения не менялись
+settle_seconds секунд, - так недописанные (копируемые, синхронизируемые) файлы
+не попадают в обработку.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from audio_scan import normalize_extensions, scan_audio_files
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+READ_SIZE = 64 * 1024
+
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL = 10.0
+# Сколько дописанные файлы могут ждать, пока допишутся остальные файлы пачки (секунды)
+BATCH_WAIT = 30.0
+
+
+class InotifyBackend:
+    """Изменения в дереве папок через inotify"""
+    name = 'inotify'
+
+    def __init__(self, root: str, extensions: frozenset):
+        """
+        Raises:
+            OSError: если inotify недоступен или не удалось поставить наблюдение
+                     (например, исчерпан fs.inotify.max_user_watches)
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify доступен только в Linux")
+        self.root = root
+        self.extensions = extensions
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self._dirs: Dict[int, str] = {}  # wd -> папка
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                          WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                # Папка исчезла или недоступна - пропускаем только ее
+                return False
+            raise OSError(err, f"inotify_add_watch({directory}): {os.strerror(err)}")
+        self._dirs[wd] = directory
+        return True
+
+    def _watch_tree(self, root: str):
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            if not self._add_watch(directory):
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    stack.extend(entry.path for entry in entries
+                                 if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+    def _scan_new_directory(self, directory: str) -> Set[str]:
+        """Новая (созданная или перенесенная) папка: наблюдение и уже лежащие в ней файлы"""
+        self._watch_tree(directory)
+        # Файлы могли появиться до того, как на папку поставлено наблюдение
+        return {audio_file.path for audio_file in
+                scan_audio_files(directory, self.extensions, workers=1, with_stat=False)}
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Ждет изменений не дольше timeout секунд (None - без ограничения)
+
+        Returns:
+            Пути созданных, измененных или перенесенных в дерево аудиофайлов
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Очередь событий переполнена - часть событий потеряна, пересканируем все
+                    print("Очередь событий inotify переполнена, папка будет пересканирована")
+                    changed |= self._scan_new_directory(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        changed |= self._scan_new_directory(path)
+                elif mask & (IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO):
+                    if os.path.splitext(name)[1].lower() in self.extensions:
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingBackend:
+    """Изменения в дереве папок через периодическое сканирование"""
+    name = 'polling'
+
+    def __init__(self, root: str, extensions: frozenset, interval: float = POLL_INTERVAL):
+        self.root = root
+        self.extensions = extensions
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        return {audio_file.path: (audio_file.size, audio_file.mtime_ns)
+                for audio_file in scan_audio_files(self.root, self.extensions)}
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Ждет очередного сканирования не дольше timeout секунд (None - без ограничения)
+
+        Returns:
+            Пути новых или измененных аудиофайлов
+        """
+        wait = self._next_scan - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(0.0, timeout))
+            return set()
+        if wait > 0:
+            time.sleep(wait)
+
+        snapshot = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = {path for path, signature in snapshot.items()
+                   if self._snapshot.get(path) != signature}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class Debouncer:
+    """Откладывает выдачу файлов, пока они не перестанут меняться"""
+
+    def __init__(self, settle_seconds: float = SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {}  # путь -> (подпись, с какого момента не меняется)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def touch(self, paths: Iterable[str], now: Optional[float] = None):
+        """Отмечает файлы как измененные: отсчет времени для них начинается заново"""
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            signature = self._signature(path)
+            if signature is None:
+                self._pending.pop(path, None)
+            else:
+                self._pending[path] = (signature, now)
+
+    def ready(self, now: Optional[float] = None) -> List[str]:
+        """Забирает файлы, которые не менялись settle_seconds секунд"""
+        now = time.monotonic() if now is None else now
+        result = []
+        for path, (signature, since) in list(self._pending.items()):
+            current = self._signature(path)
+            if current is None:
+                # Файл удален или переименован до того, как был дописан
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_seconds:
+                del self._pending[path]
+                result.append(path)
+        return result
+
+
+class FolderWatcher:
+    def __init__(self, root: str, extensions: Iterable[str], settle_seconds: float = SETTLE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, polling: bool = False):
+        """
+        Args:
+            root: Папка с музыкой
+            extensions: Расширения аудиофайлов
+            settle_seconds: Сколько секунд файл не должен меняться, чтобы считаться дописанным
+            poll_interval: Интервал сканирования папки без inotify (секунды)
+            polling: Не использовать inotify (например, для сетевых папок)
+        """
+        self.root = os.fspath(root)
+        extensions = normalize_extensions(extensions)
+        self.debouncer = Debouncer(settle_seconds)
+        self.backend = None
+        if not polling:
+            try:
+                self.backend = InotifyBackend(self.root, extensions)
+            except (OSError, AttributeError) as e:
+                # AttributeError - в libc нет функций inotify
+                print(f"inotify недоступен ({e}), папка будет сканироваться "
+                      f"каждые {poll_interval:g} с")
+        if self.backend is None:
+            self.backend = PollingBackend(self.root, extensions, poll_interval)
+
+    def iter_batches(self) -> Iterator[List[str]]:
+        """
+        Бесконечно выдает пачки дописанных новых или измененных аудиофайлов
+
+        Файлы, появившиеся одновременно (например, скопированная папка альбома),
+        выдаются одной пачкой.
+        """
+        # Пока есть недописанные файлы, проверяем их чаще, чем раз в settle_seconds
+        check_interval = max(0.1, self.debouncer.settle_seconds / 4)
+        batch = []
+        batch_started = 0.0
+        while True:
+            timeout = check_interval if len(self.debouncer) else None
+            self.debouncer.touch(self.backend.changes(timeout))
+            ready = self.debouncer.ready()
+            if ready and not batch:
+                batch_started = time.monotonic()
+            batch.extend(ready)
+            if batch and (not len(self.debouncer) or time.monotonic() - batch_started >= BATCH_WAIT):
+                yield sorted(set(batch))
+                batch = []
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,9 +1,172 @@
+import json
+import random
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import quote
+from urllib3.exceptions import NewConnectionError
+
+# Коды ответа, по которым считается, что сервер не поддерживает пакетную регистрацию
+BATCH_UNSUPPORTED_STATUSES = {404, 405, 501}
+# Сервер отклонил пакет целиком (например, из-за одной некорректной записи) -
+# треки этого пакета отправляются по одному, следующие пакеты - как обычно
+BATCH_REJECTED_STATUSES = {400, 413, 415}
+# Временные ошибки сервера - запрос повторяется
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Классы результата запроса
+SUCCESS = 'success'
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+
+
+class SendResult(NamedTuple):
+    status: str  # SUCCESS, RETRYABLE (временная ошибка или сбой соединения) или FATAL
+    message: str  # Ответ сервера или описание ошибки
+    
+    @property
+    def ok(self) -> bool:
+        return self.status == SUCCESS
+    
+    def __str__(self):
+        return self.message
+
+
+def _classify_text(text: str) -> SendResult:
+    """Класс ответа с кодом 200: об отказе сервер сообщает текстом со словом Error (как и прежде)"""
+    if "Error" in text:
+        return SendResult(FATAL, text)
+    return SendResult(SUCCESS, text)
+
+
+def _not_sent(error: requests.exceptions.RequestException) -> bool:
+    """Запрос точно не дошел до сервера: соединение не было установлено"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def classify_response(response: requests.Response) -> SendResult:
+    """Определяет класс ответа сервера: успех, временная ошибка или окончательная ошибка"""
+    if response.status_code == 200:
+        return _classify_text(response.text)
+    if response.status_code in RETRYABLE_STATUSES:
+        return SendResult(RETRYABLE, f"HTTP Error: {response.status_code}")
+    return SendResult(FATAL, f"HTTP Error: {response.status_code}")
+
 
 class HttpClient:
+    # Страницы, для которых пакетная регистрация не поддерживается (запоминается на время запуска)
+    _batch_unsupported = set()
+    
+    # Параметры повторов (задаются через configure)
+    max_retries = 3
+    backoff_base = 0.5
+    backoff_max = 30.0
+    
+    _session = None
+    _session_lock = threading.Lock()
+    
+    # Наблюдатель попыток запросов (для метрик), см. observe
+    _observer = None
+
+    @staticmethod
+    def configure(max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        """
+        Настраивает повторы запросов
+        
+        Args:
+            max_retries: Количество повторов при временных ошибках (max_retries из config.json)
+            backoff_base: Пауза перед первым повтором (секунды), далее удваивается
+            backoff_max: Максимальная пауза между повторами (секунды)
+        """
+        HttpClient.max_retries = max(0, int(max_retries))
+        HttpClient.backoff_base = backoff_base
+        HttpClient.backoff_max = backoff_max
+
+    @staticmethod
+    def observe(observer: Optional[Callable[[str, str, Optional[int], float], None]]):
+        """
+        Задает функцию, вызываемую после каждой попытки запроса
+        
+        Args:
+            observer: observer(method, url, код ответа или None при ошибке соединения,
+                      время до получения заголовков ответа в секундах); None - отключить
+        """
+        HttpClient._observer = observer
+
+    @staticmethod
+    def get_session() -> requests.Session:
+        """Общая сессия с пулом keep-alive соединений"""
+        with HttpClient._session_lock:
+            if HttpClient._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                HttpClient._session = session
+            return HttpClient._session
+
     @staticmethod
-    def send_data(page: str, key: str, params: dict) -> str:
+    def _backoff_delay(attempt: int) -> float:
+        """Экспоненциальная пауза со случайным разбросом (чтобы повторы не шли одновременно)"""
+        delay = min(HttpClient.backoff_max, HttpClient.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def request(method: str, url: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        """
+        Выполняет запрос через общую сессию с повторами временных ошибок
+        
+        Идемпотентные запросы повторяются при ошибках соединения, таймаутах и ответах
+        с кодами RETRYABLE_STATUSES. Регистрация трека не идемпотентна: если запрос
+        дошел до сервера (таймаут ответа, обрыв соединения, ответ 5xx), трек мог уже
+        быть добавлен, и повтор зарегистрировал бы его дважды. Такие запросы
+        повторяются, только если соединение не было установлено.
+        
+        Args:
+            idempotent: Можно ли повторять запрос, который мог дойти до сервера
+        
+        Returns:
+            Последний полученный ответ (для неидемпотентного запроса - первый)
+        
+        Raises:
+            requests.exceptions.RequestException: если ответ так и не был получен
+        """
+        session = HttpClient.get_session()
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+                HttpClient._notify(method, url, response.status_code, started)
+                if (not idempotent or response.status_code not in RETRYABLE_STATUSES
+                        or attempt >= HttpClient.max_retries):
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                HttpClient._notify(method, url, None, started)
+                if attempt >= HttpClient.max_retries or not (idempotent or _not_sent(e)):
+                    raise
+                reason = type(e).__name__
+            
+            delay = HttpClient._backoff_delay(attempt)
+            attempt += 1
+            print(f"  Повтор запроса через {delay:.1f} с ({reason}), попытка {attempt} из {HttpClient.max_retries}")
+            time.sleep(delay)
+
+    @staticmethod
+    def _notify(method: str, url: str, status: Optional[int], started: float):
+        observer = HttpClient._observer
+        if observer is not None:
+            observer(method, url, status, time.perf_counter() - started)
+
+    @staticmethod
+    def send_data(page: str, key: str, params: dict) -> SendResult:
         """Отправка GET-запроса на сервер"""
         try:
             # Формируем параметры URL
@@ -13,12 +176,108 @@ class HttpClient:
             
             # Отправляем запрос
             url = f"{page}?{url_params}"
-            response = requests.get(url, timeout=30)
+            response = HttpClient.request('GET', url, idempotent=False, timeout=30)
             
-            if response.status_code == 200:
-                return response.text
-            else:
-                return f"HTTP Error: {response.status_code}"
+            return classify_response(response)
                 
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            return SendResult(RETRYABLE, f"Request Error: {str(e)}")
         except requests.exceptions.RequestException as e:
-            return f"Request Error: {str(e)}"
\ No newline at end of file
+            return SendResult(FATAL, f"Request Error: {str(e)}")
+
+    @staticmethod
+    def _parse_batch_item(item) -> SendResult:
+        """Приводит результат одного трека из пакетного ответа к SendResult"""
+        if isinstance(item, dict):
+            message = str(item.get('message') or item.get('result') or '')
+            if item.get('error'):
+                return SendResult(FATAL, f"Batch Error: {item['error']}")
+            if str(item.get('status', 'ok')).lower() not in ('ok', 'success', 'added', 'exists'):
+                return SendResult(FATAL, f"Batch Error: {message or item.get('status')}")
+            return SendResult(SUCCESS, message or "OK")
+        return _classify_text(str(item))
+
+    @staticmethod
+    def _post_batch(page: str, key: str, records: List[dict]) -> Optional[List[SendResult]]:
+        """
+        Отправляет один пакет треков
+        
+        Returns:
+            Результаты по каждому треку, пустой список, если сервер отклонил этот пакет
+            (его треки нужно отправить по одному), или None, если сервер не поддерживает пакеты
+        """
+        try:
+            response = HttpClient.request(
+                'POST',
+                f"{page}?key={quote(key)}",
+                data=json.dumps(records, ensure_ascii=False).encode('utf-8'),
+                headers={'Content-Type': 'application/json; charset=utf-8'},
+                idempotent=False,
+                timeout=60
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            return [SendResult(RETRYABLE, f"Request Error: {str(e)}")] * len(records)
+        except requests.exceptions.RequestException as e:
+            return [SendResult(FATAL, f"Request Error: {str(e)}")] * len(records)
+        
+        if response.status_code in BATCH_UNSUPPORTED_STATUSES:
+            return None
+        if response.status_code in BATCH_REJECTED_STATUSES:
+            return []
+        if response.status_code != 200:
+            return [classify_response(response)] * len(records)
+        
+        try:
+            items = response.json()
+        except ValueError:
+            # Старый обработчик ответил текстом - пакеты не поддерживаются
+            return None
+        if isinstance(items, dict):
+            items = items.get('results')
+        if not isinstance(items, list) or len(items) != len(records):
+            return None
+        return [HttpClient._parse_batch_item(item) for item in items]
+
+    @staticmethod
+    def send_batch(page: str, key: str, records: List[dict], batch_size: int = 50,
+                   fallback_delay: float = 0.5) -> List[SendResult]:
+        """
+        Регистрирует треки пакетами: POST с JSON-массивом записей
+        
+        Если сервер не поддерживает пакеты (или batch_size <= 1), треки
+        отправляются по одному GET-запросом через send_data. Если сервер
+        отклонил один пакет (BATCH_REJECTED_STATUSES), по одному отправляются
+        только треки этого пакета.
+        
+        Args:
+            page: Адрес страницы регистрации
+            key: Ключ доступа
+            records: Записи треков (artist, title, link, file_path)
+            batch_size: Количество треков в одном запросе
+            fallback_delay: Пауза между одиночными запросами (секунды)
+        
+        Returns:
+            Результат для каждого трека в исходном порядке
+        """
+        results = []
+        for start in range(0, len(records), max(1, batch_size)):
+            chunk = records[start:start + max(1, batch_size)]
+            
+            chunk_results = None
+            if batch_size > 1 and page not in HttpClient._batch_unsupported:
+                chunk_results = HttpClient._post_batch(page, key, chunk)
+                if chunk_results is None:
+                    print("  Сервер не поддерживает пакетную регистрацию, треки отправляются по одному")
+                    HttpClient._batch_unsupported.add(page)
+                elif not chunk_results:
+                    print("  Сервер отклонил пакет, его треки отправляются по одному")
+            
+            if not chunk_results:
+                chunk_results = []
+                for i, params in enumerate(chunk):
+                    if i or results:
+                        time.sleep(fallback_delay)
+                    chunk_results.append(HttpClient.send_data(page, key, params))
+            
+            results.extend(chunk_results)
+        return results
@@ -0,0 +1,125 @@
+"""
+Потоковый разбор JSON-ответов
+
+Ответ читается блоками, а элементы массива разбираются по одному через
+json.JSONDecoder.raw_decode. В памяти одновременно находятся только текущий
+блок и текущий элемент, а не весь ответ и не весь список объектов.
+"""
+import codecs
+import json
+from typing import Iterable, Iterator, Optional
+
+WHITESPACE = ' \t\n\r'
+# Символы, которыми может продолжаться число (1700000000. + 125, 1e + 5)
+NUMBER_CONTINUATION = frozenset('0123456789.eE+-')
+# Размер разобранной части буфера, после которого она отбрасывается
+COMPACT_THRESHOLD = 64 * 1024
+
+
+class JsonStream:
+    def __init__(self, chunks: Iterable[bytes], encoding: str = 'utf-8'):
+        """
+        Args:
+            chunks: Блоки тела ответа (например, response.iter_content())
+            encoding: Кодировка тела ответа
+        """
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    # --- Чтение буфера ---
+
+    def _fill(self) -> bool:
+        """Дочитывает следующий блок; возвращает False в конце потока"""
+        if self._eof:
+            return False
+        if self._pos > COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def peek(self) -> Optional[str]:
+        """Следующий значимый символ (без пробелов) или None в конце потока"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                # Первый символ файла может быть BOM
+                if self._buffer[self._pos] == '\ufeff':
+                    self._pos += 1
+                    continue
+                return self._buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Ожидался символ {char!r}", self._buffer, self._pos)
+        self._pos += 1
+
+    def value(self):
+        """Разбирает следующее значение целиком"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                # Число в конце буфера или перед "." / "e" может продолжаться в следующем блоке
+                if self._eof or (end < len(self._buffer) and not (
+                        isinstance(value, (int, float)) and self._buffer[end] in NUMBER_CONTINUATION)):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    # --- Массивы и объекты ---
+
+    def iter_array(self) -> Iterator:
+        """Перебирает элементы массива, разбирая их по одному"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise json.JSONDecodeError("Ожидался символ ',' или ']'", self._buffer, self._pos - 1)
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Перебирает ключи объекта
+
+        После получения ключа вызывающий код должен прочитать его значение
+        (value() или iter_array()), прежде чем запрашивать следующий ключ.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Ключ объекта должен быть строкой", self._buffer, self._pos)
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise json.JSONDecodeError("Ожидался символ ',' или '}'", self._buffer, self._pos - 1)
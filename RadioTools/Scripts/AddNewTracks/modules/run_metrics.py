@@ -0,0 +1,205 @@
+"""
+Метрики выполнения: время и количество элементов по фазам, задержки HTTP-запросов
+
+Фазы записываются через контекстный менеджер phase(), повторяющиеся части
+фаз (например, ожидание тегов внутри цикла отправки) - через add().
+Все методы можно вызывать из нескольких потоков.
+
+Profiler (--profile) записывает профиль cProfile и распределение памяти
+tracemalloc за весь запуск.
+"""
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Процентиль отсортированного списка (линейная интерполяция)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class PhaseRecord:
+    """Запись фазы; items можно задать внутри блока phase()"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.elapsed = 0.0
+        self.items = 0
+        self.calls = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'seconds': round(self.elapsed, 6),
+            'items': self.items,
+            'calls': self.calls,
+            'items_per_second': round(self.items / self.elapsed, 1) if self.elapsed > 0 and self.items else None,
+        }
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._phases: Dict[str, PhaseRecord] = {}  # в порядке первого появления
+        self._requests: Dict[str, List[float]] = {}  # "METHOD путь" -> задержки (секунды)
+        self._request_statuses: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, name: str) -> PhaseRecord:
+        with self._lock:
+            record = self._phases.get(name)
+            if record is None:
+                record = self._phases[name] = PhaseRecord(name)
+            return record
+
+    @contextmanager
+    def phase(self, name: str, items: int = 0) -> Iterator[PhaseRecord]:
+        """
+        Замеряет время блока как фазу name
+
+        Количество обработанных элементов передается в items или задается
+        внутри блока: with metrics.phase('scan') as phase: phase.items = ...
+        """
+        current = PhaseRecord(name)
+        current.items = items
+        started = time.perf_counter()
+        try:
+            yield current
+        finally:
+            self.add(name, time.perf_counter() - started, current.items)
+
+    def add(self, name: str, elapsed: float, items: int = 0):
+        """Добавляет время и элементы к фазе name (накапливается при повторных вызовах)"""
+        record = self._record(name)
+        with self._lock:
+            record.elapsed += elapsed
+            record.items += items
+            record.calls += 1
+
+    def record_request(self, method: str, url: str, status: Optional[int], elapsed: float):
+        """Записывает одну попытку HTTP-запроса (status None - ошибка соединения)"""
+        path = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1] or '/'
+        key = f"{method} {path}"
+        with self._lock:
+            self._requests.setdefault(key, []).append(elapsed)
+            statuses = self._request_statuses.setdefault(key, {})
+            label = str(status) if status is not None else 'error'
+            statuses[label] = statuses.get(label, 0) + 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = {name: record.to_dict() for name, record in self._phases.items()}
+            requests = {}
+            for key, latencies in self._requests.items():
+                ordered = sorted(latencies)
+                summary = {
+                    'count': len(ordered),
+                    'total_seconds': round(sum(ordered), 6),
+                    'statuses': dict(self._request_statuses[key]),
+                    'max_ms': round(ordered[-1] * 1000, 2),
+                }
+                for pct in PERCENTILES:
+                    summary[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 2)
+                requests[key] = summary
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': round(time.time() - self.started, 3),
+            'phases': phases,
+            'http': requests,
+        }
+
+    def print_summary(self):
+        """Выводит таблицу фаз и задержек запросов"""
+        data = self.to_dict()
+        print(f"\nВремя выполнения по фазам (всего {data['wall_seconds']:.2f} с):")
+        for name, phase in data['phases'].items():
+            rate = f", {phase['items_per_second']:.0f}/с" if phase['items_per_second'] else ""
+            items = f"  элементов: {phase['items']}{rate}" if phase['items'] else ""
+            print(f"  {name:<28} {phase['seconds']:9.3f} с{items}")
+        if data['http']:
+            print("HTTP-запросы (задержка до заголовков ответа):")
+            for key, summary in data['http'].items():
+                print(f"  {key:<28} {summary['count']:6d} шт.  p50 {summary['p50_ms']:.1f} мс, "
+                      f"p95 {summary['p95_ms']:.1f} мс, p99 {summary['p99_ms']:.1f} мс, "
+                      f"max {summary['max_ms']:.1f} мс")
+
+    def save(self, path: str, extra: Optional[dict] = None):
+        """Сохраняет метрики (и дополнительные сведения отчета) в JSON"""
+        data = dict(extra or {})
+        data['metrics'] = self.to_dict()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class Profiler:
+    """cProfile и tracemalloc на время всего запуска"""
+
+    def __init__(self, top: int = 40):
+        """
+        Args:
+            top: Сколько строк выводить в текстовых сводках
+        """
+        self.top = top
+        self._profile = cProfile.Profile()
+        self._snapshot = None
+        self._peak = 0
+
+    def start(self):
+        tracemalloc.start()
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+        self._snapshot = tracemalloc.take_snapshot()
+        _, self._peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    def save(self, base: Optional[str] = None) -> List[str]:
+        """
+        Сохраняет результаты профилирования
+
+        Профилируется только основной поток: время фоновых потоков и процессов
+        чтения тегов видно в профиле как ожидание (см. метрики фаз в отчете).
+
+        Args:
+            base: Имя файлов без расширения (по умолчанию - по текущему времени)
+
+        Returns:
+            Пути сохраненных файлов: .prof (для pstats/snakeviz), _profile.txt, _memory.txt
+        """
+        base = base or f"unified_processor_report_{time.strftime('%Y%m%d_%H%M%S')}"
+        prof_file = f"{base}.prof"
+        self._profile.dump_stats(prof_file)
+
+        profile_file = f"{base}_profile.txt"
+        text = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=text)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        stats.sort_stats('tottime').print_stats(self.top)
+        with open(profile_file, 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+
+        memory_file = f"{base}_memory.txt"
+        with open(memory_file, 'w', encoding='utf-8') as f:
+            f.write(f"Пик памяти (tracemalloc): {self._peak / 1024 / 1024:.1f} МБ\n\n")
+            f.write(f"Крупнейшие выделения памяти, оставшиеся к концу запуска (по строкам кода):\n")
+            if self._snapshot is not None:
+                for stat in self._snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"  {stat}\n")
+
+        paths = [prof_file, profile_file, memory_file]
+        print(f"Профиль сохранен в: {', '.join(paths)}")
+        return paths
@@ -0,0 +1,206 @@
+"""
+Локальный снимок каталога треков сервера (get-alltracks)
+
+Снимок хранится в папке кэша и при запуске обновляется:
+  - запросом изменений с курсора (since=...), если сервер отдает изменения
+    в виде {"tracks": [...], "cursor": "..."};
+  - иначе условным запросом (If-None-Match / If-Modified-Since): если каталог
+    не изменился, сервер отвечает 304 без тела.
+Если сервер не поддерживает ни того, ни другого, каталог загружается целиком,
+как раньше.
+"""
+import json
+import os
+from typing import Iterator, Optional, Set, Tuple
+
+from cache_utils import get_cache_path
+from http_client import HttpClient
+from json_stream import JsonStream
+
+SNAPSHOT_VERSION = 1
+READ_CHUNK_SIZE = 64 * 1024
+
+# Ответы на since=..., по которым считается, что сервер не поддерживает запрос изменений
+DELTA_UNSUPPORTED_STATUSES = {400, 404, 405, 422, 501}
+
+
+def normalize_server_path(path: str) -> str:
+    """Нормализует путь из БД сервера для сравнения"""
+    return path.replace('\\', '/').strip()
+
+
+class ServerCatalog:
+    def __init__(self, url: str, snapshot_path: Optional[str] = None, timeout: float = 30):
+        """
+        Args:
+            url: Адрес get-alltracks
+            snapshot_path: Путь к файлу снимка (по умолчанию - в папке кэша)
+            timeout: Таймаут запроса (секунды)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.snapshot_path = snapshot_path or get_cache_path('server_catalog', url, '.json')
+        self.paths: Set[str] = set()
+        self.etag = None
+        self.last_modified = None
+        self.cursor = None
+        self.delta_supported = None  # None - еще не известно
+        self.mode = None  # Как был обновлен каталог: 'delta', 'not-modified' или 'full'
+        self.bytes_received = 0
+        self._load_snapshot()
+
+    # --- Снимок ---
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('url') != self.url:
+            return
+        self.paths = set(snapshot.get('paths', []))
+        self.etag = snapshot.get('etag')
+        self.last_modified = snapshot.get('last_modified')
+        self.cursor = snapshot.get('cursor')
+        self.delta_supported = snapshot.get('delta_supported')
+
+    def _save_snapshot(self):
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'cursor': self.cursor,
+            'delta_supported': self.delta_supported,
+            'paths': sorted(self.paths),
+        }
+        temp_path = self.snapshot_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Не удалось сохранить снимок каталога сервера: {e}")
+
+    def reset(self):
+        """Забывает снимок: следующая синхронизация загрузит каталог целиком"""
+        self.paths = set()
+        self.etag = None
+        self.last_modified = None
+        self.cursor = None
+
+    # --- Синхронизация ---
+
+    def sync(self, full: bool = False) -> Set[str]:
+        """
+        Обновляет каталог с сервера
+
+        Args:
+            full: Загрузить каталог целиком, не используя снимок
+
+        Returns:
+            Множество нормализованных путей треков на сервере
+
+        Raises:
+            RuntimeError: при ошибке ответа сервера
+            requests.exceptions.RequestException: при ошибке соединения
+        """
+        if full:
+            self.reset()
+
+        response = None
+        if self.delta_supported is not False:
+            response = self._request({'since': self.cursor or '0'})
+            if response.status_code in DELTA_UNSUPPORTED_STATUSES:
+                self.delta_supported = False
+                response = None
+
+        if response is None:
+            response = self._request()
+
+        if response.status_code == 304:
+            self.mode = 'not-modified'
+        elif response.status_code == 200:
+            self._apply(response)
+        else:
+            raise RuntimeError(f"HTTP ошибка {response.status_code}: {response.text}")
+
+        self.etag = response.headers.get('ETag', self.etag)
+        self.last_modified = response.headers.get('Last-Modified', self.last_modified)
+        self._save_snapshot()
+        return self.paths
+
+    def _request(self, params: Optional[dict] = None):
+        headers = {}
+        # Условный запрос имеет смысл, только если есть снимок, к которому он относится
+        if self.paths or self.cursor:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+        return HttpClient.request('GET', self.url, params=params, headers=headers,
+                                  timeout=self.timeout, stream=True)
+
+    def _apply(self, response):
+        """Применяет ответ 200: изменения с курсора или полный список"""
+        paths, cursor, is_delta = self._parse(response)
+
+        if is_delta and self.cursor:
+            # Изменения с сохраненного курсора
+            self.paths.update(paths)
+            self.mode = 'delta'
+        else:
+            self.paths = paths
+            self.mode = 'full'
+
+        if is_delta:
+            self.delta_supported = True
+            self.cursor = cursor
+        else:
+            # Сервер не понял since= и вернул весь каталог
+            self.delta_supported = False
+            self.cursor = None
+
+    def _parse(self, response) -> Tuple[Set[str], Optional[str], bool]:
+        """
+        Разбирает ответ сервера потоково: из записей треков сохраняются только пути
+
+        Returns:
+            (пути треков, новый курсор, является ли ответ ответом на запрос изменений)
+        """
+        # JSON всегда в UTF-8 (RFC 8259), даже если сервер не указал charset
+        stream = JsonStream(self._iter_body(response))
+        paths = set()
+
+        first = stream.peek()
+        if first == '[':
+            self._collect_paths(stream, paths)
+            return paths, None, False
+
+        if first == '{':
+            cursor = None
+            has_tracks = False
+            for key in stream.iter_object():
+                if key == 'tracks' and stream.peek() == '[':
+                    self._collect_paths(stream, paths)
+                    has_tracks = True
+                else:
+                    value = stream.value()
+                    if key == 'cursor':
+                        cursor = value
+            if has_tracks and cursor is not None:
+                return paths, str(cursor), True
+
+        raise RuntimeError("Некорректный ответ от сервера: ожидался список треков")
+
+    @staticmethod
+    def _collect_paths(stream: JsonStream, paths: Set[str]):
+        for track in stream.iter_array():
+            if isinstance(track, dict) and track.get('file_path'):
+                paths.add(normalize_server_path(track['file_path']))
+
+    def _iter_body(self, response) -> Iterator[bytes]:
+        for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+            self.bytes_received += len(chunk)
+            yield chunk
@@ -0,0 +1,193 @@
+"""
+Локальный сервер-заглушка для проверки отправки треков без настоящего сервера
+
+Повторяет обработчики радио-сервера:
+  GET  /add-newtrack?key=...&artist=...&title=...&link=...&file_path=...  - регистрация одного трека
+  POST /add-newtrack?key=...  (JSON-массив записей)                         - пакетная регистрация
+  GET  /get-alltracks                                                       - список треков в БД (с ETag)
+  GET  /get-alltracks?since=курсор                                          - треки, добавленные после курсора
+
+Запуск:
+  python stub_server.py [--port=8765] [--key=test] [--no-batch] [--no-delta] [--no-etag]
+
+В config.json укажите:
+  "page": "http://127.0.0.1:8765/add-newtrack",
+  "server_tracks_url": "http://127.0.0.1:8765/get-alltracks"
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TRACK_FIELDS = ('artist', 'title', 'link', 'file_path')
+
+
+class StubState:
+    def __init__(self, key: str = 'test', batch: bool = True, delta: bool = True, etag: bool = True):
+        self.key = key
+        self.batch = batch  # Поддерживается ли пакетная регистрация
+        self.delta = delta  # Поддерживается ли запрос изменений since=
+        self.etag = etag  # Отдается ли ETag и поддерживается ли If-None-Match
+        self.lock = threading.Lock()
+        self.tracks = []
+        self.paths = set()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def add_track(self, record: dict) -> dict:
+        """Регистрирует трек; возвращает результат для ответа"""
+        missing = [field for field in TRACK_FIELDS if not record.get(field)]
+        if missing:
+            return {'status': 'error', 'message': f"Missing fields: {', '.join(missing)}"}
+        with self.lock:
+            if record['file_path'] in self.paths:
+                return {'status': 'exists', 'message': 'Track already exists'}
+            self.paths.add(record['file_path'])
+            self.tracks.append({field: record[field] for field in TRACK_FIELDS})
+        return {'status': 'ok', 'message': 'Track added'}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, content_type: str = 'application/json', headers: dict = None):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.state.lock:
+            self.state.bytes_sent += len(body)
+
+    def _send_tracks(self, query: dict):
+        with self.state.lock:
+            tracks = list(self.state.tracks)
+        # Треки только добавляются, поэтому их количество служит и курсором, и версией каталога
+        version = str(len(tracks))
+        headers = {'ETag': f'"{version}"'} if self.state.etag else {}
+
+        if self.state.etag and self.headers.get('If-None-Match') == f'"{version}"':
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        if self.state.delta and 'since' in query:
+            try:
+                since = int(query['since'][0] or 0)
+            except ValueError:
+                self._send(400, 'Error: invalid cursor', 'text/plain')
+                return
+            self._send(200, {'tracks': tracks[since:], 'cursor': version}, headers=headers)
+        else:
+            self._send(200, tracks, headers=headers)
+
+    def _check_key(self, query: dict) -> bool:
+        if query.get('key', [''])[0] != self.state.key:
+            self._send(403, 'Error: invalid key', 'text/plain')
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with self.state.lock:
+            self.state.requests += 1
+
+        if url.path.endswith('/get-alltracks'):
+            self._send_tracks(query)
+        elif url.path.endswith('/add-newtrack'):
+            if not self._check_key(query):
+                return
+            record = {field: query.get(field, [''])[0] for field in TRACK_FIELDS}
+            result = self.state.add_track(record)
+            if result['status'] == 'error':
+                self._send(200, f"Error: {result['message']}", 'text/plain')
+            else:
+                self._send(200, result['message'], 'text/plain')
+        else:
+            self._send(404, 'Not found', 'text/plain')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with self.state.lock:
+            self.state.requests += 1
+
+        if not url.path.endswith('/add-newtrack') or not self.state.batch:
+            self._send(405, 'Method not allowed', 'text/plain')
+            return
+        if not self._check_key(query):
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            records = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            self._send(400, 'Error: invalid JSON', 'text/plain')
+            return
+        if not isinstance(records, list):
+            self._send(400, 'Error: expected JSON array', 'text/plain')
+            return
+        self._send(200, [self.state.add_track(record) for record in records])
+
+
+def start_server(port: int = 0, key: str = 'test', batch: bool = True, delta: bool = True,
+                 etag: bool = True):
+    """
+    Запускает сервер-заглушку в фоновом потоке
+
+    Returns:
+        (сервер, состояние); адрес - server.server_address, остановка - server.shutdown()
+    """
+    state = StubState(key, batch, delta, etag)
+    handler = type('BoundStubHandler', (StubHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    port = 8765
+    key = 'test'
+    batch = True
+    delta = True
+    etag = True
+    for arg in sys.argv[1:]:
+        if arg.startswith('--port='):
+            port = int(arg.split('=', 1)[1])
+        elif arg.startswith('--key='):
+            key = arg.split('=', 1)[1]
+        elif arg == '--no-batch':
+            batch = False
+        elif arg == '--no-delta':
+            delta = False
+        elif arg == '--no-etag':
+            etag = False
+
+    server, state = start_server(port, key, batch, delta, etag)
+    host, port = server.server_address
+    print(f"Сервер-заглушка: http://{host}:{port}/add-newtrack (ключ: {key}, "
+          f"пакетная регистрация: {'да' if batch else 'нет'}, "
+          f"изменения since=: {'да' if delta else 'нет'}, ETag: {'да' if etag else 'нет'})")
+    print("Остановка - Ctrl+C")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\nЗапросов: {state.requests}, треков зарегистрировано: {len(state.tracks)}, "
+              f"отправлено байт: {state.bytes_sent}")
+
+
+if __name__ == "__main__":
+    main()
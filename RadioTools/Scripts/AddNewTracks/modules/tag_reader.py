@@ -1,8 +1,11 @@
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple
 import taglib
 
+from tag_cache import TagCache
+
 class Tag:
     def __init__(self, artist: str, title: str):
         self.artist = artist
@@ -11,10 +14,15 @@ class Tag:
     def __str__(self):
         return f"{self.artist} - {self.title}"
 
-def get_audio_tag(song_path: str) -> Optional[Tag]:
-    """Извлечение тегов из аудиофайла"""
+def _read_tag(song_path: str) -> Tuple[Optional[Tag], bool]:
+    """
+    Читает теги файла через taglib
+
+    Returns:
+        (тег, прочитан ли тег из файла); при ошибке - тег с именем файла и False
+    """
     if not os.path.exists(song_path):
-        return None
+        return None, False
     
     try:
         audio = taglib.File(song_path)
@@ -36,8 +44,81 @@ def get_audio_tag(song_path: str) -> Optional[Tag]:
             title = Path(song_path).stem
         
         audio.close()
-        return Tag(artist, title)
+        return Tag(artist, title), True
         
     except Exception:
         # При ошибке возвращаем тег с именем файла
-        return Tag("Unknown", Path(song_path).stem)
\ No newline at end of file
+        return Tag("Unknown", Path(song_path).stem), False
+
+def _cached_tag(cache: Optional[TagCache], song_path: str) -> Tuple[Optional[Tag], Optional[Tuple[int, int]]]:
+    """Ищет тег в кэше; возвращает (тег или None, размер и время изменения файла)"""
+    if cache is None:
+        return None, None
+    file_stat = TagCache.stat(song_path)
+    if file_stat is None:
+        return None, None
+    cached = cache.get(song_path, *file_stat)
+    return (Tag(*cached) if cached else None), file_stat
+
+def get_audio_tag(song_path: str, cache: Optional[TagCache] = None) -> Optional[Tag]:
+    """Извлечение тегов из аудиофайла (с кэшем тегов, если он передан)"""
+    tag, file_stat = _cached_tag(cache, song_path)
+    if tag:
+        return tag
+    
+    tag, from_file = _read_tag(song_path)
+    if from_file and file_stat:
+        cache.put(song_path, *file_stat, tag.artist, tag.title)
+    return tag
+
+def iter_audio_tags(song_paths: Iterable[str], workers: Optional[int] = None,
+                    cache: Optional[TagCache] = None) -> Iterator[Tuple[str, Optional[Tag]]]:
+    """
+    Извлекает теги нескольких файлов в пуле процессов
+
+    Пары (путь, тег) выдаются по мере готовности, а не в исходном порядке.
+    Если чтение файла завершилось ошибкой, возвращается тег с именем файла.
+    Теги неизмененных файлов берутся из кэша без открытия файла.
+
+    Args:
+        song_paths: Пути к аудиофайлам
+        workers: Количество процессов (по умолчанию - число ядер, 1 - без пула)
+        cache: Кэш тегов
+    """
+    pending = []
+    file_stats = {}
+    for song_path in song_paths:
+        tag, file_stat = _cached_tag(cache, song_path)
+        if tag:
+            yield song_path, tag
+            continue
+        pending.append(song_path)
+        if file_stat:
+            file_stats[song_path] = file_stat
+
+    def store(song_path: str, tag: Optional[Tag], from_file: bool):
+        if from_file and song_path in file_stats:
+            cache.put(song_path, *file_stats[song_path], tag.artist, tag.title)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pending))
+
+    if workers <= 1:
+        for song_path in pending:
+            tag, from_file = _read_tag(song_path)
+            store(song_path, tag, from_file)
+            yield song_path, tag
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_read_tag, song_path): song_path for song_path in pending}
+        for future in as_completed(futures):
+            song_path = futures[future]
+            try:
+                tag, from_file = future.result()
+            except Exception:
+                # Процесс упал или результат не передался - как при ошибке чтения тегов
+                tag, from_file = Tag("Unknown", Path(song_path).stem), False
+            store(song_path, tag, from_file)
+            yield song_path, tag
@@ -1,17 +1,29 @@
 """
 Объединенный процессор для работы с плейлистом и сервером
 """
+import asyncio
 import os
-import re
+import sqlite3
+import threading
 import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set, Dict, Optional
+from typing import Iterable, Iterator, List, Set, Dict, Optional
 
-from tag_reader import get_audio_tag, Tag
-from http_client import HttpClient
+from tag_reader import iter_audio_tags, Tag
+from http_client import HttpClient, RETRYABLE, SUCCESS, SendResult
 from path_utils import create_download_link
+from playlist_index import PlaylistIndex
+from playlist_writer import append_entries
+from tag_cache import TagCache
+from server_catalog import ServerCatalog
+from audio_scan import scan_audio_files
+from track_names import normalize_track_name, normalize_track_names
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex
+from folder_watcher import FolderWatcher
+from run_metrics import RunMetrics
 
 
 class UnifiedProcessor:
@@ -23,10 +35,39 @@ class UnifiedProcessor:
         self.files_for_server = []  # Файлы для отправки на сервер (новые в плейлисте + отсутствуют в БД)
         self.processed_tracks = []  # Отправленные треки на сервер
         self.playlist_duplicates = []  # Дубликаты в плейлисте
+        self.near_duplicates = []  # Новые файлы, похожие на треки плейлиста: (файл, похожий трек, мера)
+        self._near_index = None  # Индекс похожих имен треков плейлиста (строится при первом поиске)
+        self._near_index_source = None  # Набор имен плейлиста, по которому построен индекс
+        self._near_pending = {}  # Новые файлы без похожих имен (проверяются по тегам при отправке): путь -> имя
         self.server_duplicates = []  # Файлы уже в БД сервера (для информации)
+        self._playlist_signature = None  # (размер, время изменения) плейлиста при последнем чтении
+        self._scanned_files = None  # Все файлы songs_path, если папка сканировалась полностью в этом проходе
+        self.metrics = RunMetrics()  # Время фаз и задержки запросов
+        self.catalog_info = {}  # Как был получен каталог сервера (для отчета)
+        self.report_base = None  # Имя файлов отчета без расширения (после _generate_report)
         
         # Проверка обязательных параметров
         self._validate_config()
+        
+        # Повторы запросов к серверу при временных ошибках
+        HttpClient.configure(max_retries=config.get('max_retries', 3))
+        # Задержки всех запросов к серверу записываются в метрики
+        HttpClient.observe(self._record_request)
+    
+    def _record_request(self, method: str, url: str, status: Optional[int], elapsed: float):
+        self.metrics.record_request(method, url, status, elapsed)
+    
+    def _timed(self, items: Iterable, phase: str) -> Iterator:
+        """Перебирает items, записывая время ожидания каждого элемента в фазу phase"""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.metrics.add(phase, time.perf_counter() - started, 1)
+            yield item
     
     def _validate_config(self):
         """Проверка обязательных параметров конфигурации"""
@@ -39,14 +80,6 @@ class UnifiedProcessor:
         if missing:
             raise ValueError(f"Отсутствуют обязательные параметры в config.json: {missing}")
     
-    def _normalize_track_name(self, track_name: str) -> str:
-        """Удаляет дату в формате 2025-12-24 из названия трека"""
-        # Удаляем дату в начале, середине или конце названия
-        pattern = r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}_'
-        normalized = re.sub(pattern, ' ', track_name)
-        # Удаляем лишние пробелы и приводим к нижнему регистру
-        return ' '.join(normalized.split()).lower()
-    
     def _get_existing_playlist_tracks(self) -> Set[str]:
         """Получает список уже добавленных треков из плейлиста"""
         existing_tracks = set()
@@ -58,14 +91,11 @@ class UnifiedProcessor:
             return existing_tracks
         
         try:
-            with open(playlist_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Ищем все треки в формате track=...?;
-                tracks = re.findall(r'track=([^?\n]+)\?;', content)
-                for track in tracks:
-                    track = track.strip()
-                    normalized = self._normalize_track_name(Path(track).stem)
-                    existing_tracks.add(normalized)
+            # Индекс плейлиста сохраняется между запусками, повторно разбирается только дописанная часть
+            with self.metrics.phase('playlist_parse') as phase:
+                index = PlaylistIndex(playlist_file, normalize_track_name)
+                existing_tracks = index.names()
+                phase.items = len(index)
             
             print(f"Найдено уникальных треков в плейлисте: {len(existing_tracks)}")
             return existing_tracks
@@ -84,34 +114,32 @@ class UnifiedProcessor:
         extensions = set(self.config.get('supported_formats', 
                       ['.mp3', '.flac', '.wav', '.ogg', '.m4a', '.opus']))
         
-        audio_files = []
-        for root, _, files in os.walk(songs_path):
-            for file in files:
-                if Path(file).suffix.lower() in extensions:
-                    audio_files.append(os.path.join(root, file))
+        # Порядок параллельного сканирования не определен - сортируем, чтобы из дубликатов
+        # всегда выбирался один и тот же файл
+        with self.metrics.phase('scan') as phase:
+            files = sorted(audio_file.path for audio_file in
+                           scan_audio_files(songs_path, extensions, with_stat=False))
+            phase.items = len(files)
+        return files
+    
+    def _playlist_entry_path(self, file_path: str, relative_path: str = None) -> str:
+        """Путь трека на сервере для записи в плейлист"""
+        # Если relative_path не передан, рассчитываем обычным способом
+        if relative_path is None:
+            relative_path = os.path.relpath(file_path, self.config['songs_path'])
         
-        return audio_files
+        return os.path.join(
+            self.config['server_path'], 
+            relative_path
+        ).replace('\\', '/')
     
-    def _add_to_playlist(self, file_path: str, relative_path: str = None) -> bool:
-        """Добавляет файл в плейлист"""
+    def _add_to_playlist(self, files: List[tuple]) -> bool:
+        """Добавляет пачку файлов (file_path, relative_path) в плейлист одной записью"""
         try:
-            # Если relative_path не передан, рассчитываем обычным способом
-            if relative_path is None:
-                relative_path = os.path.relpath(file_path, self.config['songs_path'])
-            
-            server_file_path = os.path.join(
-                self.config['server_path'], 
-                relative_path
-            ).replace('\\', '/')
-            
-            # Добавляем запись в плейлист
-            playlist_file = self.config['playlist_file']
-            mode = 'a' if os.path.exists(playlist_file) else 'w'
-            
-            with open(playlist_file, mode, encoding='utf-8') as f:
-                playlist_entry = f"track={server_file_path}?;\n"
-                f.write(playlist_entry)
-            
+            entries = [self._playlist_entry_path(file_path, relative_path)
+                       for file_path, relative_path in files]
+            with self.metrics.phase('playlist_append', len(entries)):
+                append_entries(self.config['playlist_file'], entries)
             return True
             
         except Exception as e:
@@ -123,27 +151,18 @@ class UnifiedProcessor:
         print("Получение списка треков с сервера...")
         
         try:
-            response = requests.get(
-                self.config['server_tracks_url'],
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                raise RuntimeError(f"HTTP ошибка {response.status_code}: {response.text}")
-            
-            tracks_data = response.json()
-            
-            if not isinstance(tracks_data, list):
-                raise RuntimeError(f"Некорректный ответ от сервера: {tracks_data}")
-            
-            # Извлекаем и нормализуем пути из БД сервера
-            for track in tracks_data:
-                if 'file_path' in track:
-                    # Нормализуем путь для сравнения
-                    path = track['file_path'].replace('\\', '/').strip()
-                    self.server_tracks_paths.add(path)
-            
-            print(f"Получено треков с сервера: {len(self.server_tracks_paths)}")
+            # Каталог хранится локально и обновляется изменениями с прошлого запуска
+            catalog = ServerCatalog(self.config['server_tracks_url'])
+            with self.metrics.phase('server_catalog') as phase:
+                self.server_tracks_paths = catalog.sync(full=self.config.get('catalog_full_sync', False))
+                phase.items = len(self.server_tracks_paths)
+            self.catalog_info = {'mode': catalog.mode, 'bytes_received': catalog.bytes_received,
+                                 'tracks': len(self.server_tracks_paths)}
+            
+            modes = {'delta': "получены изменения", 'not-modified': "каталог не изменился",
+                     'full': "загружен полный каталог"}
+            print(f"Получено треков с сервера: {len(self.server_tracks_paths)} "
+                  f"({modes.get(catalog.mode, catalog.mode)}, получено {catalog.bytes_received} байт)")
             
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Ошибка соединения с сервером: {e}")
@@ -192,14 +211,30 @@ class UnifiedProcessor:
         else:
             # Сканируем локальную папку (режим по умолчанию)
             all_files = self._scan_local_folder()
+            self._scanned_files = all_files
             drag_and_drop_mode = False
         
         print(f"Найдено файлов для обработки: {len(all_files)}")
+        self._find_new_files(all_files, drag_and_drop_mode)
+    
+    def _find_new_files(self, all_files: List[str], drag_and_drop_mode: bool = False):
+        """Отбирает файлы, которых еще нет в плейлисте, в new_files_to_add"""
+        with self.metrics.phase('dedup', len(all_files)):
+            self._select_new_files(all_files, drag_and_drop_mode)
         
-        # Ищем новые файлы ТОЛЬКО для плейлиста
-        for file_path in all_files:
-            track_name = Path(file_path).stem
-            normalized_name = self._normalize_track_name(track_name)
+        if self.playlist_duplicates:
+            print(f"Пропущено дубликатов в плейлисте: {len(self.playlist_duplicates)}")
+        if self.near_duplicates:
+            print(f"Возможных дубликатов (добавлены, проверьте вручную): {len(self.near_duplicates)}")
+    
+    def _select_new_files(self, all_files: List[str], drag_and_drop_mode: bool):
+        """Проверка дубликатов по нормализованным именам (без замера времени)"""
+        # Ищем новые файлы ТОЛЬКО для плейлиста (имена нормализуются одним пакетом)
+        track_names = [Path(file_path).stem for file_path in all_files]
+        new_names = []  # (файл, имя трека, нормализованное имя) новых файлов
+        check_near = self.config.get('near_duplicates', True)
+        for file_path, track_name, normalized_name in zip(
+                all_files, track_names, normalize_track_names(track_names)):
             
             # Проверяем дубликаты в плейлисте
             if normalized_name in self.existing_playlist_tracks:
@@ -227,12 +262,91 @@ class UnifiedProcessor:
             else:
                 relative_path = None
             
+            # Индекс похожих имен строится до добавления новых имен в плейлист
+            if check_near:
+                self._get_near_index()
+            
             # Добавляем в список новых файлов для плейлиста
             self.new_files_to_add.append((file_path, relative_path))
             self.existing_playlist_tracks.add(normalized_name)
+            new_names.append((file_path, track_name, normalized_name))
         
-        if self.playlist_duplicates:
-            print(f"Пропущено дубликатов в плейлисте: {len(self.playlist_duplicates)}")
+        # Похожие треки (feat., знаки препинания, транслит, опечатки) не пропускаются, а отмечаются
+        if new_names and check_near:
+            self._flag_near_duplicates(new_names)
+    
+    def _get_near_index(self) -> NearDuplicateIndex:
+        """
+        Индекс похожих имен по трекам плейлиста (перестраивается, если плейлист перечитан)
+        
+        Теги треков плейлиста берутся из кэша тегов (файлы songs_path, прочитанные
+        прошлыми запусками); треки без тегов в кэше сравниваются только по имени.
+        """
+        if self._near_index is None or self._near_index_source is not self.existing_playlist_tracks:
+            with self.metrics.phase('near_index', len(self.existing_playlist_tracks)):
+                self._near_index = NearDuplicateIndex(
+                    float(self.config.get('near_duplicate_threshold', DEFAULT_THRESHOLD)))
+                try:
+                    with TagCache() as tag_cache:
+                        cached_tags = tag_cache.tags_by_name(self.config['songs_path'])
+                except (sqlite3.Error, OSError) as e:
+                    print(f"Кэш тегов недоступен ({e}), похожие треки плейлиста ищутся только по именам")
+                    cached_tags = {}
+                for name in self.existing_playlist_tracks:
+                    self._near_index.add(name, name, *cached_tags.get(name, ()))
+            self._near_index_source = self.existing_playlist_tracks
+        return self._near_index
+    
+    def _flag_near_duplicates(self, new_names: List[tuple]):
+        """
+        Отмечает новые файлы, имена которых похожи на треки плейлиста, и добавляет их в индекс
+        
+        Теги здесь не читаются, чтобы не задерживать отправку на сервер: файлы без
+        похожих имен проверяются по тегам, когда теги прочитаны для отправки
+        (_flag_near_duplicate_by_tags).
+        """
+        near_index = self._get_near_index()
+        for file_path, track_name, normalized_name in new_names:
+            similar = near_index.find_similar(normalized_name)
+            if similar is None:
+                self._near_pending[file_path] = normalized_name
+            else:
+                self._report_near_duplicate(file_path, track_name, *similar)
+            near_index.add(normalized_name, normalized_name)
+    
+    def _flag_near_duplicate_by_tags(self, file_path: str, tag: Tag):
+        """Проверяет по тегам новый файл, имя которого не похоже на треки плейлиста"""
+        normalized_name = self._near_pending.pop(file_path, None)
+        if normalized_name is None or self._near_index is None:
+            return
+        similar = self._near_index.find_similar(normalized_name, tag.artist, tag.title, exclude=normalized_name)
+        if similar is not None:
+            self._report_near_duplicate(file_path, Path(file_path).stem, *similar)
+    
+    def _report_near_duplicate(self, file_path: str, track_name: str, similar_name: str, similarity: float):
+        print(f"  Возможный дубликат: '{track_name}' ~ '{similar_name}' ({similarity:.0%})")
+        self.near_duplicates.append((file_path, similar_name, similarity))
+    
+    def _add_new_files_phase(self, drag_and_drop_mode: bool = False):
+        """Добавление новых файлов в плейлист (одной записью)"""
+        if self.new_files_to_add:
+            print("\n" + "=" * 50)
+            print("Добавление новых файлов в плейлист...")
+            print("=" * 50)
+            
+            added_count = 0
+            if self._add_to_playlist(self.new_files_to_add):
+                for file_path, relative_path in self.new_files_to_add:
+                    display_path = relative_path if relative_path else os.path.basename(file_path)
+                    print(f"  ✓ Добавлено в плейлист: {display_path}")
+                added_count = len(self.new_files_to_add)
+            else:
+                for file_path, _ in self.new_files_to_add:
+                    print(f"  ✗ Ошибка добавления в плейлист: {os.path.basename(file_path)}")
+            
+            print(f"\nДобавлено в плейлист: {added_count} из {len(self.new_files_to_add)}")
+        else:
+            print("\nНет новых файлов для добавления в плейлист")
     
     def _prepare_server_files_phase(self, drag_and_drop_mode: bool = False):
         """Подготовка файлов для отправки на сервер (новые в плейлисте + отсутствуют в БД)"""
@@ -244,17 +358,18 @@ class UnifiedProcessor:
             print("Нет новых файлов для плейлиста -> нет файлов для сервера")
             return
         
-        # Проверяем каждый новый файл для плейлиста на наличие в БД сервера
-        for file_path, relative_path in self.new_files_to_add:
-            if self._check_server_duplicate(file_path, relative_path):
-                # Файл уже есть в БД сервера
-                print(f"  Пропуск (уже в БД сервера): {os.path.basename(file_path)}")
-                self.server_duplicates.append(file_path)
-            else:
-                # Файла нет в БД - добавляем в список для отправки
-                self.files_for_server.append((file_path, relative_path))
-                print(f"  ✓ Для отправки на сервер: {os.path.basename(file_path)}")
-        
+        with self.metrics.phase('server_check', len(self.new_files_to_add)):
+            # Проверяем каждый новый файл для плейлиста на наличие в БД сервера
+            for file_path, relative_path in self.new_files_to_add:
+                if self._check_server_duplicate(file_path, relative_path):
+                    # Файл уже есть в БД сервера
+                    print(f"  Пропуск (уже в БД сервера): {os.path.basename(file_path)}")
+                    self.server_duplicates.append(file_path)
+                else:
+                    # Файла нет в БД - добавляем в список для отправки
+                    self.files_for_server.append((file_path, relative_path))
+                    print(f"  ✓ Для отправки на сервер: {os.path.basename(file_path)}")
+            
         print(f"\nИтог подготовки файлов для сервера:")
         print(f"  Всего новых файлов для плейлиста: {len(self.new_files_to_add)}")
         print(f"  Файлов для отправки на сервер: {len(self.files_for_server)}")
@@ -273,72 +388,143 @@ class UnifiedProcessor:
         success_count = 0
         error_count = 0
         
-        for i, (file_path, relative_path) in enumerate(self.files_for_server, 1):
+        # Теги всех файлов читаются заранее в пуле процессов и поступают по мере готовности;
+        # теги неизмененных файлов берутся из кэша
+        relative_paths = dict(self.files_for_server)
+        tag_cache = TagCache()
+        tags = self._timed(iter_audio_tags(relative_paths, self.config.get('tag_workers'), tag_cache), 'tags')
+        
+        batch_size = max(1, int(self.config.get('batch_size', 50)))
+        pending = []  # (file_info, params) - треки, ожидающие отправки
+        
+        for i, (file_path, tag) in enumerate(tags, 1):
             print(f"\n[{i}/{len(self.files_for_server)}] Отправка: {os.path.basename(file_path)}")
             
-            # Читаем теги
-            tag = get_audio_tag(file_path)
             if not tag:
                 print(f"  ✗ Ошибка чтения тегов")
                 error_count += 1
                 continue
             
             print(f"  Теги: {tag}")
-            
-            # Создаем download link с передачей relative_path
-            download_link = create_download_link(
-                file_path=file_path,
-                songs_path=self.config['songs_path'],
-                server_path=self.config['server_path'],
-                remove_prefix=self.config.get('remove_prefix', ''),
-                base_url=self.config.get('base_url', ''),
-                relative_path=relative_path  # Передаем предварительно рассчитанный путь
-            )
-            
-            # Отправляем на сервер
-            server_file_path = self._normalize_server_path(file_path, relative_path)
-            params = {
-                "artist": tag.artist,
-                "title": tag.title,
-                "link": download_link,
-                "file_path": server_file_path
-            }
-            
-            result = HttpClient.send_data(
-                self.config['page'],
+            self._flag_near_duplicate_by_tags(file_path, tag)
+            pending.append(self._prepare_track(file_path, relative_paths[file_path], tag))
+            
+            # Треки регистрируются пакетами по мере готовности тегов
+            if len(pending) >= batch_size:
+                sent, failed = self._register_tracks(pending, batch_size)
+                success_count += sent
+                error_count += failed
+                pending = []
+        
+        if pending:
+            sent, failed = self._register_tracks(pending, batch_size)
+            success_count += sent
+            error_count += failed
+        
+        self._close_tag_cache(tag_cache)
+        self._print_send_statistics(success_count, error_count)
+    
+    def _prepare_track(self, file_path: str, relative_path: Optional[str], tag: Tag) -> tuple:
+        """
+        Готовит запись трека для отправки на сервер
+        
+        Returns:
+            (file_info, params) - сведения для отчета и параметры запроса
+        """
+        # Создаем download link с передачей relative_path
+        download_link = create_download_link(
+            file_path=file_path,
+            songs_path=self.config['songs_path'],
+            server_path=self.config['server_path'],
+            remove_prefix=self.config.get('remove_prefix', ''),
+            base_url=self.config.get('base_url', ''),
+            relative_path=relative_path  # Передаем предварительно рассчитанный путь
+        )
+        
+        # Отправляем на сервер
+        server_file_path = self._normalize_server_path(file_path, relative_path)
+        params = {
+            "artist": tag.artist,
+            "title": tag.title,
+            "link": download_link,
+            "file_path": server_file_path
+        }
+        
+        # Сохраняем информацию (результат будет записан после отправки пакета)
+        file_info = {
+            "file": os.path.basename(file_path),
+            "full_path": file_path,
+            "relative_path": relative_path,
+            "download_link": download_link,
+            "server_file_path": server_file_path,
+            "artist": tag.artist,
+            "title": tag.title,
+            "result": None,
+            "status": None
+        }
+        return file_info, params
+    
+    def _close_tag_cache(self, tag_cache: TagCache):
+        """Выводит статистику кэша тегов, удаляет записи отсутствующих файлов и закрывает кэш"""
+        print(f"\nТеги из кэша: {tag_cache.hits}, прочитано из файлов: {tag_cache.misses}")
+        # Отсутствующими считаются только файлы songs_path, не найденные полным сканированием
+        # этого прохода (без проверки каждого файла на диске); в drag-and-drop и для пачек
+        # режима наблюдения кэш не очищается
+        if self._scanned_files:
+            evicted = tag_cache.evict_unseen(self.config['songs_path'], self._scanned_files)
+            if evicted:
+                print(f"Удалено из кэша тегов записей об отсутствующих файлах: {evicted}")
+        tag_cache.close()
+    
+    def _print_send_statistics(self, success_count: int, error_count: int):
+        """Вывод статистики отправки"""
+        print(f"\nСтатистика отправки на сервер:")
+        print(f"  Успешно: {success_count}")
+        print(f"  С ошибками: {error_count}")
+    
+    def _register_tracks(self, pending: List[tuple], batch_size: int) -> tuple:
+        """
+        Регистрирует пачку треков на сервере
+        
+        Returns:
+            (успешно, с ошибками)
+        """
+        return self._record_results(pending, self._send_batch(pending, batch_size))
+    
+    def _send_batch(self, pending: List[tuple], batch_size: int) -> List[SendResult]:
+        """Отправляет пачку треков на сервер (без вывода результатов)"""
+        with self.metrics.phase('register', len(pending)):
+            return HttpClient.send_batch(
+                self.config.get('batch_page', self.config['page']),
                 self.config['key'],
-                params
+                [params for _, params in pending],
+                batch_size
             )
-            
-            # Сохраняем информацию
-            file_info = {
-                "file": os.path.basename(file_path),
-                "full_path": file_path,
-                "relative_path": relative_path,
-                "download_link": download_link,
-                "server_file_path": server_file_path,
-                "artist": tag.artist,
-                "title": tag.title,
-                "result": result
-            }
-            
+    
+    def _record_results(self, pending: List[tuple], results: List[SendResult]) -> tuple:
+        """
+        Сохраняет результаты отправки пачки треков для отчета и выводит их
+        
+        Returns:
+            (успешно, с ошибками)
+        """
+        success_count = 0
+        error_count = 0
+        for (file_info, _), result in zip(pending, results):
+            file_info["result"] = result.message
+            file_info["status"] = result.status
             self.processed_tracks.append(file_info)
             
-            if "Error" in result:
-                print(f"  ✗ Ошибка отправки: {result}")
+            if not result.ok:
+                kind = "временная ошибка сервера" if result.status == RETRYABLE else "ошибка"
+                print(f"  ✗ Не отправлено {file_info['file']} ({kind}): {result}")
                 error_count += 1
             else:
-                print(f"  ✓ Успешно отправлено на сервер")
-                print(f"  Ссылка: {download_link}")
+                print(f"  ✓ Отправлено на сервер: {file_info['file']}")
+                print(f"    Ссылка: {file_info['download_link']}")
                 success_count += 1
-            
-            # Добавляем паузу между запросами, если нужно
-            time.sleep(0.5)
         
-        # Вывод статистики
-        print(f"\nСтатистика отправки на сервер:")
-        print(f"  Успешно: {success_count}")
-        print(f"  С ошибками: {error_count}")
+        return success_count, error_count
     
     def _generate_report(self, mode: str = "default"):
         """Генерирует отчет о выполнении"""
@@ -350,11 +536,12 @@ class UnifiedProcessor:
         print(f"\nОбщая статистика:")
         print(f"  Добавлено в плейлист: {len(self.new_files_to_add)}")
         print(f"  Пропущено дубликатов в плейлисте: {len(self.playlist_duplicates)}")
+        print(f"  Возможных дубликатов: {len(self.near_duplicates)}")
         print(f"  Отправлено на сервер: {len(self.processed_tracks)}")
         print(f"  Уже было в БД сервера: {len(self.server_duplicates)}")
         
-        success_count = len([t for t in self.processed_tracks if 'Error' not in t['result']])
-        error_count = len([t for t in self.processed_tracks if 'Error' in t['result']])
+        success_count = len([t for t in self.processed_tracks if t['status'] == SUCCESS])
+        error_count = len(self.processed_tracks) - success_count
         print(f"  Успешно отправлено: {success_count}")
         print(f"  Ошибок отправки: {error_count}")
         
@@ -374,8 +561,18 @@ class UnifiedProcessor:
             if len(self.playlist_duplicates) > 5:
                 print(f"  ... и еще {len(self.playlist_duplicates) - 5}")
         
+        if self.near_duplicates:
+            print(f"\nВозможные дубликаты (добавлены в плейлист, проверьте вручную):")
+            for file_path, similar_name, similarity in self.near_duplicates[:5]:
+                print(f"  ? {os.path.basename(file_path)} ~ {similar_name} ({similarity:.0%})")
+            if len(self.near_duplicates) > 5:
+                print(f"  ... и еще {len(self.near_duplicates) - 5}")
+        
+        self.metrics.print_summary()
+        
         # Сохраняем подробный отчет в файл
-        report_file = f"unified_processor_report_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+        self.report_base = f"unified_processor_report_{time.strftime('%Y%m%d_%H%M%S')}"
+        report_file = f"{self.report_base}.txt"
         try:
             with open(report_file, 'w', encoding='utf-8') as f:
                 f.write("=" * 60 + "\n")
@@ -387,6 +584,7 @@ class UnifiedProcessor:
                 f.write(f"Общая статистика:\n")
                 f.write(f"  Добавлено в плейлист: {len(self.new_files_to_add)}\n")
                 f.write(f"  Пропущено дубликатов в плейлисте: {len(self.playlist_duplicates)}\n")
+                f.write(f"  Возможных дубликатов: {len(self.near_duplicates)}\n")
                 f.write(f"  Отправлено на сервер: {len(self.processed_tracks)}\n")
                 f.write(f"  Уже было в БД сервера: {len(self.server_duplicates)}\n")
                 f.write(f"  Успешно отправлено: {success_count}\n")
@@ -403,7 +601,7 @@ class UnifiedProcessor:
                 if self.processed_tracks:
                     f.write("Отправленные на сервер треки:\n")
                     for track in self.processed_tracks:
-                        status = "✓" if "Error" not in track['result'] else "✗"
+                        status = "✓" if track['status'] == SUCCESS else "✗"
                         f.write(f"  {status} {track['artist']} - {track['title']}\n")
                         f.write(f"     Файл: {track['file']}\n")
                         f.write(f"     Относительный путь: {track['relative_path']}\n")
@@ -414,6 +612,12 @@ class UnifiedProcessor:
                     for dup in self.playlist_duplicates:
                         f.write(f"  - {dup}\n")
                 
+                if self.near_duplicates:
+                    f.write("\nВозможные дубликаты (добавлены в плейлист):\n")
+                    for file_path, similar_name, similarity in self.near_duplicates:
+                        f.write(f"  ? {file_path}\n")
+                        f.write(f"     Похож на: {similar_name} ({similarity:.0%})\n")
+                
                 if self.server_duplicates:
                     f.write("\nФайлы уже имеющиеся в БД сервера:\n")
                     for dup in self.server_duplicates:
@@ -423,6 +627,26 @@ class UnifiedProcessor:
             
         except Exception as e:
             print(f"Ошибка при сохранении отчета: {e}")
+        
+        # Метрики выполнения - рядом с отчетом в JSON
+        metrics_file = f"{self.report_base}.json"
+        try:
+            self.metrics.save(metrics_file, {
+                'mode': mode,
+                'catalog': self.catalog_info,
+                'counts': {
+                    'added_to_playlist': len(self.new_files_to_add),
+                    'playlist_duplicates': len(self.playlist_duplicates),
+                    'near_duplicates': len(self.near_duplicates),
+                    'sent_to_server': len(self.processed_tracks),
+                    'sent_successfully': success_count,
+                    'send_errors': error_count,
+                    'server_duplicates': len(self.server_duplicates),
+                },
+            })
+            print(f"Метрики выполнения сохранены в: {metrics_file}")
+        except Exception as e:
+            print(f"Ошибка при сохранении метрик: {e}")
     
     def run_drag_and_drop(self, files: List[str]):
         """Основной метод для режима drag-and-drop"""
@@ -435,23 +659,7 @@ class UnifiedProcessor:
         self._process_playlist_phase(files, drag_and_drop_mode=True)
         
         # 3. Добавляем новые файлы в плейлист
-        if self.new_files_to_add:
-            print("\n" + "=" * 50)
-            print("Добавление новых файлов в плейлист...")
-            print("=" * 50)
-            
-            added_count = 0
-            for file_path, relative_path in self.new_files_to_add:
-                if self._add_to_playlist(file_path, relative_path):
-                    display_path = relative_path if relative_path else os.path.basename(file_path)
-                    print(f"  ✓ Добавлено в плейлист: {display_path}")
-                    added_count += 1
-                else:
-                    print(f"  ✗ Ошибка добавления в плейлист: {os.path.basename(file_path)}")
-            
-            print(f"\nДобавлено в плейлист: {added_count} из {len(self.new_files_to_add)}")
-        else:
-            print("\nНет новых файлов для добавления в плейлист")
+        self._add_new_files_phase(drag_and_drop_mode=True)
         
         # 4. Подготавливаем файлы для отправки на сервер
         self._prepare_server_files_phase(drag_and_drop_mode=True)
@@ -471,22 +679,7 @@ class UnifiedProcessor:
         self._process_playlist_phase()
         
         # 3. Добавляем новые файлы в плейлист
-        if self.new_files_to_add:
-            print("\n" + "=" * 50)
-            print("Добавление новых файлов в плейлист...")
-            print("=" * 50)
-            
-            added_count = 0
-            for file_path, relative_path in self.new_files_to_add:
-                if self._add_to_playlist(file_path, relative_path):
-                    print(f"  ✓ Добавлено в плейлист: {os.path.basename(file_path)}")
-                    added_count += 1
-                else:
-                    print(f"  ✗ Ошибка добавления в плейлист: {os.path.basename(file_path)}")
-            
-            print(f"\nДобавлено в плейлист: {added_count} из {len(self.new_files_to_add)}")
-        else:
-            print("\nНет новых файлов для добавления в плейлист")
+        self._add_new_files_phase()
         
         # 4. Подготавливаем файлы для отправки на сервер
         self._prepare_server_files_phase()
@@ -495,4 +688,217 @@ class UnifiedProcessor:
         self._send_tracks_phase()
         
         # 6. Генерируем отчет
-        self._generate_report(mode="default")
\ No newline at end of file
+        self._generate_report(mode="default")
+    
+    # --- Режим наблюдения за папкой ---
+    
+    def watch(self):
+        """
+        Наблюдение за папкой с музыкой: новые файлы обрабатываются по мере появления
+        
+        Сначала выполняется обычный проход (run), затем обрабатываются только
+        появившиеся файлы. Треки плейлиста и каталог сервера остаются в памяти
+        между событиями; плейлист перечитывается, только если его изменили извне.
+        """
+        extensions = self.config.get('supported_formats', 
+                                     ['.mp3', '.flac', '.wav', '.ogg', '.m4a', '.opus'])
+        
+        # Наблюдение начинается до первого прохода, чтобы не пропустить файлы,
+        # появившиеся во время него
+        with FolderWatcher(
+            self.config['songs_path'],
+            extensions,
+            settle_seconds=float(self.config.get('watch_settle_seconds', 2)),
+            poll_interval=float(self.config.get('watch_poll_interval', 10)),
+            polling=self.config.get('watch_polling', False)
+        ) as watcher:
+            self.run()
+            self._playlist_signature = self._get_playlist_signature()
+            
+            print("\n" + "=" * 60)
+            print(f"Наблюдение за папкой ({watcher.backend.name}): {self.config['songs_path']}")
+            print("Остановка - Ctrl+C")
+            print("=" * 60)
+            
+            for files in watcher.iter_batches():
+                try:
+                    self._process_watch_batch(files)
+                except Exception as e:
+                    # Ошибка одной пачки (например, сервер недоступен) не останавливает наблюдение
+                    print(f"\nОшибка обработки новых файлов: {e}")
+                print(f"\nОжидание новых файлов...")
+    
+    def _reset_run_state(self):
+        """Очищает результаты предыдущей обработки (треки плейлиста и сервера сохраняются)"""
+        self.new_files_to_add = []
+        self.files_for_server = []
+        self.processed_tracks = []
+        self.playlist_duplicates = []
+        self.near_duplicates = []
+        self._near_pending = {}
+        self.server_duplicates = []
+        self._scanned_files = None
+        self.metrics = RunMetrics()
+    
+    def _get_playlist_signature(self) -> Optional[tuple]:
+        try:
+            playlist_stat = os.stat(self.config['playlist_file'])
+        except OSError:
+            return None
+        return playlist_stat.st_size, playlist_stat.st_mtime_ns
+    
+    def _process_watch_batch(self, files: List[str]):
+        """Дубликаты -> плейлист -> регистрация на сервере для пачки новых файлов"""
+        print("\n" + "=" * 60)
+        print(f"{time.strftime('%H:%M:%S')} Новых файлов: {len(files)}")
+        print("=" * 60)
+        self._reset_run_state()
+        
+        # Плейлист могли изменить другие скрипты (AddToPlaylist, CheckList)
+        if self._get_playlist_signature() != self._playlist_signature:
+            self.existing_playlist_tracks = self._get_existing_playlist_tracks()
+        
+        self._find_new_files(files)
+        if not self.new_files_to_add:
+            print("Нет новых файлов для добавления в плейлист")
+            return
+        
+        self._add_new_files_phase()
+        self._playlist_signature = self._get_playlist_signature()
+        self._prepare_server_files_phase()
+        self._send_tracks_phase()
+        
+        # Зарегистрированные треки добавляются в каталог сервера в памяти
+        self.server_tracks_paths.update(
+            track['server_file_path'] for track in self.processed_tracks if track['status'] == SUCCESS)
+        self.metrics.print_summary()
+    
+    # --- Конвейерный режим (asyncio) ---
+    
+    def run_pipeline(self, files: Optional[List[str]] = None):
+        """
+        Выполнение всех фаз в конвейерном режиме
+        
+        Загрузка списка треков с сервера идет одновременно со сканированием папки,
+        а чтение тегов - одновременно с отправкой уже готовых пакетов на сервер.
+        Фазы и итоговый отчет такие же, как в run и run_drag_and_drop.
+        """
+        if files:
+            print(f"Обработка {len(files)} файлов в режиме drag-and-drop (конвейер)")
+        asyncio.run(self._run_pipeline(files))
+    
+    async def _run_pipeline(self, files: Optional[List[str]]):
+        drag_and_drop_mode = bool(files)
+        loop = asyncio.get_running_loop()
+        
+        # 1-2. Список треков с сервера и поиск новых файлов для плейлиста - одновременно
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            server_tracks = loop.run_in_executor(executor, self._get_server_tracks)
+            playlist_phase = loop.run_in_executor(
+                executor, self._process_playlist_phase, files, drag_and_drop_mode)
+            await asyncio.gather(server_tracks, playlist_phase)
+        
+        # 3. Добавляем новые файлы в плейлист
+        self._add_new_files_phase(drag_and_drop_mode)
+        
+        # 4. Подготавливаем файлы для отправки на сервер
+        self._prepare_server_files_phase(drag_and_drop_mode)
+        
+        # 5. Отправляем файлы на сервер
+        await self._send_tracks_pipeline()
+        
+        # 6. Генерируем отчет
+        self._generate_report(mode="drag-and-drop" if drag_and_drop_mode else "default")
+    
+    async def _send_tracks_pipeline(self):
+        """Фаза отправки треков: теги читаются, пока предыдущие пакеты отправляются на сервер"""
+        if not self.files_for_server:
+            print("\nНет файлов для отправки на сервер")
+            return
+        
+        print("\n" + "=" * 50)
+        print("Фаза 3: Отправка треков на сервер")
+        print("=" * 50)
+        
+        loop = asyncio.get_running_loop()
+        batch_size = max(1, int(self.config.get('batch_size', 50)))
+        # Сколько пакетов может отправляться одновременно
+        concurrency = max(1, int(self.config.get('http_concurrency', 4)))
+        relative_paths = dict(self.files_for_server)
+        # Ограниченная очередь: чтение тегов не уходит далеко вперед от отправки
+        tags_queue = asyncio.Queue(maxsize=batch_size * concurrency)
+        
+        stop_reading = threading.Event()
+        
+        def read_tags():
+            # Кэш тегов (SQLite) создается и закрывается в том же потоке, где используется
+            tag_cache = TagCache()
+            try:
+                for item in self._timed(
+                        iter_audio_tags(relative_paths, self.config.get('tag_workers'), tag_cache), 'tags'):
+                    if stop_reading.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(tags_queue.put(item), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(tags_queue.put(None), loop).result()
+                self._close_tag_cache(tag_cache)
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency + 1)
+        slots = asyncio.Semaphore(concurrency)
+        
+        async def register(pending: List[tuple]) -> tuple:
+            try:
+                results = await loop.run_in_executor(executor, self._send_batch, pending, batch_size)
+            finally:
+                slots.release()
+            return self._record_results(pending, results)
+        
+        success_count = 0
+        error_count = 0
+        sending = []
+        pending = []  # (file_info, params) - треки, ожидающие отправки
+        
+        tags_reader = loop.run_in_executor(executor, read_tags)
+        try:
+            i = 0
+            while True:
+                item = await tags_queue.get()
+                if item is None:
+                    break
+                file_path, tag = item
+                i += 1
+                print(f"\n[{i}/{len(self.files_for_server)}] Подготовка: {os.path.basename(file_path)}")
+                
+                if not tag:
+                    print(f"  ✗ Ошибка чтения тегов")
+                    error_count += 1
+                    continue
+                
+                print(f"  Теги: {tag}")
+                self._flag_near_duplicate_by_tags(file_path, tag)
+                pending.append(self._prepare_track(file_path, relative_paths[file_path], tag))
+                
+                if len(pending) >= batch_size:
+                    # Ждем свободный слот, если уже отправляется concurrency пакетов
+                    await slots.acquire()
+                    sending.append(asyncio.ensure_future(register(pending)))
+                    pending = []
+            
+            if pending:
+                await slots.acquire()
+                sending.append(asyncio.ensure_future(register(pending)))
+            
+            for sent, failed in await asyncio.gather(*sending):
+                success_count += sent
+                error_count += failed
+            await tags_reader
+        finally:
+            # При ошибке или прерывании освобождаем очередь, чтобы поток чтения тегов завершился
+            stop_reading.set()
+            while not tags_reader.done():
+                while not tags_queue.empty():
+                    tags_queue.get_nowait()
+                await asyncio.sleep(0.05)
+            executor.shutdown(wait=True)
+        
+        self._print_send_statistics(success_count, error_count)
@@ -2,17 +2,15 @@
 
 import os
 import sys
-import re
 from pathlib import Path
 from datetime import datetime
 
-def normalize_track_name(track_name):
-    """Удаляет дату в формате 2025-12-24 из названия трека"""
-    # Удаляем дату в начале, середине или конце названия
-    pattern = r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}_'
-    normalized = re.sub(pattern, ' ', track_name)
-    # Удаляем лишние пробелы и приводим к нижнему регистру
-    return ' '.join(normalized.split()).lower()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common'))
+
+from playlist_index import PlaylistIndex
+from playlist_writer import append_entries
+from audio_scan import scan_audio_files
+from track_names import normalize_track_name, normalize_track_names
 
 def get_existing_tracks(playlist_file):
     """Получает список уже добавленных треков из плейлиста"""
@@ -22,16 +20,11 @@ def get_existing_tracks(playlist_file):
         return existing_tracks
     
     try:
-        with open(playlist_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Ищем все треки в формате track=...?; (с любыми пробельными символами после)
-            # Теперь учитываем возможный перевод строки после точки с запятой
-            tracks = re.findall(r'track=([^?\n]+)\?;', content)
-            for track in tracks:
-                # Удаляем возможные пробелы в начале и конце пути
-                track = track.strip()
-                normalized = normalize_track_name(Path(track).stem)
-                existing_tracks.add(normalized)
+        # Индекс плейлиста сохраняется между запусками, повторно разбирается только дописанная часть
+        index = PlaylistIndex(playlist_file, normalize_track_name)
+        for normalized, entries in index.by_name.items():
+            existing_tracks.add(normalized)
+            for _, track in entries:
                 print(f"Найден существующий трек: {track} (нормализовано: {normalized})")
     except Exception as e:
         print(f"Ошибка при чтении плейлиста: {e}")
@@ -56,21 +49,25 @@ def create_playlist(server_folder, local_folder, playlist_file):
     audio_extensions = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus'}
     new_tracks = []
     
-    for file_path in local_path.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in audio_extensions:
-            # Получаем относительный путь для сервера
-            relative_path = server_path / file_path.relative_to(local_path)
-            track_name = file_path.stem
-            normalized_name = normalize_track_name(track_name)
-            
-            if normalized_name in existing_tracks:
-                print(f"Пропуск: Трек '{track_name}' уже существует в плейлисте (нормализовано: {normalized_name})")
-                continue
-            
-            # Добавляем в список новых треков
-            new_tracks.append(relative_path)
-            existing_tracks.add(normalized_name)
-            print(f"Найден новый трек: {track_name} -> {relative_path}")
+    # Порядок параллельного сканирования не определен - сортируем, чтобы из дубликатов
+    # всегда выбирался один и тот же файл и порядок записей в плейлисте был стабильным
+    audio_files = sorted(Path(audio_file.path) for audio_file in
+                         scan_audio_files(local_folder, audio_extensions, with_stat=False))
+    
+    normalized_names = normalize_track_names(file_path.stem for file_path in audio_files)
+    for file_path, normalized_name in zip(audio_files, normalized_names):
+        # Получаем относительный путь для сервера
+        relative_path = server_path / file_path.relative_to(local_path)
+        track_name = file_path.stem
+        
+        if normalized_name in existing_tracks:
+            print(f"Пропуск: Трек '{track_name}' уже существует в плейлисте (нормализовано: {normalized_name})")
+            continue
+        
+        # Добавляем в список новых треков
+        new_tracks.append(relative_path)
+        existing_tracks.add(normalized_name)
+        print(f"Найден новый трек: {track_name} -> {relative_path}")
     
     if not new_tracks:
         print("Новых треков для добавления не найдено")
@@ -78,13 +75,10 @@ def create_playlist(server_folder, local_folder, playlist_file):
     
     # Добавляем новые треки в плейлист
     try:
-        mode = 'a' if os.path.exists(playlist_file) else 'w'
-        with open(playlist_file, mode, encoding='utf-8') as f:
-            for track_path in new_tracks:
-                # Экранируем специальные символы если нужно
-                playlist_entry = f"track={track_path}?;\n"
-                f.write(playlist_entry)
-                print(f"Добавлен: {track_path}")
+        # Все новые треки дописываются одной записью
+        append_entries(playlist_file, new_tracks)
+        for track_path in new_tracks:
+            print(f"Добавлен: {track_path}")
         
         print(f"\nДобавлено {len(new_tracks)} новых треков в плейлист '{playlist_file}'")
         return True
@@ -4,15 +4,30 @@ import re
 import subprocess
 import stat
 import time
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path, PurePosixPath
 from typing import List, Tuple, Optional, Dict
 from getpass import getpass
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common'))
+
+from playlist_index import PlaylistIndex
+from playlist_writer import rewrite_playlist
+
 # Конфигурация SFTP
 SERVER_HOSTNAME = "r.dlike.ru"
 SERVER_USERNAME = "admin"
 SERVER_PORT = 22
 
+# Количество одновременных проверок (можно изменить ключом --workers=N)
+CHECK_WORKERS = 8
+
+# Не больше стольких SFTP-каналов на одно подключение (на сервере OpenSSH по умолчанию
+# MaxSessions = 10, один канал уже занят основным SFTP-клиентом)
+MAX_SFTP_CHANNELS = 8
+
 def check_and_install_paramiko() -> bool:
     """
     Проверяет наличие paramiko и устанавливает при необходимости
@@ -46,89 +61,154 @@ def connect_to_sftp(hostname: str, username: str, password: str) -> Optional[obj
         print(f"✗ Ошибка подключения к {hostname}: {e}")
         return None
 
-def check_file_via_sftp(sftp: object, file_path: str) -> bool:
+def print_check_progress(current: int, total: int, label: str):
     """
-    Проверяет существование файла на сервере через SFTP
+    Выводит строку прогресса проверки
     """
-    try:
+    print(f"\r{label}: {current}/{total}", end="", flush=True)
+    if current == total:
+        print()
+
+def check_files_via_sftp(sftp: object, file_paths: List[str],
+                         workers: int = 1, transport: object = None) -> Dict[str, Optional[bool]]:
+    """
+    Проверяет существование файлов на сервере через SFTP
+    Пути группируются по папкам: каждая папка читается один раз,
+    поэтому число запросов к серверу равно числу папок, а не треков.
+    Если передан transport, папки читаются параллельно через workers SFTP-каналов
+    (не больше MAX_SFTP_CHANNELS); если канал открыть не удалось, поток читает
+    папки через общий sftp
+    Отсутствующими считаются только файлы несуществующих папок; если папку
+    прочитать не удалось (нет доступа, обрыв связи), для ее файлов возвращается None
+    """
+    paths_by_dir = {}
+    for file_path in file_paths:
         # Нормализуем путь для сервера
         server_path = file_path.replace('\\', '/')
-        
-        # Проверяем существование файла
-        sftp.stat(server_path)
-        return True
-    except FileNotFoundError:
-        return False
-    except Exception:
-        return False
+        directory, filename = posixpath.split(server_path)
+        paths_by_dir.setdefault(directory or '.', []).append((file_path, filename))
+    
+    channels = threading.local()
+    opened_channels = []
+    channels_lock = threading.Lock()
+    # Через один SFTP-клиент нельзя выполнять запросы из нескольких потоков одновременно
+    shared_lock = threading.Lock()
+    
+    def get_channel():
+        if transport is None or workers <= 1:
+            return sftp
+        channel = getattr(channels, 'sftp', None)
+        if channel is None:
+            try:
+                channel = transport.open_sftp_client()
+            except Exception as e:
+                # Сервер не дал открыть еще один канал (MaxSessions) - читаем через общий
+                print(f"\n✗ Не удалось открыть SFTP-канал ({e}), используется общий")
+                channel = sftp
+            else:
+                with channels_lock:
+                    opened_channels.append(channel)
+            channels.sftp = channel
+        return channel
+    
+    def list_directory(directory: str) -> Optional[set]:
+        try:
+            channel = get_channel()
+            if channel is sftp:
+                with shared_lock:
+                    entries = sftp.listdir_attr(directory)
+            else:
+                entries = channel.listdir_attr(directory)
+            return {entry.filename for entry in entries}
+        except FileNotFoundError:
+            # Папка отсутствует - все ее треки считаются отсутствующими
+            return set()
+        except Exception as e:
+            # Наличие треков неизвестно - они не должны попасть в список отсутствующих
+            print(f"\n✗ Ошибка чтения папки {directory}: {e}")
+            return None
+    
+    if transport is not None:
+        workers = min(workers, MAX_SFTP_CHANNELS)
+    
+    results = {}
+    directories = list(paths_by_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # map сохраняет порядок папок, результаты собираются по мере готовности
+            for done, (directory, names) in enumerate(
+                    zip(directories, executor.map(list_directory, directories)), 1):
+                for file_path, filename in paths_by_dir[directory]:
+                    results[file_path] = None if names is None else filename in names
+                print_check_progress(done, len(directories), "Проверено папок на сервере")
+    finally:
+        for channel in opened_channels:
+            channel.close()
+    
+    return results
+
+def clean_track_path(track_path: str) -> str:
+    """
+    Убирает кавычки вокруг пути трека
+    """
+    if track_path.startswith('"') and track_path.endswith('"'):
+        return track_path[1:-1]
+    return track_path
 
 def parse_pls_file(pls_path: Path) -> List[str]:
     """
     Парсит PLS файл и возвращает список путей к трекам
     Поддерживает формат: track=путь?;
+    Результат разбора сохраняется между запусками (см. playlist_index.PlaylistIndex)
     """
-    tracks = []
-    
     try:
-        # Пробуем разные кодировки
-        encodings = ['utf-8', 'cp1251', 'latin-1', 'utf-16']
-        
-        for encoding in encodings:
-            try:
-                with open(pls_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    break
-            except UnicodeDecodeError:
-                continue
-        else:
-            # Если все кодировки не подошли, читаем как бинарный
-            with open(pls_path, 'rb') as f:
-                content = f.read().decode('utf-8', errors='ignore')
-    
-        # Ищем все строки с track= (поддерживаем разные форматы)
-        # Форматы: track=путь?; или track=путь;
-        lines = content.splitlines()
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Проверяем, начинается ли строка с track=
-            if line.lower().startswith('track='):
-                # Извлекаем путь после track=
-                track_part = line[6:]  # Пропускаем "track="
-                
-                # Убираем вопросительный знак и точку с запятой в конце
-                if track_part.endswith('?;'):
-                    track_path = track_part[:-2]
-                elif track_part.endswith(';'):
-                    track_path = track_part[:-1]
-                elif track_part.endswith('?'):
-                    track_path = track_part[:-1]
-                else:
-                    track_path = track_part
-                
-                track_path = track_path.strip()
-                if track_path:
-                    tracks.append(track_path)
-    
+        return PlaylistIndex(str(pls_path)).paths
     except Exception as e:
         print(f"Ошибка чтения файла {pls_path}: {e}")
         return []
+
+def check_local_track(track_path: str) -> bool:
+    """
+    Проверяет существование файла трека на локальном диске или сетевом ресурсе
+    """
+    try:
+        # Обрабатываем пути с экранированием
+        track_path_clean = clean_track_path(track_path)
+        
+        # Локальная проверка
+        track_file = Path(track_path_clean)
+        
+        if track_file.exists() and track_file.is_file():
+            return True
+        
+        # Пробуем альтернативные пути
+        # 1. Без сетевого префикса
+        if track_path_clean.startswith('\\\\') or ':' in track_path_clean:
+            # Это уже абсолютный путь
+            return False
+        
+        # Пробуем как относительный путь от текущей директории
+        alt_path = Path.cwd() / track_path_clean
+        return alt_path.exists() and alt_path.is_file()
     
-    return tracks
+    except Exception:
+        # В случае ошибки считаем файл отсутствующим
+        return False
 
 def check_missing_tracks(track_paths: List[str], 
                          use_sftp: bool = False,
-                         sftp_connection: tuple = None) -> Tuple[List[str], List[str]]:
+                         sftp_connection: tuple = None,
+                         workers: int = None) -> Tuple[List[str], List[str], List[str]]:
     """
     Проверяет существование файлов треков
-    Возвращает два списка: существующие и отсутствующие треки
-    Поддерживает локальную и SFTP проверку
+    Возвращает три списка (в порядке плейлиста): существующие, отсутствующие
+    и непроверенные треки (папку на сервере не удалось прочитать)
+    Поддерживает локальную и SFTP проверку; workers - число одновременных проверок
     """
     existing_tracks = []
     missing_tracks = []
+    unchecked_tracks = []
+    workers = max(1, workers or CHECK_WORKERS)
     
     # Если используется SFTP, извлекаем соединение
     sftp = None
@@ -136,52 +216,32 @@ def check_missing_tracks(track_paths: List[str],
     if use_sftp and sftp_connection:
         sftp, transport = sftp_connection
     
-    for track_path in track_paths:
-        found = False
-        
-        try:
-            # Обрабатываем пути с экранированием
-            track_path_clean = track_path
-            if track_path_clean.startswith('"') and track_path_clean.endswith('"'):
-                track_path_clean = track_path_clean[1:-1]
-            
-            # Проверяем существование файла
-            if use_sftp and sftp:
-                # Проверка через SFTP
-                if check_file_via_sftp(sftp, track_path_clean):
-                    existing_tracks.append(track_path)
-                    found = True
-            else:
-                # Локальная проверка
-                track_file = Path(track_path_clean)
-                
-                if track_file.exists() and track_file.is_file():
-                    existing_tracks.append(track_path)
-                    found = True
-                else:
-                    # Пробуем альтернативные пути
-                    # 1. Без сетевого префикса
-                    if track_path_clean.startswith('\\\\') or ':' in track_path_clean:
-                        # Это уже абсолютный путь
-                        pass
-                    else:
-                        # Пробуем как относительный путь от текущей директории
-                        alt_path = Path.cwd() / track_path_clean
-                        if alt_path.exists() and alt_path.is_file():
-                            existing_tracks.append(track_path)
-                            found = True
-            
-            # Если файл не найден
-            if not found:
-                missing_tracks.append(track_path)
-                        
-        except Exception as e:
-            # В случае ошибки считаем файл отсутствующим
+    if use_sftp and sftp:
+        # Проверка через SFTP (по папкам)
+        found_on_server = check_files_via_sftp(
+            sftp, [clean_track_path(track) for track in track_paths], workers, transport)
+        found_flags = [found_on_server.get(clean_track_path(track)) for track in track_paths]
+    else:
+        found_flags = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map возвращает результаты в исходном порядке плейлиста
+            for found in executor.map(check_local_track, track_paths):
+                found_flags.append(found)
+                if len(found_flags) % 100 == 0 or len(found_flags) == len(track_paths):
+                    print_check_progress(len(found_flags), len(track_paths), "Проверено треков")
+    
+    for track_path, found in zip(track_paths, found_flags):
+        if found is None:
+            unchecked_tracks.append(track_path)
+        elif found:
+            existing_tracks.append(track_path)
+        else:
             missing_tracks.append(track_path)
     
-    return existing_tracks, missing_tracks
+    return existing_tracks, missing_tracks, unchecked_tracks
 
-def print_report(pls_file: str, all_tracks: List[str], existing_tracks: List[str], missing_tracks: List[str]):
+def print_report(pls_file: str, all_tracks: List[str], existing_tracks: List[str], missing_tracks: List[str],
+                 unchecked_tracks: List[str] = ()):
     """
     Выводит отчет о проверке
     """
@@ -192,6 +252,8 @@ def print_report(pls_file: str, all_tracks: List[str], existing_tracks: List[str
     print(f"Всего треков в плейлисте: {len(all_tracks)}")
     print(f"Существующие треки: {len(existing_tracks)}")
     print(f"Отсутствующие треки: {len(missing_tracks)}")
+    if unchecked_tracks:
+        print(f"Не удалось проверить (ошибка чтения папки на сервере): {len(unchecked_tracks)}")
     
     if missing_tracks:
         print(f"\n{'='*60}")
@@ -200,6 +262,14 @@ def print_report(pls_file: str, all_tracks: List[str], existing_tracks: List[str
         
         for i, track in enumerate(missing_tracks, 1):
             print(f"{i:3d}. {track}")
+    
+    if unchecked_tracks:
+        print(f"\n{'='*60}")
+        print("НЕПРОВЕРЕННЫЕ ТРЕКИ (остаются в плейлисте):")
+        print(f"{'='*60}")
+        
+        for i, track in enumerate(unchecked_tracks, 1):
+            print(f"{i:3d}. {track}")
 
 def save_playlist(pls_path: Path, tracks: List[str], backup: bool = True) -> bool:
     """
@@ -219,21 +289,10 @@ def save_playlist(pls_path: Path, tracks: List[str], backup: bool = True) -> boo
             if input("Продолжить без резервной копии? (y/n): ").lower() != 'y':
                 return False
     
-    # Создаем новое содержимое плейлиста в оригинальном формате
-    new_content = ""
-    
-    for track in tracks:
-        # Сохраняем в оригинальном формате: track=путь?;
-        # Проверяем, есть ли уже ? в конце
-        if track.endswith('?'):
-            new_content += f"track={track};\n"
-        else:
-            new_content += f"track={track}?;\n"
-    
-    # Сохраняем обновленный плейлист
+    # Сохраняем обновленный плейлист в оригинальном формате: track=путь?;
+    # Запись идет во временный файл, который затем атомарно заменяет плейлист
     try:
-        with open(pls_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        rewrite_playlist(str(pls_path), tracks)
         
         print(f"\n✓ Плейлист успешно обновлен: {pls_path}")
         return True
@@ -382,16 +441,25 @@ def main():
     print("Формат: track=путь?;")
     print(f"{'='*60}")
     
-    # Проверяем аргументы командной строки
-    if len(sys.argv) != 2:
+    # Проверяем аргументы командной строки (ключи вида --workers=N отделяем от пути)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    workers = CHECK_WORKERS
+    for option in sys.argv[1:]:
+        if option.startswith('--workers='):
+            try:
+                workers = max(1, int(option.split('=', 1)[1]))
+            except ValueError:
+                print(f"Некорректное значение {option}, используется {CHECK_WORKERS}")
+    
+    if len(args) != 1:
         print("\nИспользование:")
-        print("python CheckPlaylist.py <путь_к_плейлисту.pls>")
+        print("python CheckPlaylist.py <путь_к_плейлисту.pls> [--workers=N]")
         print("\nПример:")
         print('python CheckPlaylist.py "list.pls"')
-        print('python CheckPlaylist.py "O:\\путь\\к\\playlist.pls"')
+        print('python CheckPlaylist.py "O:\\путь\\к\\playlist.pls" --workers=16')
         return
     
-    pls_path = Path(sys.argv[1])
+    pls_path = Path(args[0])
     
     # Проверяем существование файла плейлиста
     if not pls_path.exists():
@@ -422,7 +490,8 @@ def main():
     
     # Проверяем существование треков
     print("Проверка существования треков...")
-    existing_tracks, missing_tracks = check_missing_tracks(all_tracks, use_sftp, sftp_connection)
+    existing_tracks, missing_tracks, unchecked_tracks = check_missing_tracks(
+        all_tracks, use_sftp, sftp_connection, workers)
     
     # Закрываем SFTP соединение если оно было открыто
     if sftp_connection:
@@ -430,18 +499,25 @@ def main():
         sftp_connection[1].close()
     
     # Выводим отчет
-    print_report(str(pls_path), all_tracks, existing_tracks, missing_tracks)
+    print_report(str(pls_path), all_tracks, existing_tracks, missing_tracks, unchecked_tracks)
     
     # Если есть отсутствующие треки, предлагаем действия
     if missing_tracks:
+        # Непроверенные треки к удалению не предлагаются и остаются в плейлисте
+        missing_set = set(missing_tracks)
+        kept_tracks = [track for track in all_tracks if track not in missing_set]
+        
         # Показываем меню действий
-        success = remove_missing_tracks_interactive(pls_path, existing_tracks, missing_tracks)
+        success = remove_missing_tracks_interactive(pls_path, kept_tracks, missing_tracks)
         
         if success:
             print("\n✓ Плейлист успешно обновлен!")
         else:
             print("\n✗ Плейлист не был изменен")
     
+    elif unchecked_tracks:
+        print(f"\n{'='*60}")
+        print("Отсутствующих треков не найдено, но часть треков проверить не удалось. Изменения не вносятся.")
     else:
         print(f"\n{'='*60}")
         print("✓ Все треки существуют. Изменения не требуются.")
@@ -1,25 +1,55 @@
 import os
 import sys
-import re
 import subprocess
 import shutil
-import stat
+import posixpath
+import sqlite3
 import time
 from pathlib import Path, PurePosixPath
 from datetime import datetime
 from getpass import getpass
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common'))
+
+from track_index import TrackIndex
+from sftp_upload import SftpUploadPool, UploadJob
+from remote_inventory import RemoteDirCache, scan_remote_inventory, build_track_map
+from content_dedup import ContentDeduplicator, FileEntry, HashCache
+from local_copy import CopyJob, LocalCopyPool
+from audio_scan import scan_audio_files
+from track_names import NORMALIZER_VERSION, normalize_track_name, normalize_track_names
+from near_duplicates import NearDuplicateIndex
+from tag_cache import TagCache
+
 AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus'}
 SERVER_HOSTNAME = "r.dlike.ru"
 SERVER_USERNAME = "admin"
 SERVER_PORT = 22
 
-DATE_PREFIX_PATTERNS = [
-    re.compile(r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}_'),
-    re.compile(r'^\d{4}-\d{2}-\d{2}_\d{1,2}-\d{2}_'),
-    re.compile(r'^\d{4}-\d{2}-\d{2}_'),
-    re.compile(r'^\d{4}-\d{2}-\d{2}\s+'),
-]
+# Постоянный индекс целевой папки (ускоряет повторные запуски локального копирования)
+USE_TRACK_INDEX = True
+
+# Количество одновременных копирований при локальном копировании
+LOCAL_COPY_WORKERS = 4
+
+# Параллельная загрузка на сервер: число SFTP-каналов, размер очереди и повторы при ошибке
+SFTP_CHANNELS = 4
+SFTP_QUEUE_SIZE = 16
+SFTP_RETRIES = 3
+# Проверка загруженного файла перед переименованием .part: 'size' или 'hash' (SHA-256 на сервере)
+SFTP_VERIFY = 'size'
+
+# Список файлов на сервере: одной командой find (если разрешено) или обходом папок в REMOTE_SCAN_WORKERS каналов
+USE_REMOTE_FIND = True
+REMOTE_SCAN_WORKERS = 8
+
+# Поиск дубликатов по содержимому файлов вместо имени (также включается ключом --content)
+CONTENT_DEDUP = False
+
+# Предупреждение о похожих треках в целевой папке (feat., знаки препинания, транслит, опечатки);
+# такие файлы копируются, но перечисляются в отчете. Порог - мера похожести от 0 до 1
+NEAR_DUPLICATES = True
+NEAR_DUPLICATE_THRESHOLD = 0.7
 
 def get_terminal_width():
     """Получить ширину терминала"""
@@ -63,19 +93,26 @@ def print_report(title, new_count, skipped_count, new_tracks=None, skipped_track
         if len(skipped_tracks) > 10:
             print(f"  ... и еще {len(skipped_tracks) - 10} файлов")
 
-def normalize_track_name(track_name):
-    original_name = track_name
-    
-    for pattern in DATE_PREFIX_PATTERNS:
-        match = pattern.match(original_name)
-        if match:
-            original_name = original_name[match.end():].strip()
-    
-    return original_name.lower() if original_name else track_name.lower()
+def print_near_duplicates(near_duplicates):
+    if not near_duplicates:
+        return
+    print(f"\nВозможные дубликаты (скопированы, проверьте вручную): {len(near_duplicates)}")
+    for track, similar, similarity in near_duplicates[:10]:
+        print(f"  ? {track} ~ {similar} ({similarity:.0%})")
+    if len(near_duplicates) > 10:
+        print(f"  ... и еще {len(near_duplicates) - 10} файлов")
 
 def add_datetime_prefix(filename):
     return datetime.now().strftime("%Y-%m-%d_%H-%M_") + filename
 
+def format_size(size):
+    """Форматирует размер в байтах в читаемый вид"""
+    for unit in ('Б', 'КБ', 'МБ'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
 def check_and_install_paramiko():
     try:
         import paramiko
@@ -96,17 +133,26 @@ def get_existing_tracks_local(target_folder):
     if not target_path.exists():
         return existing_tracks
     
+    if USE_TRACK_INDEX:
+        try:
+            with TrackIndex(target_folder, normalize_track_name, AUDIO_EXTENSIONS,
+                            normalizer_version=NORMALIZER_VERSION) as index:
+                stats = index.refresh()
+                print(f"Индекс целевой папки: проверено папок {stats['dirs_checked']}, "
+                      f"перечитано {stats['dirs_listed']}")
+                return index.get_tracks()
+        except Exception as e:
+            print(f"Индекс недоступен ({e}), выполняется полное сканирование")
+    
     try:
-        for file_path in target_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in AUDIO_EXTENSIONS:
-                normalized_name = normalize_track_name(file_path.stem)
-                existing_tracks[normalized_name] = file_path.name
+        for audio_file in scan_audio_files(target_folder, AUDIO_EXTENSIONS, with_stat=False):
+            existing_tracks[normalize_track_name(audio_file.stem)] = audio_file.name
     except Exception:
         pass
     
     return existing_tracks
 
-def get_existing_tracks_remote(sftp, server_folder):
+def get_existing_tracks_remote(sftp, server_folder, inventory=None):
     existing_tracks = {}
     
     try:
@@ -116,39 +162,147 @@ def get_existing_tracks_remote(sftp, server_folder):
         print(f"Папка на сервере не существует: {server_folder}")
         return existing_tracks
     
-    def scan_directory(current_path):
-        try:
-            for entry in sftp.listdir_attr(current_path):
-                full_path = f"{current_path}/{entry.filename}" if current_path != '/' else f"/{entry.filename}"
-                
-                if stat.S_ISDIR(entry.st_mode):
-                    scan_directory(full_path)
-                else:
-                    file_ext = Path(entry.filename).suffix.lower()
-                    if file_ext in AUDIO_EXTENSIONS:
-                        normalized_name = normalize_track_name(Path(entry.filename).stem)
-                        existing_tracks[normalized_name] = entry.filename
-        except Exception:
-            pass
-    
-    scan_directory(server_folder)
-    return existing_tracks
+    if inventory is None:
+        inventory = scan_remote_inventory(
+            sftp.get_channel().get_transport(),
+            server_folder,
+            workers=REMOTE_SCAN_WORKERS,
+            use_find=USE_REMOTE_FIND
+        )
+        print_inventory_errors(inventory)
+    
+    return build_track_map(inventory.audio_files(AUDIO_EXTENSIONS), normalize_track_name)
+
+def print_inventory_errors(inventory):
+    """Вывести ошибки, возникшие при получении списка файлов на сервере"""
+    if not inventory.errors:
+        return
+    print(f"\nПредупреждение: при чтении папок на сервере возникло ошибок: {len(inventory.errors)}")
+    for error in inventory.errors[:5]:
+        print(f"  ! {error}")
+    if len(inventory.errors) > 5:
+        print(f"  ... и еще {len(inventory.errors) - 5}")
+
+def build_near_duplicate_index(existing_tracks, cached_tags=None):
+    """
+    Индекс похожих имен по трекам целевой папки (нормализованное имя -> имя файла)
+
+    cached_tags - теги треков по нормализованному имени (из кэша тегов AddNewTracks),
+    треки без тегов сравниваются только по имени
+    """
+    started = time.perf_counter()
+    cached_tags = cached_tags or {}
+    index = NearDuplicateIndex(NEAR_DUPLICATE_THRESHOLD)
+    for normalized_name, filename in existing_tracks.items():
+        index.add(filename, normalized_name, *cached_tags.get(normalized_name, ()))
+    print(f"Индекс похожих имен: {len(index)} треков за {time.perf_counter() - started:.1f} с")
+    return index
+
+def load_cached_tags(target_folder):
+    """Теги треков целевой папки, уже прочитанные AddNewTracks (из общего кэша тегов)"""
+    try:
+        with TagCache() as tag_cache:
+            return tag_cache.tags_by_name(str(target_folder))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Кэш тегов недоступен ({e}), похожие треки ищутся только по именам")
+        return {}
+
+def find_near_duplicate(near_index, file_path, normalized_name, new_filename, near_duplicates):
+    """Ищет похожий трек по имени файла и добавляет файл в индекс"""
+    similar = near_index.find_similar(normalized_name)
+    if similar is not None:
+        near_duplicates.append((file_path.name, *similar))
+    near_index.add(new_filename, normalized_name)
 
 def get_audio_files_list(source_folder):
     """Получить список всех аудиофайлов в исходной папке"""
-    source_path = Path(source_folder)
-    audio_files = []
-    
-    if not source_path.exists():
-        return audio_files
+    if not os.path.exists(source_folder):
+        return []
     
-    for file_path in source_path.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in AUDIO_EXTENSIONS:
-            audio_files.append(file_path)
+    # Порядок обхода параллельного сканирования не определен - сортируем для предсказуемого вывода
+    return sorted(Path(audio_file.path)
+                  for audio_file in scan_audio_files(source_folder, AUDIO_EXTENSIONS, with_stat=False))
+
+def local_file_entry(file_path):
+    """Описание локального файла для поиска дубликатов по содержимому"""
+    file_path = str(file_path)
+    file_stat = os.stat(file_path)
+    return FileEntry(
+        os.path.normcase(os.path.abspath(file_path)),
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+        lambda: open(file_path, 'rb'),
+        os.path.basename(file_path)
+    )
+
+def local_file_entry_from_index(path, size, mtime_ns):
+    """
+    Описание файла по записи индекса целевой папки (без обращения к диску)
+
+    Файл, перезаписанный на месте, не меняет время изменения папки, и индекс его
+    не перечитывает - поэтому размер и время изменения перепроверяются (os.stat),
+    но только у файлов, с которыми действительно сравнивается содержимое.
+    """
+    def restat():
+        file_stat = os.stat(path)
+        return file_stat.st_size, file_stat.st_mtime_ns
+    
+    return FileEntry(os.path.normcase(path), size, mtime_ns,
+                     lambda: open(path, 'rb'), os.path.basename(path), restat)
+
+def get_existing_files_local(target_folder):
+    """Получить описания всех аудиофайлов целевой папки для поиска по содержимому"""
+    if USE_TRACK_INDEX:
+        try:
+            with TrackIndex(target_folder, normalize_track_name, AUDIO_EXTENSIONS,
+                            normalizer_version=NORMALIZER_VERSION) as index:
+                index.refresh()
+                return [local_file_entry_from_index(path, size, mtime_ns)
+                        for path, size, mtime_ns in index.iter_files()]
+        except Exception as e:
+            print(f"Индекс недоступен ({e}), выполняется полное сканирование")
     
-    return audio_files
+    # Размер и время изменения берутся из данных сканирования, без повторного stat
+    return [local_file_entry_from_index(os.path.abspath(audio_file.path), audio_file.size, audio_file.mtime_ns)
+            for audio_file in scan_audio_files(target_folder, AUDIO_EXTENSIONS)]
+
+def find_duplicate_name(deduplicator, file_path, normalized_name, existing_tracks):
+    """
+    Ищет дубликат файла: по содержимому (если включено) или по имени
 
-def copy_files_local(source_folder, target_folder):
+    Если исходный файл не удалось прочитать, для него решение принимается
+    по имени (нечитаемые файлы целевой папки пропускает ContentDeduplicator).
+
+    Returns:
+        Имя дубликата для отчета или None, если файл новый
+    """
+    if deduplicator is not None:
+        try:
+            source_entry = local_file_entry(file_path)
+            duplicate = deduplicator.find_duplicate(source_entry)
+        except OSError as e:
+            clear_line()
+            print(f"\nНе удалось сравнить содержимое {file_path.name} ({e}), проверка по имени")
+        else:
+            if duplicate is not None:
+                return duplicate.name
+            deduplicator.add(source_entry)
+            return None
+    return normalized_name if normalized_name in existing_tracks else None
+
+def print_unreadable(deduplicator):
+    if not deduplicator.unreadable:
+        return
+    print(f"Не удалось прочитать для сравнения содержимого (пропущены): {len(deduplicator.unreadable)}")
+    for key, error in list(deduplicator.unreadable.items())[:5]:
+        print(f"  ! {key}: {error}")
+
+def remote_file_entry(sftp, hostname, path, size, mtime):
+    """Описание файла на сервере для поиска дубликатов по содержимому"""
+    return FileEntry(f"sftp://{hostname}{path}", size, mtime,
+                     lambda: sftp.open(path, 'rb'), posixpath.basename(path))
+
+def copy_files_local(source_folder, target_folder, content_dedup=False):
     source_path = Path(source_folder)
     target_path = Path(target_folder)
     
@@ -159,55 +313,96 @@ def copy_files_local(source_folder, target_folder):
     target_path.mkdir(parents=True, exist_ok=True)
     existing_tracks = get_existing_tracks_local(target_folder)
     
+    deduplicator = None
+    if content_dedup:
+        deduplicator = ContentDeduplicator(HashCache())
+        for entry in get_existing_files_local(target_folder):
+            deduplicator.add(entry)
+    
     # Получаем список всех аудиофайлов
     audio_files = get_audio_files_list(source_folder)
     total_files = len(audio_files)
     
     if total_files == 0:
         print("В исходной папке не найдено аудиофайлов")
+        if deduplicator is not None:
+            deduplicator.cache.close()
         return False
     
     print(f"\nНайдено аудиофайлов: {total_files}")
     
+    near_index = build_near_duplicate_index(existing_tracks, load_cached_tags(target_folder)) \
+        if NEAR_DUPLICATES else None
+    
     new_tracks = []
     skipped_tracks = []
+    near_duplicates = []
     processed = 0
+    created_dirs = set()
     
-    for file_path in audio_files:
+    def on_copy_done(job):
+        nonlocal processed
         processed += 1
-        track_name = file_path.stem
-        normalized_name = normalize_track_name(track_name)
-        
-        # Отображаем прогресс
-        print_progress(file_path.name, processed, total_files)
-        
-        if normalized_name in existing_tracks:
-            skipped_tracks.append((file_path.name, normalized_name))
-            continue
-        
-        relative_path = file_path.relative_to(source_path)
-        target_file_path = target_path / relative_path
-        
-        new_filename = add_datetime_prefix(target_file_path.name)
-        target_file_path = target_file_path.parent / new_filename
-        
-        target_file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        try:
-            shutil.copy2(file_path, target_file_path)
-            new_tracks.append(new_filename)
-            existing_tracks[normalized_name] = new_filename
-        except Exception as e:
+        if job.error is None:
+            new_tracks.append(job.context)
+        else:
             clear_line()
-            print(f"\nОшибка при копировании {file_path.name}: {e}")
-            continue
+            print(f"\nОшибка при копировании {job.display_name}: {job.error}")
+        print_progress(job.display_name, processed, total_files)
+    
+    pool = LocalCopyPool(workers=LOCAL_COPY_WORKERS, on_done=on_copy_done)
+    pool.start()
+    
+    try:
+        # Имена нормализуются заранее, одним пакетом
+        normalized_names = normalize_track_names(file_path.stem for file_path in audio_files)
+        for file_path, normalized_name in zip(audio_files, normalized_names):
+            duplicate_name = find_duplicate_name(deduplicator, file_path, normalized_name, existing_tracks)
+            if duplicate_name is not None:
+                with pool.lock:
+                    processed += 1
+                    skipped_tracks.append((file_path.name, duplicate_name))
+                    # Отображаем прогресс
+                    print_progress(file_path.name, processed, total_files)
+                continue
+            
+            relative_path = file_path.relative_to(source_path)
+            target_file_path = target_path / relative_path
+            
+            new_filename = add_datetime_prefix(target_file_path.name)
+            target_file_path = target_file_path.parent / new_filename
+            
+            if target_file_path.parent not in created_dirs:
+                target_file_path.parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(target_file_path.parent)
+            
+            if near_index is not None:
+                find_near_duplicate(near_index, file_path, normalized_name, new_filename,
+                                    near_duplicates)
+            
+            # Трек считается добавленным сразу, чтобы дубликаты в исходной папке не копировались дважды
+            existing_tracks[normalized_name] = new_filename
+            pool.submit(CopyJob(str(file_path), str(target_file_path), file_path.name,
+                                context=new_filename))
+    finally:
+        pool.join()
+        # Хэши, вычисленные до ошибки или Ctrl+C, сохраняются
+        if deduplicator is not None:
+            deduplicator.cache.close()
     
     # Очищаем строку прогресса
     clear_line()
+    if deduplicator is not None:
+        print_unreadable(deduplicator)
     print_report("ЛОКАЛЬНОЕ КОПИРОВАНИЕ", len(new_tracks), len(skipped_tracks), new_tracks, skipped_tracks)
+    print_near_duplicates(near_duplicates)
+    print(f"\nСкопировано: {format_size(pool.bytes_copied)} за {pool.elapsed:.1f} с "
+          f"({format_size(pool.throughput)}/с, потоков: {pool.workers})")
+    if pool.failed:
+        print(f"Ошибок копирования: {len(pool.failed)}")
     return len(new_tracks) > 0 or len(skipped_tracks) > 0
 
-def copy_files_remote(source_folder, server_folder, hostname, username, password):
+def copy_files_remote(source_folder, server_folder, hostname, username, password, content_dedup=False):
     source_path = Path(source_folder)
     
     if not source_path.exists():
@@ -230,7 +425,27 @@ def copy_files_remote(source_folder, server_folder, hostname, username, password
         print(f"Папка на сервере не существует: {server_folder}")
         return False
     
-    existing_tracks = get_existing_tracks_remote(sftp, server_folder)
+    inventory = scan_remote_inventory(
+        transport,
+        server_folder,
+        workers=REMOTE_SCAN_WORKERS,
+        use_find=USE_REMOTE_FIND
+    )
+    print_inventory_errors(inventory)
+    if not inventory.complete:
+        # В непрочитанных папках могут быть дубликаты - файлы были бы загружены повторно
+        print("Список файлов на сервере получен не полностью, копирование отменено")
+        sftp.close()
+        transport.close()
+        return False
+    existing_tracks = get_existing_tracks_remote(sftp, server_folder, inventory)
+    known_dirs = RemoteDirCache(inventory.dirs)
+    
+    deduplicator = None
+    if content_dedup:
+        deduplicator = ContentDeduplicator(HashCache())
+        for path, size, mtime in inventory.audio_files(AUDIO_EXTENSIONS):
+            deduplicator.add(remote_file_entry(sftp, hostname, path, size, mtime))
     
     # Получаем список всех аудиофайлов
     audio_files = get_audio_files_list(source_folder)
@@ -238,70 +453,99 @@ def copy_files_remote(source_folder, server_folder, hostname, username, password
     
     if total_files == 0:
         print("В исходной папке не найдено аудиофайлов")
+        if deduplicator is not None:
+            deduplicator.cache.close()
         sftp.close()
         transport.close()
         return False
     
     print(f"\nНайдено аудиофайлов: {total_files}")
     
+    near_index = build_near_duplicate_index(existing_tracks) if NEAR_DUPLICATES else None
+    
     new_tracks = []
     skipped_tracks = []
+    near_duplicates = []
     processed = 0
     
-    for file_path in audio_files:
+    def on_upload_done(job):
+        nonlocal processed
         processed += 1
-        normalized_name = normalize_track_name(file_path.stem)
-        
-        # Отображаем прогресс
-        print_progress(file_path.name, processed, total_files)
-        
-        if normalized_name in existing_tracks:
-            skipped_tracks.append((file_path.name, normalized_name))
-            continue
-        
-        relative_path = file_path.relative_to(source_path)
-        relative_posix = PurePosixPath(str(relative_path).replace('\\', '/'))
-        
-        new_filename = add_datetime_prefix(relative_posix.name)
-        server_file_path = str(PurePosixPath(server_folder) / relative_posix.parent / new_filename)
-        server_dir = str(PurePosixPath(server_file_path).parent).replace('\\', '/')
-        server_file_path = server_file_path.replace('\\', '/')
-        
-        try:
-            sftp.stat(server_dir)
-        except FileNotFoundError:
-            parent_dirs = []
-            current_dir = server_dir
+        if job.error is None:
+            new_tracks.append(job.context)
+        else:
+            clear_line()
+            print(f"\nОшибка при копировании {job.display_name}: {job.error}")
+        print_progress(job.display_name, processed, total_files)
+    
+    upload_jobs = []
+    try:
+        normalized_names = normalize_track_names(file_path.stem for file_path in audio_files)
+        for file_path, normalized_name in zip(audio_files, normalized_names):
+            duplicate_name = find_duplicate_name(deduplicator, file_path, normalized_name, existing_tracks)
+            if duplicate_name is not None:
+                processed += 1
+                skipped_tracks.append((file_path.name, duplicate_name))
+                continue
             
-            while True:
-                try:
-                    sftp.stat(current_dir)
-                    break
-                except FileNotFoundError:
-                    parent_dirs.append(current_dir)
-                    current_dir = str(PurePosixPath(current_dir).parent)
-                    if current_dir in ('/', '', '.'):
-                        break
+            relative_path = file_path.relative_to(source_path)
+            relative_posix = PurePosixPath(str(relative_path).replace('\\', '/'))
             
-            for dir_to_create in reversed(parent_dirs):
-                try:
-                    sftp.mkdir(dir_to_create)
-                except Exception:
-                    continue
-        
-        try:
-            time.sleep(0.1)
-            sftp.put(str(file_path), server_file_path)
-            new_tracks.append(new_filename)
+            new_filename = add_datetime_prefix(relative_posix.name)
+            server_file_path = str(PurePosixPath(server_folder) / relative_posix.parent / new_filename)
+            server_file_path = server_file_path.replace('\\', '/')
+            
+            if near_index is not None:
+                find_near_duplicate(near_index, file_path, normalized_name, new_filename,
+                                    near_duplicates)
+            
+            # Трек считается добавленным сразу, чтобы дубликаты в исходной папке не загружались дважды
             existing_tracks[normalized_name] = new_filename
-        except Exception as e:
-            clear_line()
-            print(f"\nОшибка при копировании {file_path.name}: {e}")
-            continue
+            upload_jobs.append(UploadJob(str(file_path), server_file_path, file_path.name,
+                                         context=new_filename))
+    finally:
+        # Хэши, вычисленные до ошибки или Ctrl+C, сохраняются
+        if deduplicator is not None:
+            deduplicator.cache.close()
+    
+    if deduplicator is not None:
+        print(f"Прочитано для сравнения содержимого: {format_size(deduplicator.hashed_bytes)}")
+        print_unreadable(deduplicator)
+    
+    # Создаем все недостающие папки до начала загрузки
+    created_count, mkdir_errors = known_dirs.create_missing(
+        sftp, (posixpath.dirname(job.remote_path) for job in upload_jobs))
+    if created_count:
+        print(f"Создано папок на сервере: {created_count}")
+    for error in mkdir_errors:
+        print(f"Ошибка создания папки {error}")
+    
+    pool = SftpUploadPool(
+        transport,
+        channels=SFTP_CHANNELS,
+        queue_size=SFTP_QUEUE_SIZE,
+        retries=SFTP_RETRIES,
+        verify=SFTP_VERIFY,
+        on_done=on_upload_done
+    )
+    pool.start()
+    
+    try:
+        for job in upload_jobs:
+            pool.submit(job)
+    finally:
+        pool.join()
     
     # Очищаем строку прогресса
     clear_line()
     print_report("УДАЛЕННОЕ КОПИРОВАНИЕ", len(new_tracks), len(skipped_tracks), new_tracks, skipped_tracks)
+    print_near_duplicates(near_duplicates)
+    print(f"\nПередано: {format_size(pool.bytes_sent)} за {pool.elapsed:.1f} с "
+          f"({format_size(pool.throughput)}/с, каналов: {pool.channels})")
+    if pool.resumed_count:
+        print(f"Докачано после обрыва: {pool.resumed_count}")
+    if pool.failed:
+        print(f"Ошибок загрузки: {len(pool.failed)}")
     
     sftp.close()
     transport.close()
@@ -325,6 +569,13 @@ def select_mode():
 def main():
     print_header("АУДИО КОПИРОВАТЕЛЬ")
     
+    # Ключи вида --content отделяем от путей
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = {arg for arg in sys.argv[1:] if arg.startswith('--')}
+    content_dedup = CONTENT_DEDUP or '--content' in options
+    if content_dedup:
+        print("Поиск дубликатов по содержимому файлов")
+    
     mode = select_mode()
     
     if mode == 'remote':
@@ -333,28 +584,28 @@ def main():
             sys.exit(1)
     
     if mode == 'local':
-        if len(sys.argv) != 3:
+        if len(args) != 2:
             print("\nИспользование для локального копирования:")
-            print("python CopyAudio.py <исходная_папка> <целевая_папка>")
+            print("python CopyAudio.py <исходная_папка> <целевая_папка> [--content]")
             print("\nПример:")
             print('python CopyAudio.py "D:\\Music\\Source" "D:\\Music\\Backup"')
             return
         
-        source_folder = sys.argv[1]
-        target_folder = sys.argv[2]
+        source_folder = args[0]
+        target_folder = args[1]
         
-        success = copy_files_local(source_folder, target_folder)
+        success = copy_files_local(source_folder, target_folder, content_dedup)
         
     else:
-        if len(sys.argv) != 3:
+        if len(args) != 2:
             print("\nИспользование для удаленного копирования:")
-            print("python CopyAudio.py <исходная_папка> <серверная_папка>")
+            print("python CopyAudio.py <исходная_папка> <серверная_папка> [--content]")
             print("\nПример:")
             print('python CopyAudio.py "D:\\Music" "/home/admin/music"')
             return
         
-        source_folder = sys.argv[1]
-        server_folder = sys.argv[2]
+        source_folder = args[0]
+        server_folder = args[1]
         
         password = getpass("Введите пароль для сервера: ")
         
@@ -367,7 +618,8 @@ def main():
             server_folder, 
             SERVER_HOSTNAME, 
             SERVER_USERNAME, 
-            password
+            password,
+            content_dedup
         )
     
     sys.exit(0 if success else 1)
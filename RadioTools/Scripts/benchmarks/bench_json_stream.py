@@ -0,0 +1,131 @@
+"""
+Потоковый разбор ответа get-alltracks: проверка при любом разбиении на блоки и скорость
+
+Ответ сервера разбирается JsonStream по мере поступления блоков, и граница
+блока может прийти в любое место - в том числе внутрь числа (1700000000. + 125).
+Проверяется, что ServerCatalog._parse дает тот же результат, что json.loads
+всего ответа, при блоках по 1, 2, 3, 7 байт и по 64 КБ.
+
+Использование:
+  python bench_json_stream.py [--tracks=100000] [--repeat=3]
+
+Код возврата 1 - если потоковый разбор расходится с json.loads.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'common'))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'AddNewTracks', 'modules'))
+
+from server_catalog import ServerCatalog, normalize_server_path
+from synthetic import iter_library
+
+CHUNK_SIZES = (1, 2, 3, 7, 64 * 1024)
+
+# Ответы, на которых важна граница блока: числа с дробью и экспонентой,
+# экранированные и не-ASCII строки, вложенные объекты, BOM
+EDGE_CASES = [
+    '[]',
+    '{"tracks": [], "cursor": 0}',
+    '{"cursor": 1700000000.125, "tracks": [{"file_path": "/a/1.mp3", "id": 1}]}',
+    '{"tracks": [{"file_path": "/a/1.mp3", "rating": -1.5e-3}], "cursor": 2E+10}',
+    '{"meta": {"total": 1e2, "list": [1, 2.50, -0, true, null]}, "tracks": [{"file_path": "/x.mp3"}], '
+    '"cursor": "c-1"}',
+    '[{"file_path": "/Жанр/Исполнитель/Трек \\u2013 1.mp3", "duration": 215.0}, '
+    '{"file_path": "/b\\\\c.mp3", "duration": 3.25e+2}, {"title": "без пути"}]',
+    '\ufeff[{"file_path": " /trim/me.mp3 ", "size": 12345678901234567890}]',
+]
+
+
+class FakeResponse:
+    """Ответ requests с телом, выдаваемым блоками заданного размера"""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+def expected_result(text: str):
+    """Результат ServerCatalog._parse, вычисленный по json.loads всего ответа"""
+    data = json.loads(text.lstrip('\ufeff'))
+    tracks, cursor, is_delta = (data, None, False) if isinstance(data, list) else \
+        (data['tracks'], str(data['cursor']), True)
+    paths = {normalize_server_path(track['file_path'])
+             for track in tracks if isinstance(track, dict) and track.get('file_path')}
+    return paths, cursor, is_delta
+
+
+def synthetic_response(count: int) -> str:
+    tracks = [{'id': i, 'file_path': f"/srv/radio/music/{genre}/{artist}/{name}",
+               'artist': artist, 'title': name, 'duration': 180.5 + i % 60, 'added': 1700000000.125 + i}
+              for i, (genre, artist, name) in enumerate(iter_library(count))]
+    return json.dumps({'tracks': tracks, 'cursor': 1700000000.125 + count}, ensure_ascii=False)
+
+
+def check_round_trip(catalog: ServerCatalog, text: str, chunk_sizes=CHUNK_SIZES) -> int:
+    """Сравнивает потоковый разбор с json.loads; возвращает число расхождений"""
+    expected = expected_result(text)
+    body = text.encode('utf-8')
+    mismatches = 0
+    for chunk_size in chunk_sizes:
+        try:
+            result = catalog._parse(FakeResponse(body, chunk_size))
+        except Exception as e:
+            result = f"ошибка: {e}"
+        if result != expected:
+            mismatches += 1
+            print(f"  РАСХОЖДЕНИЕ (блоки по {chunk_size} байт) {text[:60]!r}...: {str(result)[:120]}")
+    return mismatches
+
+
+def measure(name, func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {name:<44} {best * 1000:9.1f} мс")
+    return best
+
+
+def main():
+    options = {'tracks': 100_000, 'repeat': 3}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            options[name] = int(value)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        catalog = ServerCatalog('http://127.0.0.1/get-alltracks',
+                                snapshot_path=os.path.join(temp_dir, 'catalog.json'))
+
+        print(f"Проверка разбора при блоках по {', '.join(map(str, CHUNK_SIZES))} байт:")
+        mismatches = sum(check_round_trip(catalog, text) for text in EDGE_CASES)
+        # Синтетический каталог побайтно - на небольшой части, целиком - крупными блоками
+        mismatches += check_round_trip(catalog, synthetic_response(200))
+        text = synthetic_response(options['tracks'])
+        mismatches += check_round_trip(catalog, text, chunk_sizes=(4093, 64 * 1024))
+        print(f"  расхождений: {mismatches}")
+
+        body = text.encode('utf-8')
+        repeat = options['repeat']
+        print(f"\nСкорость на ответе из {options['tracks']} треков ({len(body) / 1024 / 1024:.1f} МБ), "
+              f"лучший результат из {repeat}:")
+        measure("json.loads всего ответа", lambda: expected_result(body.decode('utf-8')), repeat)
+        measure("ServerCatalog._parse (блоки по 64 КБ)",
+                lambda: catalog._parse(FakeResponse(body, 64 * 1024)), repeat)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
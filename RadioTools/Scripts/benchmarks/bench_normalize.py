@@ -0,0 +1,134 @@
+"""
+Нормализация имен треков: проверка совпадения результатов и сравнение скорости
+
+Проверяется, что пакетная normalize_track_names дает те же результаты, что
+normalize_track_name для каждого имени, и показывается, в чем общий
+нормализатор расходится с прежними реализациями скриптов.
+
+Использование:
+  python bench_normalize.py [--names=100000] [--repeat=5]
+
+Код возврата 1 - если пакетная и поштучная нормализация расходятся.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from track_names import CACHE_SIZE, normalize_track_name, normalize_track_names
+from synthetic import iter_library
+
+LEGACY_COPY_AUDIO_PATTERNS = [
+    re.compile(r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}_'),
+    re.compile(r'^\d{4}-\d{2}-\d{2}_\d{1,2}-\d{2}_'),
+    re.compile(r'^\d{4}-\d{2}-\d{2}_'),
+    re.compile(r'^\d{4}-\d{2}-\d{2}\s+'),
+]
+
+# Имена, на которых прежние реализации вели себя по-разному
+EDGE_CASES = [
+    '', ' ', 'Song', '  Spaced\tOut  ', 'Artist  -  Title',
+    '2025-01-01_10-00_Song', '2025-01-01_9-05_Song', '2025-01-01_Song', '2025-01-01 Song',
+    '2025-01-01  Song  X', '2025-01-01_10-00_', '2025-01-01', '2025-01-01_10-00_2024-02-02_Double',
+    '2025-01-01_10-00_ 2025-01-01 Z', 'Song 2025-01-01_10-00_', '12025-01-01_Song',
+    'ΑΣ', 'Οδυσσευσ Σ', 'İstanbul', 'Straße', 'Ab\x1cc', 'x\u2028y', 'x\u00a0y', 'tab\tend\t',
+]
+
+
+def legacy_copy_audio(track_name):
+    """Прежний CopyAudio.normalize_track_name"""
+    original_name = track_name
+    for pattern in LEGACY_COPY_AUDIO_PATTERNS:
+        match = pattern.match(original_name)
+        if match:
+            original_name = original_name[match.end():].strip()
+    return original_name.lower() if original_name else track_name.lower()
+
+
+def legacy_add_to_playlist(track_name):
+    """Прежние AddToPlaylist.normalize_track_name и UnifiedProcessor._normalize_track_name"""
+    pattern = r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}_'
+    normalized = re.sub(pattern, ' ', track_name)
+    return ' '.join(normalized.split()).lower()
+
+
+def synthetic_names(count):
+    names = [os.path.splitext(name)[0] for _, _, name in iter_library(count)]
+    # Разнообразие форматов префикса и пробелов, как в реальной библиотеке
+    for i in range(0, len(names), 7):
+        names[i] = names[i].replace('2025-01-01_10-00_', '2025-01-01 ').replace(' - ', '  -  ')
+    for i in range(3, len(names), 11):
+        names[i] = f"2024-12-31_{i % 24}-05_{names[i]}"
+    return names
+
+
+def check_equivalence(names):
+    """Сравнивает пакетную и поштучную нормализацию; возвращает число расхождений"""
+    normalize_track_name.cache_clear()
+    batch = normalize_track_names(names)
+    mismatches = [(name, normalize_track_name(name), result)
+                  for name, result in zip(names, batch) if normalize_track_name(name) != result]
+    for name, scalar, result in mismatches[:10]:
+        print(f"  РАСХОЖДЕНИЕ {name!r}: поштучно {scalar!r}, пакетом {result!r}")
+    return len(mismatches) + (len(batch) != len(names))
+
+
+def show_legacy_differences(names, title):
+    for legacy in (legacy_copy_audio, legacy_add_to_playlist):
+        differences = [(name, legacy(name), normalize_track_name(name))
+                       for name in names if legacy(name) != normalize_track_name(name)]
+        print(f"  {title}: отличий от {legacy.__doc__.split()[1]}: {len(differences)} из {len(names)}")
+        for name, old, new in differences[:5]:
+            print(f"    {name!r}: {old!r} -> {new!r}")
+
+
+def measure(name, func, repeat, setup=None):
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {name:<44} {best * 1000:9.1f} мс")
+    return best
+
+
+def main():
+    options = {'names': 100_000, 'repeat': 5}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            options[name] = int(value)
+
+    names = synthetic_names(options['names'])
+    repeat = options['repeat']
+
+    print("Проверка совпадения пакетной и поштучной нормализации:")
+    mismatches = check_equivalence(EDGE_CASES) + check_equivalence(names)
+    print(f"  расхождений: {mismatches}")
+
+    print("\nОтличия от прежних реализаций:")
+    show_legacy_differences(EDGE_CASES, "особые случаи")
+    show_legacy_differences(names, "синтетические имена")
+
+    print(f"\nСкорость на {len(names)} именах, лучший результат из {repeat}:")
+    measure("прежний CopyAudio (4 шаблона)", lambda: [legacy_copy_audio(n) for n in names], repeat)
+    measure("прежний AddToPlaylist (re.sub без компиляции)",
+            lambda: [legacy_add_to_playlist(n) for n in names], repeat)
+    measure("normalize_track_name, кэш пуст", lambda: [normalize_track_name(n) for n in names],
+            repeat, setup=normalize_track_name.cache_clear)
+    # Повторные имена берутся из кэша, если их не больше CACHE_SIZE
+    cached = names[:CACHE_SIZE]
+    measure(f"normalize_track_name, кэш заполнен ({len(cached)})",
+            lambda: [normalize_track_name(n) for n in cached], repeat)
+    measure("normalize_track_names (пакет)", lambda: normalize_track_names(names), repeat)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Сравнение скорости поиска аудиофайлов: прежние способы обхода и audio_scan
+
+Использование:
+  python bench_scan.py [папка] [--repeat=3] [--workers=8]
+
+Без папки создается временное дерево (--genres=20 --artists=25 --tracks=20).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from audio_scan import scan_audio_files
+from synthetic import generate_tree
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus'}
+
+
+def walk_os_walk(root):
+    """Как прежний UnifiedProcessor._scan_local_folder"""
+    result = []
+    for folder, _, files in os.walk(root):
+        for file in files:
+            if Path(file).suffix.lower() in AUDIO_EXTENSIONS:
+                result.append(os.path.join(folder, file))
+    return result
+
+
+def walk_rglob(root):
+    """Как прежние CopyAudio.get_audio_files_list и AddToPlaylist.create_playlist"""
+    return [str(file_path) for file_path in Path(root).rglob('*')
+            if file_path.is_file() and file_path.suffix.lower() in AUDIO_EXTENSIONS]
+
+
+def walk_rglob_stat(root):
+    """Как прежнее полное сканирование с размером и временем изменения (rglob + os.stat)"""
+    result = []
+    for file_path in Path(root).rglob('*'):
+        if file_path.is_file() and file_path.suffix.lower() in AUDIO_EXTENSIONS:
+            file_stat = file_path.stat()
+            result.append((str(file_path), file_stat.st_size, file_stat.st_mtime_ns))
+    return result
+
+
+def measure(name, func, repeat):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(func())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {name:<38} {best * 1000:9.1f} мс   файлов: {count}")
+    return best
+
+
+def main():
+    options = {'repeat': 3, 'workers': 8, 'genres': 20, 'artists': 25, 'tracks': 20}
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            options[name] = int(value)
+        else:
+            args.append(arg)
+
+    temp_root = None
+    if args:
+        root = args[0]
+    else:
+        temp_root = tempfile.mkdtemp(prefix='radiotools_scan_')
+        root = temp_root
+        generate_tree(root, options['genres'], options['artists'], options['tracks'])
+        print(f"Создано временное дерево: {options['genres']} x {options['artists']} x {options['tracks']}")
+
+    repeat = options['repeat']
+    workers = options['workers']
+    print(f"Папка: {root}, лучший результат из {repeat}\n")
+    try:
+        measure("os.walk (UnifiedProcessor)", lambda: walk_os_walk(root), repeat)
+        measure("rglob + is_file (CopyAudio)", lambda: walk_rglob(root), repeat)
+        measure("rglob + is_file + stat", lambda: walk_rglob_stat(root), repeat)
+        measure("audio_scan, 1 поток", lambda: list(
+            scan_audio_files(root, AUDIO_EXTENSIONS, workers=1, with_stat=False)), repeat)
+        measure(f"audio_scan, {workers} потоков", lambda: list(
+            scan_audio_files(root, AUDIO_EXTENSIONS, workers=workers, with_stat=False)), repeat)
+        measure(f"audio_scan + stat, {workers} потоков", lambda: list(
+            scan_audio_files(root, AUDIO_EXTENSIONS, workers=workers)), repeat)
+    finally:
+        if temp_root:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Замеры скорости основных операций RadioTools на синтетической библиотеке
+
+Использование:
+  python run_benchmarks.py [--sizes=10k,100k] [--repeat=3] [--only=подстрока]
+                           [--workdir=папка] [--output=результат.json] [--compare=прошлый.json]
+
+  --sizes    Размеры библиотеки: 10k, 100k, 1m или число файлов
+  --repeat   Количество повторов каждого замера (в результат идет лучший)
+  --only     Выполнять только замеры, в названии которых есть подстрока
+  --workdir  Папка для библиотек и плейлистов; сохраняется между запусками,
+             чтобы не создавать библиотеку заново (по умолчанию - временная)
+  --output   Файл результатов (по умолчанию results/bench_<дата>_<коммит>.json)
+  --compare  Сравнить с результатами прошлого запуска
+
+Кэш скриптов (индексы плейлистов и папок, снимок каталога сервера, кэш тегов)
+на время замеров переносится в рабочую папку и не затрагивает рабочий кэш.
+Замеры UnifiedProcessor требуют модуля taglib и выполняются с локальным
+сервером-заглушкой.
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+RESULTS_VERSION = 1
+
+# Сколько имен ищется в индексе похожих треков (время поиска - на все имена)
+NEAR_LOOKUPS = 1000
+
+# Доля треков, отсутствующих на диске (check_missing_tracks)
+MISSING_SHARE = 0.05
+# Доля новых треков для UnifiedProcessor (нет в плейлисте и в БД сервера)
+NEW_SHARE = 0.01
+# Замедление относительно прошлого результата, которое считается регрессией
+REGRESSION_THRESHOLD = 1.10
+
+SERVER_PATH = '/srv/radio/music/'
+
+
+def parse_options(argv: List[str]) -> dict:
+    options = {'sizes': '10k,100k', 'repeat': '3', 'only': '', 'workdir': '', 'output': '', 'compare': ''}
+    for arg in argv:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            if name not in options:
+                raise SystemExit(f"Неизвестный параметр: --{name}")
+            options[name] = value
+        else:
+            raise SystemExit(f"Неизвестный аргумент: {arg}")
+    return options
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Runner:
+    """Выполняет замеры и собирает результаты для одного размера библиотеки"""
+
+    def __init__(self, repeat: int, only: str):
+        self.repeat = repeat
+        self.only = only
+        self.results: Dict[str, dict] = {}
+
+    def measure(self, name: str, func: Callable, setup: Optional[Callable] = None):
+        """
+        Замеряет func repeat раз (вывод func подавляется)
+
+        Args:
+            name: Название замера (ключ в результатах)
+            func: Замеряемая функция; если она возвращает коллекцию, ее размер
+                  сохраняется как количество обработанных элементов
+            setup: Подготовка перед каждым повтором (не входит в замер)
+        """
+        if self.only and self.only not in name:
+            return
+        timings = []
+        items = None
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                value = func()
+                timings.append(time.perf_counter() - started)
+            if hasattr(value, '__len__'):
+                items = len(value)
+        self.record(name, timings, items)
+
+    def record(self, name: str, timings: List[float], items: Optional[int] = None):
+        best = min(timings)
+        self.results[name] = {
+            'best': round(best, 6),
+            'mean': round(sum(timings) / len(timings), 6),
+            'runs': len(timings),
+            'items': items,
+        }
+        count = f"   элементов: {items}" if items is not None else ""
+        print(f"  {name:<48} {best * 1000:10.1f} мс{count}")
+
+
+def clear_cache(prefix: str):
+    """Удаляет файлы кэша с указанным префиксом (холодный запуск)"""
+    from cache_utils import CACHE_DIR
+    for path in glob.glob(os.path.join(CACHE_DIR, f"{prefix}_*")):
+        os.remove(path)
+
+
+def bench_normalize(runner: Runner, names: List[str]):
+    from track_names import normalize_track_name, normalize_track_names
+
+    runner.measure("normalize_track_name (кэш пуст)",
+                   lambda: [normalize_track_name(name) for name in names],
+                   setup=normalize_track_name.cache_clear)
+    runner.measure("normalize_track_names (пакет)", lambda: normalize_track_names(names))
+
+
+def bench_near_duplicates(runner: Runner, names: List[str]):
+    from near_duplicates import NearDuplicateIndex
+    from track_names import normalize_track_names
+
+    build_name = "NearDuplicateIndex (построение)"
+    find_name = f"NearDuplicateIndex.find_similar ({min(len(names), NEAR_LOOKUPS)} имен)"
+    if runner.only and not any(runner.only in name for name in (build_name, find_name)):
+        return
+    normalized = normalize_track_names(names)
+
+    def build():
+        index = NearDuplicateIndex()
+        for name in normalized:
+            index.add(name, name)
+        return index
+
+    index = build()
+    # Варианты имен библиотеки: соисполнитель, опечатка, совсем другой трек
+    step = max(1, len(normalized) // NEAR_LOOKUPS)
+    queries = []
+    for i, name in enumerate(normalized[::step][:NEAR_LOOKUPS]):
+        variant = i % 3
+        if variant == 0:
+            queries.append(f"{name} (feat. guest {i})")
+        elif variant == 1:
+            queries.append(name[:-2] + name[-1:])
+        else:
+            queries.append(f"unrelated {i} - song")
+
+    runner.measure(build_name, build)
+    runner.measure(find_name, lambda: [index.find_similar(query) for query in queries])
+
+
+def bench_checklist(runner: Runner, playlist_file: str, local_paths: List[str]):
+    import CheckList
+    from pathlib import Path
+    from playlist_index import PlaylistIndex
+
+    runner.measure("parse_pls_file (без индекса)", lambda: CheckList.parse_pls_file(Path(playlist_file)),
+                   setup=lambda: PlaylistIndex.invalidate(playlist_file))
+    runner.measure("parse_pls_file (с индексом)", lambda: CheckList.parse_pls_file(Path(playlist_file)))
+    runner.measure("check_missing_tracks (локально)",
+                   lambda: CheckList.check_missing_tracks(local_paths)[1])
+
+
+def bench_copy_audio(runner: Runner, library: str):
+    import CopyAudio
+
+    def scan_without_index():
+        CopyAudio.USE_TRACK_INDEX = False
+        try:
+            return CopyAudio.get_existing_tracks_local(library)
+        finally:
+            CopyAudio.USE_TRACK_INDEX = True
+
+    runner.measure("get_existing_tracks_local (без индекса)", scan_without_index)
+    runner.measure("get_existing_tracks_local (новый индекс)",
+                   lambda: CopyAudio.get_existing_tracks_local(library),
+                   setup=lambda: clear_cache('track_index'))
+    runner.measure("get_existing_tracks_local (с индексом)",
+                   lambda: CopyAudio.get_existing_tracks_local(library))
+
+
+def bench_processor(runner: Runner, library: str, workdir: str, relative_paths: List[str]):
+    try:
+        from unified_processor import UnifiedProcessor
+    except ImportError as e:
+        print(f"  UnifiedProcessor пропущен: {e}")
+        return
+    from playlist_index import PlaylistIndex
+    from stub_server import start_server
+    from synthetic import write_playlist
+
+    # Последние NEW_SHARE треков - новые: их нет ни в плейлисте, ни в БД сервера
+    known = relative_paths[:len(relative_paths) - max(1, int(len(relative_paths) * NEW_SHARE))]
+    base_playlist = os.path.join(workdir, f"server_{len(relative_paths)}.pls")
+    if not os.path.exists(base_playlist):
+        write_playlist(base_playlist, SERVER_PATH, known)
+    playlist_file = os.path.join(workdir, 'processor.pls')
+
+    def make_config(port: int) -> dict:
+        return {
+            'songs_path': library,
+            'key': 'bench',
+            'page': f"http://127.0.0.1:{port}/add-newtrack",
+            'server_tracks_url': f"http://127.0.0.1:{port}/get-alltracks",
+            'server_path': SERVER_PATH,
+            'playlist_file': playlist_file,
+            'supported_formats': ['.mp3', '.flac'],
+            'base_url': 'http://127.0.0.1/music/',
+            'max_retries': 0,
+        }
+
+    def start_stub():
+        server, state = start_server(0, 'bench')
+        state.tracks = [{'artist': 'Artist', 'title': path, 'link': path, 'file_path': SERVER_PATH + path}
+                        for path in known]
+        state.paths = {track['file_path'] for track in state.tracks}
+        return server
+
+    server = start_stub()
+    try:
+        processor = UnifiedProcessor(make_config(server.server_address[1]))
+        shutil.copyfile(base_playlist, playlist_file)
+        runner.measure("_get_existing_playlist_tracks (без индекса)",
+                       processor._get_existing_playlist_tracks,
+                       setup=lambda: PlaylistIndex.invalidate(playlist_file))
+        runner.measure("_get_existing_playlist_tracks (с индексом)",
+                       processor._get_existing_playlist_tracks)
+        runner.measure("_scan_local_folder", processor._scan_local_folder)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Фазы run(): каждый повтор - с исходным плейлистом, новым сервером и без снимка каталога
+    phases = [
+        ("run: _get_server_tracks (полный каталог)", lambda p: p._get_server_tracks()),
+        ("run: _get_server_tracks (каталог не изменился)", lambda p: p._get_server_tracks()),
+        ("run: _process_playlist_phase", lambda p: p._process_playlist_phase()),
+        ("run: _add_new_files_phase", lambda p: p._add_new_files_phase()),
+        ("run: _prepare_server_files_phase", lambda p: p._prepare_server_files_phase()),
+        ("run: _send_tracks_phase", lambda p: p._send_tracks_phase()),
+    ]
+    if runner.only and not any(runner.only in name for name, _ in phases + [("run: всего", None)]):
+        return
+
+    timings = {name: [] for name, _ in phases}
+    totals = []
+    registered = 0
+    for _ in range(runner.repeat):
+        shutil.copyfile(base_playlist, playlist_file)
+        PlaylistIndex.invalidate(playlist_file)
+        clear_cache('server_catalog')
+        server = start_stub()
+        try:
+            processor = UnifiedProcessor(make_config(server.server_address[1]))
+            total = 0.0
+            for name, phase in phases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    started = time.perf_counter()
+                    phase(processor)
+                    elapsed = time.perf_counter() - started
+                timings[name].append(elapsed)
+                total += elapsed
+            totals.append(total)
+            registered = len(processor.processed_tracks)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    for name, _ in phases:
+        runner.record(name, timings[name])
+    runner.record("run: всего", totals, registered)
+
+
+def run_size(files: int, workdir: str, runner: Runner):
+    from synthetic import generate_library, write_playlist
+
+    library = os.path.join(workdir, f"library_{files}")
+    started = time.perf_counter()
+    relative_paths = generate_library(library, files)
+    print(f"Библиотека: {library} ({files} файлов, подготовка {time.perf_counter() - started:.1f} с)")
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in relative_paths]
+
+    # Плейлист с локальными путями для CheckList: часть треков отсутствует на диске
+    local_playlist = os.path.join(workdir, f"local_{files}.pls")
+    step = max(1, int(1 / MISSING_SHARE))
+    local_relative = [path if i % step else f"missing/{path}" for i, path in enumerate(relative_paths)]
+    if not os.path.exists(local_playlist):
+        write_playlist(local_playlist, library, local_relative)
+    base = library.replace('\\', '/').rstrip('/') + '/'
+    local_paths = [base + path for path in local_relative]
+
+    bench_normalize(runner, names)
+    bench_near_duplicates(runner, names)
+    bench_checklist(runner, local_playlist, local_paths)
+    bench_copy_audio(runner, library)
+    bench_processor(runner, library, workdir, relative_paths)
+
+
+def compare(results: dict, previous_file: str):
+    with open(previous_file, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nСравнение с {previous_file} (коммит {previous.get('commit') or '?'}):")
+    regressions = 0
+    for size, benches in results['sizes'].items():
+        old_benches = previous.get('sizes', {}).get(size, {})
+        for name, result in benches.items():
+            old = old_benches.get(name)
+            if not old or not old.get('best'):
+                continue
+            ratio = result['best'] / old['best']
+            mark = "  <- медленнее" if ratio > REGRESSION_THRESHOLD else ""
+            regressions += bool(mark)
+            print(f"  [{size}] {name:<48} {old['best'] * 1000:9.1f} -> {result['best'] * 1000:9.1f} мс"
+                  f"  x{ratio:.2f}{mark}")
+    print(f"Замедлений более чем на {(REGRESSION_THRESHOLD - 1) * 100:.0f}%: {regressions}")
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    from synthetic import parse_size
+    sizes = [parse_size(size) for size in options['sizes'].split(',') if size]
+    repeat = max(1, int(options['repeat']))
+
+    temp_dir = None
+    workdir = options['workdir']
+    if not workdir:
+        temp_dir = tempfile.mkdtemp(prefix='radiotools_bench_')
+        workdir = temp_dir
+    os.makedirs(workdir, exist_ok=True)
+    workdir = os.path.abspath(workdir)
+
+    # Кэш скриптов - в рабочей папке (до импорта модулей, которые его используют)
+    os.environ['RADIOTOOLS_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    sys.path[:0] = [SCRIPTS_DIR, os.path.join(SCRIPTS_DIR, 'common'),
+                    os.path.join(SCRIPTS_DIR, 'AddNewTracks', 'modules')]
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'sizes': {},
+    }
+
+    try:
+        for files in sizes:
+            print(f"\n=== {files} файлов, лучший результат из {repeat} ===")
+            runner = Runner(repeat, options['only'])
+            run_size(files, workdir, runner)
+            results['sizes'][str(files)] = runner.results
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = options['output']
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}_"
+                                           f"{results['commit'] or 'nogit'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в: {output}")
+
+    if options['compare']:
+        compare(results, options['compare'])
+
+
+if __name__ == "__main__":
+    main()
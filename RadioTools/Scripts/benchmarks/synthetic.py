@@ -0,0 +1,94 @@
+"""
+Синтетическая библиотека и плейлисты для замеров скорости
+
+Библиотека - дерево жанр/исполнитель/трек с пустыми файлами, как в папке
+radio/music: часть имен с префиксом даты (2025-01-01_10-00_), часть файлов
+не-аудио (cover.jpg в каждой папке исполнителя). Содержимое детерминировано:
+одинаковые параметры дают одинаковое дерево.
+"""
+import os
+import posixpath
+from typing import Iterator, List, Tuple
+
+# Готовые размеры библиотеки
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+GENRES = 20
+TRACKS_PER_ARTIST = 20
+DATE_PREFIX = '2025-01-01_10-00_'
+
+
+def parse_size(value: str) -> int:
+    """'10k', '100k', '1m' или число файлов"""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def iter_library(files: int, genres: int = GENRES,
+                 tracks_per_artist: int = TRACKS_PER_ARTIST) -> Iterator[Tuple[str, str, str]]:
+    """
+    Перебирает треки библиотеки из files файлов
+
+    Yields:
+        (жанр, исполнитель, имя файла)
+    """
+    artists_per_genre = -(-files // (genres * tracks_per_artist))
+    count = 0
+    for a in range(artists_per_genre):
+        for g in range(genres):
+            genre = f"Genre {g:02d}"
+            artist = f"Artist {g:02d}-{a:05d}"
+            for t in range(tracks_per_artist):
+                if count == files:
+                    return
+                # Каждый второй файл - с префиксом даты, каждый пятый - flac
+                prefix = DATE_PREFIX if t % 2 else ''
+                ext = '.flac' if t % 5 == 0 else '.mp3'
+                yield genre, artist, f"{prefix}{artist} - Track {t:03d}{ext}"
+                count += 1
+
+
+def generate_library(root: str, files: int, genres: int = GENRES,
+                     tracks_per_artist: int = TRACKS_PER_ARTIST) -> List[str]:
+    """
+    Создает дерево библиотеки (существующие файлы не пересоздаются)
+
+    Returns:
+        Относительные пути треков (жанр/исполнитель/файл) в порядке создания
+    """
+    relative_paths = []
+    created_dirs = set()
+    for genre, artist, name in iter_library(files, genres, tracks_per_artist):
+        folder = os.path.join(root, genre, artist)
+        if folder not in created_dirs:
+            os.makedirs(folder, exist_ok=True)
+            open(os.path.join(folder, 'cover.jpg'), 'ab').close()
+            created_dirs.add(folder)
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        relative_paths.append(posixpath.join(genre, artist, name))
+    return relative_paths
+
+
+def generate_tree(root: str, genres: int, artists: int, tracks: int):
+    """Дерево genres x artists x tracks (формат прежнего bench_scan)"""
+    generate_library(root, genres * artists * tracks, genres, tracks)
+
+
+def write_playlist(playlist_file: str, base_path: str, relative_paths: List[str]) -> int:
+    """
+    Записывает плейлист track=путь?; из относительных путей треков
+
+    Args:
+        playlist_file: Файл плейлиста
+        base_path: Префикс путей (server_path или локальная папка)
+        relative_paths: Пути треков относительно base_path
+
+    Returns:
+        Количество записей
+    """
+    base_path = base_path.replace('\\', '/').rstrip('/') + '/'
+    with open(playlist_file, 'w', encoding='utf-8', newline='') as f:
+        for relative_path in relative_paths:
+            f.write(f"track={base_path}{relative_path}?;\n")
+    return len(relative_paths)
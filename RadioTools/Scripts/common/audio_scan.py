@@ -0,0 +1,116 @@
+"""
+Быстрый поиск аудиофайлов в дереве папок
+
+Папки читаются через os.scandir: тип записи и (в Windows) размер и время
+изменения берутся из данных DirEntry, а расширение проверяется по имени
+до любых дополнительных системных вызовов. Папки читаются параллельно
+в нескольких потоках, найденные файлы выдаются по мере чтения папок.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+SCAN_WORKERS = 8
+
+
+class AudioFile(NamedTuple):
+    path: str  # Полный путь
+    name: str  # Имя файла
+    stem: str  # Имя файла без расширения
+    size: int  # Размер (-1, если размер не запрашивался)
+    mtime_ns: int  # Время изменения в нс (-1, если не запрашивалось)
+
+
+def normalize_extensions(extensions: Iterable[str]) -> frozenset:
+    """Расширения в нижнем регистре с точкой: {'.mp3', '.flac', ...}"""
+    return frozenset(ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in extensions)
+
+
+def list_audio_directory(directory: str, extensions: frozenset,
+                         with_stat: bool = True) -> Tuple[List[str], List[AudioFile]]:
+    """
+    Читает одну папку: подпапки и аудиофайлы
+
+    Args:
+        directory: Папка
+        extensions: Расширения аудиофайлов (см. normalize_extensions)
+        with_stat: Заполнять размер и время изменения файлов
+
+    Returns:
+        (подпапки, аудиофайлы)
+
+    Raises:
+        OSError: если папку не удалось прочитать
+    """
+    subdirs = []
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                stem, ext = os.path.splitext(entry.name)
+                # Расширение проверяется по имени, до обращения к файлу
+                if ext.lower() not in extensions or not entry.is_file():
+                    continue
+                if with_stat:
+                    file_stat = entry.stat()
+                    files.append(AudioFile(entry.path, entry.name, stem,
+                                           file_stat.st_size, file_stat.st_mtime_ns))
+                else:
+                    files.append(AudioFile(entry.path, entry.name, stem, -1, -1))
+            except OSError:
+                # Файл удален или недоступен во время чтения папки
+                continue
+    return subdirs, files
+
+
+def _safe_list(directory: str, extensions: frozenset, with_stat: bool,
+               errors: Optional[list]) -> Tuple[List[str], List[AudioFile]]:
+    try:
+        return list_audio_directory(directory, extensions, with_stat)
+    except OSError as e:
+        if errors is not None:
+            errors.append(f"{directory}: {e}")
+        return [], []
+
+
+def scan_audio_files(root: str, extensions: Iterable[str], workers: int = SCAN_WORKERS,
+                     with_stat: bool = True, errors: Optional[list] = None) -> Iterator[AudioFile]:
+    """
+    Перебирает аудиофайлы в папке и всех вложенных папках
+
+    Порядок выдачи файлов не определен. Символические ссылки на папки не обходятся.
+
+    Args:
+        root: Корневая папка
+        extensions: Расширения аудиофайлов
+        workers: Количество потоков чтения папок (1 - последовательный обход)
+        with_stat: Заполнять размер и время изменения файлов
+        errors: Список, в который добавляются ошибки чтения папок
+
+    Yields:
+        AudioFile для каждого найденного файла
+    """
+    extensions = normalize_extensions(extensions)
+    root = os.fspath(root)
+
+    if workers <= 1:
+        stack = [root]
+        while stack:
+            subdirs, files = _safe_list(stack.pop(), extensions, with_stat, errors)
+            yield from files
+            stack.extend(reversed(subdirs))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_safe_list, root, extensions, with_stat, errors)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, files = future.result()
+                # Подпапки ставятся в работу до выдачи файлов, чтобы потоки не простаивали
+                for subdir in subdirs:
+                    pending.add(executor.submit(_safe_list, subdir, extensions, with_stat, errors))
+                yield from files
@@ -0,0 +1,28 @@
+"""
+Расположение файлов кэша и индексов, общих для скриптов RadioTools
+"""
+import hashlib
+import os
+
+# Папка кэша рядом со скриптами (можно переопределить переменной окружения)
+CACHE_DIR = os.environ.get(
+    'RADIOTOOLS_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+)
+
+
+def get_cache_path(prefix: str, key: str, suffix: str) -> str:
+    """
+    Возвращает путь к файлу кэша для указанного ключа
+
+    Args:
+        prefix: Префикс имени файла (тип кэша)
+        key: Ключ кэша (обычно путь к папке или файлу)
+        suffix: Расширение файла кэша
+
+    Returns:
+        Полный путь к файлу кэша (папка кэша создается при необходимости)
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = hashlib.sha1(key.encode('utf-8', errors='replace')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{prefix}_{digest}{suffix}")
@@ -0,0 +1,162 @@
+"""
+Поиск дубликатов по содержимому файлов
+
+Кандидаты сначала сравниваются по размеру, затем по хэшу начала и конца
+файла, и только при совпадении - по хэшу всего файла. Вычисленные хэши
+сохраняются в кэше (SQLite) по ключу путь + размер + время изменения,
+поэтому повторные запуски не перечитывают неизменные файлы.
+"""
+import hashlib
+import sqlite3
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache_utils import get_cache_path
+
+PARTIAL_BLOCK_SIZE = 64 * 1024
+FULL_BLOCK_SIZE = 1024 * 1024
+
+# Через сколько новых записей хэши сохраняются на диск (чтобы пережить прерванный запуск)
+COMMIT_EVERY = 100
+
+
+class HashCache:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_cache_path('hash_cache', 'content', '.sqlite')
+        self.conn = sqlite3.connect(self.db_path)
+        self._uncommitted = 0
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "key TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, partial TEXT, full TEXT)")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    def get(self, key: str, size: int, mtime: int) -> Tuple[Optional[str], Optional[str]]:
+        """Возвращает (частичный хэш, полный хэш), если файл не менялся"""
+        row = self.conn.execute(
+            "SELECT size, mtime, partial, full FROM hashes WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime:
+            return None, None
+        return row[2], row[3]
+
+    def put(self, key: str, size: int, mtime: int, partial: Optional[str], full: Optional[str]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO hashes (key, size, mtime, partial, full) VALUES (?, ?, ?, ?, ?)",
+            (key, size, mtime, partial, full))
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self.conn.commit()
+            self._uncommitted = 0
+
+
+class FileEntry:
+    def __init__(self, key: str, size: int, mtime: int, opener: Callable, name: str = '',
+                 restat: Optional[Callable[[], Tuple[int, int]]] = None):
+        self.key = key
+        self.size = size
+        self.mtime = mtime
+        self.opener = opener  # Функция, открывающая файл для чтения в двоичном режиме
+        self.name = name or key
+        # Функция, возвращающая актуальные (размер, время изменения), если size и mtime
+        # могли устареть (взяты из индекса); вызывается один раз перед сравнением содержимого
+        self.restat = restat
+        self.partial = None
+        self.full = None
+
+
+class ContentDeduplicator:
+    def __init__(self, cache: HashCache):
+        self.cache = cache
+        self.by_size: Dict[int, List[FileEntry]] = {}
+        self.hashed_bytes = 0
+        self.unreadable: Dict[str, str] = {}  # Известные файлы, которые не удалось прочитать: ключ -> ошибка
+
+    def add(self, entry: FileEntry):
+        """Добавляет файл в набор известных (хэши вычисляются только при необходимости)"""
+        self.by_size.setdefault(entry.size, []).append(entry)
+
+    def find_duplicate(self, entry: FileEntry) -> Optional[FileEntry]:
+        """
+        Ищет среди известных файлов файл с таким же содержимым
+
+        Известные файлы, которые не удалось прочитать, пропускаются (и запоминаются
+        в unreadable); ошибка чтения самого entry (OSError) передается вызывающему.
+        """
+        same_size = self.by_size.get(entry.size)
+        if not same_size:
+            return None
+
+        partial = self._partial_hash(entry)
+        for candidate in same_size:
+            if candidate.key in self.unreadable:
+                continue
+            try:
+                self._refresh(candidate)
+                if candidate.size != entry.size or self._partial_hash(candidate) != partial:
+                    continue
+                candidate_full = self._full_hash(candidate)
+            except OSError as e:
+                self.unreadable[candidate.key] = str(e)
+                continue
+            if candidate_full == self._full_hash(entry):
+                return candidate
+        return None
+
+    def _refresh(self, entry: FileEntry):
+        """Перепроверяет размер и время изменения известного файла (если они могли устареть)"""
+        if entry.restat is None:
+            return
+        old_size, old_mtime = entry.size, entry.mtime
+        entry.size, entry.mtime = entry.restat()
+        entry.restat = None
+        if (entry.size, entry.mtime) != (old_size, old_mtime):
+            # Хэши в кэше относятся к прежнему содержимому; другой размер - другой набор кандидатов
+            entry.partial = entry.full = None
+            if entry.size != old_size:
+                self.by_size.setdefault(entry.size, []).append(entry)
+
+    def _load_cached(self, entry: FileEntry):
+        if entry.partial is None:
+            entry.partial, entry.full = self.cache.get(entry.key, entry.size, entry.mtime)
+
+    def _partial_hash(self, entry: FileEntry) -> str:
+        self._load_cached(entry)
+        if entry.partial is None:
+            digest = hashlib.blake2b(str(entry.size).encode())
+            with entry.opener() as f:
+                digest.update(f.read(PARTIAL_BLOCK_SIZE))
+                if entry.size > PARTIAL_BLOCK_SIZE * 2:
+                    f.seek(entry.size - PARTIAL_BLOCK_SIZE)
+                    digest.update(f.read(PARTIAL_BLOCK_SIZE))
+                elif entry.size > PARTIAL_BLOCK_SIZE:
+                    digest.update(f.read())
+            self.hashed_bytes += min(entry.size, PARTIAL_BLOCK_SIZE * 2)
+            entry.partial = digest.hexdigest()
+            self.cache.put(entry.key, entry.size, entry.mtime, entry.partial, entry.full)
+        return entry.partial
+
+    def _full_hash(self, entry: FileEntry) -> str:
+        self._load_cached(entry)
+        if entry.full is None:
+            if entry.size <= PARTIAL_BLOCK_SIZE * 2:
+                # Частичный хэш уже покрывает весь файл
+                entry.full = self._partial_hash(entry)
+            else:
+                digest = hashlib.blake2b()
+                with entry.opener() as f:
+                    if hasattr(f, 'prefetch'):
+                        # Файл на сервере (paramiko) - читаем с опережением
+                        f.prefetch(entry.size)
+                    while True:
+                        block = f.read(FULL_BLOCK_SIZE)
+                        if not block:
+                            break
+                        digest.update(block)
+                self.hashed_bytes += entry.size
+                entry.full = digest.hexdigest()
+            self.cache.put(entry.key, entry.size, entry.mtime, self._partial_hash(entry), entry.full)
+        return entry.full
@@ -0,0 +1,173 @@
+"""
+Параллельное локальное копирование файлов
+
+Данные копируются средствами ядра (os.copy_file_range, затем os.sendfile),
+а если они недоступны (Windows, разные файловые системы) - чтением большими
+блоками в общий буфер. Метаданные файла сохраняются так же, как в shutil.copy2.
+"""
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Ошибки, при которых системный способ копирования не поддерживается и нужно перейти к следующему
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                       getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP), errno.EBADF}
+
+
+def _copy_with_copy_file_range(src_fd: int, dst_fd: int, size: int, copied: int) -> int:
+    while copied < size:
+        count = os.copy_file_range(src_fd, dst_fd, min(COPY_BUFFER_SIZE, size - copied),
+                                   copied, copied)
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _copy_with_sendfile(src_fd: int, dst_fd: int, size: int, copied: int) -> int:
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while copied < size:
+        count = os.sendfile(dst_fd, src_fd, copied, min(COPY_BUFFER_SIZE, size - copied))
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _copy_with_buffer(src_file, dst_file, copied: int, buffer_size: int) -> int:
+    src_file.seek(copied)
+    dst_file.seek(copied)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        count = src_file.readinto(buffer)
+        if not count:
+            break
+        dst_file.write(view[:count])
+        copied += count
+    return copied
+
+
+def copy_file(source: str, target: str, buffer_size: int = COPY_BUFFER_SIZE) -> int:
+    """
+    Копирует файл с сохранением метаданных (аналог shutil.copy2)
+
+    Returns:
+        Количество скопированных байт
+    """
+    with open(source, 'rb') as src_file, open(target, 'wb') as dst_file:
+        size = os.fstat(src_file.fileno()).st_size
+        copied = 0
+        methods = []
+        if hasattr(os, 'copy_file_range'):
+            methods.append(_copy_with_copy_file_range)
+        if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+            methods.append(_copy_with_sendfile)
+
+        for method in methods:
+            try:
+                copied = method(src_file.fileno(), dst_file.fileno(), size, copied)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+            if copied >= size:
+                break
+
+        if copied < size:
+            copied = _copy_with_buffer(src_file, dst_file, copied, buffer_size)
+
+    shutil.copystat(source, target)
+    return copied
+
+
+class CopyJob:
+    def __init__(self, source: str, target: str, display_name: str, context=None):
+        self.source = source
+        self.target = target
+        self.display_name = display_name
+        self.context = context  # Произвольные данные вызывающего кода
+        self.size = 0
+        self.error = None
+
+
+class LocalCopyPool:
+    def __init__(self, workers: int = 4, buffer_size: int = COPY_BUFFER_SIZE,
+                 on_done: Optional[Callable[[CopyJob], None]] = None):
+        """
+        Args:
+            workers: Количество одновременных копирований
+            buffer_size: Размер буфера при копировании без средств ядра
+            on_done: Функция on_done(job), вызываемая после завершения задания
+                     (job.error равен None при успехе)
+        """
+        self.workers = max(1, workers)
+        self.buffer_size = buffer_size
+        self.on_done = on_done
+        self.executor = None
+        # Ограничивает число заданий "в полете", чтобы не накапливать очередь
+        self.slots = threading.BoundedSemaphore(self.workers * 2)
+        self.lock = threading.Lock()
+        self.completed: List[CopyJob] = []
+        self.failed: List[CopyJob] = []
+        self.bytes_copied = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def submit(self, job: CopyJob):
+        """Ставит задание в работу (блокируется, если заняты все слоты)"""
+        self.slots.acquire()
+        self.executor.submit(self._run, job)
+
+    def join(self):
+        self.executor.shutdown(wait=True)
+        self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Суммарная скорость копирования (байт в секунду)"""
+        elapsed = self.elapsed
+        return self.bytes_copied / elapsed if elapsed > 0 else 0.0
+
+    def _run(self, job: CopyJob):
+        try:
+            try:
+                job.size = copy_file(job.source, job.target, self.buffer_size)
+            except Exception as e:
+                job.error = e
+                # Не оставляем недописанный файл
+                try:
+                    os.remove(job.target)
+                except OSError:
+                    pass
+
+            with self.lock:
+                if job.error is None:
+                    self.completed.append(job)
+                    self.bytes_copied += job.size
+                else:
+                    self.failed.append(job)
+                if self.on_done:
+                    try:
+                        self.on_done(job)
+                    except Exception as e:
+                        print(f"\nОшибка обработки результата {job.display_name}: {e}")
+        finally:
+            self.slots.release()
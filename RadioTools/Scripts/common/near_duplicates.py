@@ -0,0 +1,227 @@
+"""
+Поиск похожих треков (возможных дубликатов) по именам и тегам
+
+Точное совпадение нормализованных имен (track_names) не находит
+"Artist - Title (feat. X)" для "Artist - Title", а также имена, отличающиеся
+знаками препинания или записью кириллицей/латиницей. Попарное сравнение
+нового файла со всей библиотекой слишком медленное, поэтому используется индекс:
+
+  - ключи трека: нормализованное имя и "исполнитель - название" из тегов
+    (если известны) без указаний "feat./ft.", знаков препинания и диакритики,
+    кириллица записана латиницей; совпадение ключей - похожесть 1.0;
+  - для остальных - MinHash по символьным триграммам ключа (одна хэш-функция,
+    SIGNATURE_BINS корзин) и LSH: подпись делится на полосы по BAND_ROWS значений,
+    кандидатами считаются треки, совпавшие хотя бы в одной полосе;
+  - у кандидатов (не больше MAX_CANDIDATES) считается точная мера Жаккара
+    по триграммам, похожими считаются треки с мерой не ниже порога.
+
+Время поиска не зависит от размера библиотеки (обычно несколько кандидатов).
+Хэши строк Python различаются между запусками, поэтому индекс строится
+в памяти и не сохраняется.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# Мера Жаккара по триграммам, начиная с которой треки считаются похожими
+DEFAULT_THRESHOLD = 0.7
+
+# Подпись MinHash: число корзин (степень двойки) и значений в одной полосе LSH
+SIGNATURE_BINS = 16
+BAND_ROWS = 4
+
+# Сколько кандидатов проверяется при одном поиске
+MAX_CANDIDATES = 200
+
+# Ключи короче сравниваются только на полное совпадение
+MIN_FUZZY_LENGTH = 6
+
+NGRAM = 3
+
+# Значение тега, который не удалось прочитать (tag_reader)
+UNKNOWN_TAG = 'Unknown'
+
+# (feat. X), [ft X], (при участии X) и "feat. X" до " - " или до конца имени
+FEAT_PATTERN = re.compile(
+    r'[(\[]\s*(?:feat|ft|featuring|при участии)\b\.?[^)\]]*[)\]]'
+    r'|\s(?:feat|ft|featuring)\b\.?.*?(?=\s-\s|$)')
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'і': 'i', 'ї': 'i', 'є': 'e', 'ґ': 'g',
+})
+
+_BIN_BITS = SIGNATURE_BINS.bit_length() - 1
+_BIN_MASK = SIGNATURE_BINS - 1
+_EMPTY = 1 << 64
+# Смещение значения пустой корзины, заполненной из соседней (на каждую позицию)
+_DENSIFY_STEP = 0x9E3779B97F4A7C15
+
+
+def track_key(track_name: str, artist: Optional[str] = None, title: Optional[str] = None) -> str:
+    """
+    Ключ трека для сравнения похожих имен
+
+    Args:
+        track_name: Нормализованное имя трека (normalize_track_name)
+        artist: Исполнитель из тегов (если известен)
+        title: Название из тегов (если известно)
+
+    Returns:
+        Строка из латинских букв, цифр и одиночных пробелов
+    """
+    text = f"{artist} - {title}".lower() if artist and title else track_name
+    text = FEAT_PATTERN.sub(' ', text).translate(TRANSLIT)
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text)
+                       if not unicodedata.combining(char))
+    return NON_WORD_PATTERN.sub(' ', text).strip()
+
+
+def track_keys(track_name: str, artist: Optional[str] = None, title: Optional[str] = None) -> List[str]:
+    """
+    Ключи трека по имени и (если известны) по тегам, без повторов
+
+    "Unknown" - так tag_reader записывает отсутствующий тег - известным не считается.
+    """
+    keys = [track_key(track_name)]
+    if artist and title and UNKNOWN_TAG not in (artist, title):
+        tag_key = track_key(track_name, artist, title)
+        if tag_key != keys[0]:
+            keys.append(tag_key)
+    return keys
+
+
+def _ngrams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def _similarity(first: set, second: set) -> float:
+    return len(first & second) / len(first | second)
+
+
+def _band_keys(ngrams: set) -> List[int]:
+    """Ключи полос LSH: MinHash с одной хэш-функцией, разложенной по корзинам"""
+    signature = [_EMPTY] * SIGNATURE_BINS
+    for ngram in ngrams:
+        value = hash(ngram)
+        position = value & _BIN_MASK
+        value >>= _BIN_BITS
+        if value < signature[position]:
+            signature[position] = value
+
+    if _EMPTY in signature:
+        # Пустые корзины (короткие ключи) заполняются из следующей непустой
+        filled = signature[:]
+        for position in range(SIGNATURE_BINS):
+            if filled[position] == _EMPTY:
+                for distance in range(1, SIGNATURE_BINS):
+                    source = filled[(position + distance) & _BIN_MASK]
+                    if source != _EMPTY:
+                        signature[position] = source + distance * _DENSIFY_STEP
+                        break
+
+    return [hash((band, *signature[band:band + BAND_ROWS]))
+            for band in range(0, SIGNATURE_BINS, BAND_ROWS)]
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            threshold: Мера Жаккара по триграммам, начиная с которой треки считаются похожими
+        """
+        self.threshold = threshold
+        self.labels: List[str] = []
+        self._keys: List[str] = []
+        self._by_key: Dict[str, int] = {}  # Ключ без пробелов -> номер ключа
+        self._buckets: Dict[int, object] = {}  # Ключ полосы -> номер ключа или список номеров
+
+    def __len__(self) -> int:
+        """Количество ключей в индексе (у трека с тегами их может быть два)"""
+        return len(self._keys)
+
+    def add(self, label: str, track_name: str, artist: Optional[str] = None, title: Optional[str] = None):
+        """
+        Добавляет трек в индекс
+
+        Args:
+            label: Что возвращать при совпадении (имя файла, путь)
+            track_name: Нормализованное имя трека
+            artist, title: Теги трека, если известны
+        """
+        for key in track_keys(track_name, artist, title):
+            self._add_key(label, key)
+
+    def _add_key(self, label: str, key: str):
+        number = len(self._keys)
+        self.labels.append(label)
+        self._keys.append(key)
+        self._by_key.setdefault(key.replace(' ', ''), number)
+        if len(key) < MIN_FUZZY_LENGTH:
+            return
+
+        buckets = self._buckets
+        for band_key in _band_keys(_ngrams(key)):
+            bucket = buckets.get(band_key)
+            if bucket is None:
+                buckets[band_key] = number
+            elif type(bucket) is list:
+                bucket.append(number)
+            else:
+                buckets[band_key] = [bucket, number]
+
+    def find_similar(self, track_name: str, artist: Optional[str] = None,
+                     title: Optional[str] = None, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Ищет самый похожий трек индекса
+
+        Args:
+            exclude: Метка, которая не возвращается (сам трек, если он уже в индексе)
+
+        Returns:
+            (метка трека, мера похожести от threshold до 1.0) или None
+        """
+        best = None
+        for key in track_keys(track_name, artist, title):
+            similar = self._find_key(key, exclude)
+            if similar is not None and (best is None or similar[1] > best[1]):
+                best = similar
+        return best
+
+    def _find_key(self, key: str, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        number = self._by_key.get(key.replace(' ', ''))
+        if number is not None and self.labels[number] != exclude:
+            return self.labels[number], 1.0
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+
+        ngrams = _ngrams(key)
+        candidates = set()
+        for band_key in _band_keys(ngrams):
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                continue
+            if type(bucket) is list:
+                candidates.update(bucket[:MAX_CANDIDATES - len(candidates)])
+            else:
+                candidates.add(bucket)
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+
+        best = None
+        best_similarity = self.threshold
+        for number in candidates:
+            if self.labels[number] == exclude:
+                continue
+            similarity = _similarity(ngrams, _ngrams(self._keys[number]))
+            if similarity >= best_similarity:
+                best, best_similarity = number, similarity
+        if best is None:
+            return None
+        return self.labels[best], round(best_similarity, 3)
@@ -0,0 +1,215 @@
+"""
+Общий индекс плейлиста all.pls для скриптов RadioTools
+
+Индекс хранит записи плейлиста (номер строки и путь), позволяет искать
+по пути и по нормализованному имени трека. Результат разбора сохраняется
+в файл-спутник в папке кэша; при следующем запуске, если плейлист только
+дописывался, разбирается лишь добавленный хвост.
+"""
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from cache_utils import get_cache_path
+from pls_reader import READ_BUFFER_SIZE, SNIFF_SIZE, decode_line, detect_encoding, \
+    iter_pls_entries, parse_track_line
+from track_names import normalize_track_name, normalize_track_names
+
+SIDECAR_VERSION = 1
+# Сколько байт перед сохраненным смещением сравнивается, чтобы убедиться, что файл только дописывался
+TAIL_CHECK_SIZE = 4096
+
+
+def track_stem(track_path: str) -> str:
+    """Имя файла трека без расширения (для путей с любыми разделителями)"""
+    filename = track_path.replace('\\', '/').rsplit('/', 1)[-1]
+    return os.path.splitext(filename)[0]
+
+
+def _tail_hash(stream, offset: int) -> str:
+    start = max(0, offset - TAIL_CHECK_SIZE)
+    stream.seek(start)
+    return hashlib.sha1(stream.read(offset - start)).hexdigest()
+
+
+class PlaylistIndex:
+    def __init__(self, playlist_file: str, normalize: Optional[Callable[[str], str]] = None,
+                 sidecar_path: Optional[str] = None, persist: bool = True):
+        """
+        Args:
+            playlist_file: Путь к плейлисту
+            normalize: Функция нормализации имени трека (нужна для поиска по имени)
+            sidecar_path: Путь к файлу-спутнику (по умолчанию - в папке кэша)
+            persist: Сохранять ли индекс между запусками
+        """
+        self.playlist_file = playlist_file
+        self.normalize = normalize
+        self.persist = persist
+        self.sidecar_path = sidecar_path or get_cache_path(
+            'playlist_index', os.path.normcase(os.path.abspath(playlist_file)), '.json')
+        self.entries: List[Tuple[int, str]] = []  # (номер строки, путь)
+        self.line_by_path: Dict[str, int] = {}
+        self._by_name: Optional[Dict[str, List[Tuple[int, str]]]] = None
+        self.parsed_from = 0  # С какого смещения разбирался файл в этот раз (0 - полностью)
+        self.loaded = False
+        self._load()
+
+    # --- Загрузка ---
+
+    def _load(self):
+        try:
+            file_stat = os.stat(self.playlist_file)
+        except OSError:
+            return
+        self.loaded = True
+
+        sidecar = self._read_sidecar() if self.persist else None
+        if sidecar and sidecar['size'] == file_stat.st_size and sidecar['offset'] == file_stat.st_size \
+                and sidecar['mtime_ns'] == file_stat.st_mtime_ns:
+            # Плейлист не менялся
+            self._add_entries(sidecar['entries'])
+            return
+
+        state = None
+        if sidecar and sidecar['encoding'] and file_stat.st_size >= sidecar['offset']:
+            with open(self.playlist_file, 'rb') as stream:
+                if _tail_hash(stream, sidecar['offset']) == sidecar['tail_hash']:
+                    # Файл только дописывался - разбираем добавленный хвост
+                    self._add_entries(sidecar['entries'])
+                    state = self._parse(sidecar['offset'], sidecar['next_line'], sidecar['encoding'])
+
+        if state is None:
+            self.entries = []
+            self.line_by_path = {}
+            state = self._parse(0, 1, None)
+
+        if self.persist:
+            self._write_sidecar(file_stat, state)
+
+    def _parse(self, start_offset: int, start_line: int, encoding: Optional[str]) -> dict:
+        """
+        Разбирает плейлист с указанного смещения
+
+        Returns:
+            Состояние для файла-спутника: смещение и номер строки после последней
+            полной строки, число записей до этого места и кодировка
+        """
+        self.parsed_from = start_offset
+        with open(self.playlist_file, 'rb', buffering=READ_BUFFER_SIZE) as stream:
+            if encoding is None:
+                encoding = detect_encoding(stream.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+
+            if encoding.startswith('utf-16'):
+                # Для UTF-16 дочитывание хвоста не поддерживается - всегда полный разбор
+                self._add_entries((entry.line_number, entry.path)
+                                  for entry in iter_pls_entries(self.playlist_file))
+                return {'offset': 0, 'next_line': 1, 'count': 0, 'encoding': None, 'tail_hash': ''}
+
+            stream.seek(start_offset)
+            offset = start_offset
+            line_number = start_line
+            state = {'offset': offset, 'next_line': line_number,
+                     'count': len(self.entries), 'encoding': encoding}
+
+            for raw_line in stream:
+                line = decode_line(raw_line.rstrip(b'\r\n'), encoding)
+                if line_number == 1 and line.startswith('\ufeff'):
+                    line = line[1:]
+                track_path = parse_track_line(line)
+                if track_path:
+                    self._add_entries(((line_number, track_path),))
+                offset += len(raw_line)
+                line_number += 1
+                if raw_line.endswith(b'\n'):
+                    # Незаконченная последняя строка (файл дописывается) будет разобрана повторно
+                    state.update(offset=offset, next_line=line_number, count=len(self.entries))
+
+            state['tail_hash'] = _tail_hash(stream, state['offset'])
+        return state
+
+    def _add_entries(self, entries):
+        for line_number, track_path in entries:
+            self.entries.append((line_number, track_path))
+            self.line_by_path.setdefault(track_path, line_number)
+            if self._by_name is not None:
+                self._by_name.setdefault(self._name_of(track_path), []).append((line_number, track_path))
+
+    # --- Файл-спутник ---
+
+    def _read_sidecar(self) -> Optional[dict]:
+        try:
+            with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+            if sidecar.get('version') != SIDECAR_VERSION:
+                return None
+            return sidecar
+        except (OSError, ValueError):
+            return None
+
+    def _write_sidecar(self, file_stat, state: dict):
+        sidecar = {
+            'version': SIDECAR_VERSION,
+            'size': file_stat.st_size,
+            'mtime_ns': file_stat.st_mtime_ns,
+            'offset': state['offset'],
+            'next_line': state['next_line'],
+            'encoding': state['encoding'],
+            'tail_hash': state['tail_hash'],
+            'entries': self.entries[:state['count']],
+        }
+        temp_path = self.sidecar_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.sidecar_path)
+        except OSError as e:
+            print(f"Не удалось сохранить индекс плейлиста: {e}")
+
+    @staticmethod
+    def invalidate(playlist_file: str):
+        """Удаляет сохраненный индекс плейлиста (после полной перезаписи файла)"""
+        sidecar_path = get_cache_path(
+            'playlist_index', os.path.normcase(os.path.abspath(playlist_file)), '.json')
+        try:
+            os.remove(sidecar_path)
+        except OSError:
+            pass
+
+    # --- Поиск ---
+
+    def _name_of(self, track_path: str) -> str:
+        return self.normalize(track_stem(track_path))
+
+    @property
+    def paths(self) -> List[str]:
+        """Пути треков в порядке плейлиста"""
+        return [track_path for _, track_path in self.entries]
+
+    @property
+    def by_name(self) -> Dict[str, List[Tuple[int, str]]]:
+        """Нормализованное имя -> записи плейлиста (номер строки, путь)"""
+        if self._by_name is None:
+            if self.normalize is None:
+                raise ValueError("Для поиска по имени нужна функция нормализации")
+            stems = [track_stem(track_path) for _, track_path in self.entries]
+            if self.normalize is normalize_track_name:
+                # Общий нормализатор - все имена одним пакетом
+                names = normalize_track_names(stems)
+            else:
+                names = [self.normalize(stem) for stem in stems]
+            self._by_name = {}
+            for name, entry in zip(names, self.entries):
+                self._by_name.setdefault(name, []).append(entry)
+        return self._by_name
+
+    def names(self) -> Set[str]:
+        """Множество нормализованных имен треков плейлиста"""
+        return set(self.by_name)
+
+    def line_of(self, track_path: str) -> Optional[int]:
+        """Номер строки первой записи с указанным путем"""
+        return self.line_by_path.get(track_path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,103 @@
+"""
+Запись плейлистов формата track=путь?;
+
+Новые записи добавляются пачкой: одна запись в файл и один fsync.
+Полная перезапись выполняется через временный файл в той же папке,
+который затем атомарно подменяет плейлист, поэтому радио никогда
+не читает наполовину записанный плейлист.
+"""
+import os
+import shutil
+import tempfile
+from typing import Iterable
+
+from playlist_index import PlaylistIndex
+
+ENCODING = 'utf-8'
+
+
+def format_entry(track_path: str) -> str:
+    """Формирует строку плейлиста: track=путь?;"""
+    track_path = str(track_path)
+    # Путь уже может заканчиваться на ?
+    if track_path.endswith('?'):
+        return f"track={track_path};\n"
+    return f"track={track_path}?;\n"
+
+
+def _fsync_directory(directory: str):
+    """Сохраняет на диск запись каталога после переименования (только POSIX)"""
+    if os.name != 'posix':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def append_entries(playlist_file: str, tracks: Iterable[str]) -> int:
+    """
+    Дописывает треки в конец плейлиста одной записью
+
+    Args:
+        playlist_file: Путь к плейлисту (создается, если не существует)
+        tracks: Пути треков
+
+    Returns:
+        Количество добавленных записей
+    """
+    lines = [format_entry(track) for track in tracks]
+    if not lines:
+        return 0
+    data = ''.join(lines).encode(ENCODING)
+
+    with open(playlist_file, 'a+b') as f:
+        # Если последняя строка не завершена, новая запись не должна к ней приклеиться
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) not in (b'\n', b'\r'):
+                data = b'\n' + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(lines)
+
+
+def rewrite_playlist(playlist_file: str, tracks: Iterable[str]) -> int:
+    """
+    Полностью перезаписывает плейлист через временный файл и атомарное переименование
+
+    Returns:
+        Количество записанных записей
+    """
+    lines = [format_entry(track) for track in tracks]
+    directory = os.path.dirname(os.path.abspath(playlist_file))
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(playlist_file)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(''.join(lines).encode(ENCODING))
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(playlist_file):
+            # Временный файл создается с правами 0600 - возвращаем права исходного плейлиста
+            shutil.copymode(playlist_file, temp_path)
+        os.replace(temp_path, playlist_file)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    _fsync_directory(directory)
+    # Сохраненный индекс больше не соответствует файлу
+    PlaylistIndex.invalidate(playlist_file)
+    return len(lines)
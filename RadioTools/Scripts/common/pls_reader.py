@@ -0,0 +1,132 @@
+"""
+Потоковое чтение плейлистов формата track=путь?;
+
+Кодировка определяется один раз по BOM или первым байтам файла, после чего
+файл читается построчно через буфер, а записи выдаются по мере чтения.
+"""
+import codecs
+import io
+from typing import IO, Iterator, NamedTuple, Optional
+
+READ_BUFFER_SIZE = 1024 * 1024
+SNIFF_SIZE = 64 * 1024
+
+
+class PlaylistEntry(NamedTuple):
+    line_number: int  # Номер строки в файле (с 1)
+    path: Optional[str]  # Путь к треку без track= и ?; (None для строк без трека)
+    line: str  # Исходная строка без перевода строки
+    offset: int  # Смещение начала строки в байтах (для UTF-16 - 0)
+
+
+def detect_encoding(head: bytes) -> str:
+    """
+    Определяет кодировку плейлиста по BOM или первым байтам
+
+    Returns:
+        'utf-8-sig', 'utf-16', 'utf-16-le', 'utf-16-be', 'utf-8' или 'cp1251'
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    sample = head[:SNIFF_SIZE]
+    if sample and b'\x00' in sample:
+        # UTF-16 без BOM: нулевые байты в четных или нечетных позициях
+        even_zeros = sample[0::2].count(0)
+        odd_zeros = sample[1::2].count(0)
+        return 'utf-16-be' if even_zeros > odd_zeros else 'utf-16-le'
+
+    try:
+        # Незавершенная последовательность в конце образца не считается ошибкой
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1251'
+
+
+def parse_track_line(line: str) -> Optional[str]:
+    """
+    Извлекает путь из строки плейлиста
+    Поддерживаются форматы: track=путь?; track=путь; track=путь?
+    """
+    line = line.strip()
+    if not line.lower().startswith('track='):
+        return None
+
+    track_part = line[6:]  # Пропускаем "track="
+
+    # Убираем вопросительный знак и точку с запятой в конце
+    if track_part.endswith('?;'):
+        track_path = track_part[:-2]
+    elif track_part.endswith(';'):
+        track_path = track_part[:-1]
+    elif track_part.endswith('?'):
+        track_path = track_part[:-1]
+    else:
+        track_path = track_part
+
+    track_path = track_path.strip()
+    return track_path or None
+
+
+def decode_line(raw_line: bytes, encoding: str) -> str:
+    """Декодирует строку плейлиста в определенной для файла кодировке"""
+    if encoding in ('utf-8', 'utf-8-sig'):
+        try:
+            return raw_line.decode('utf-8')
+        except UnicodeDecodeError:
+            # Отдельные строки в другой кодировке (плейлист дописывался разными программами)
+            return raw_line.decode('cp1251', errors='replace')
+    return raw_line.decode(encoding, errors='replace')
+
+
+def iter_lines(stream: IO[bytes], encoding: str, start_offset: int = 0,
+               start_line: int = 1) -> Iterator[PlaylistEntry]:
+    """
+    Перебирает строки двоичного потока (кроме UTF-16) начиная с указанного смещения
+
+    Выдает PlaylistEntry для каждой строки; path равен None для строк без трека.
+    """
+    offset = start_offset
+    line_number = start_line
+    for raw_line in stream:
+        line = decode_line(raw_line.rstrip(b'\r\n'), encoding)
+        if line_number == 1 and line.startswith('\ufeff'):
+            line = line[1:]
+        yield PlaylistEntry(line_number, parse_track_line(line), line, offset)
+        offset += len(raw_line)
+        line_number += 1
+
+
+def iter_pls_entries(pls_path, start_offset: int = 0, start_line: int = 1) -> Iterator[PlaylistEntry]:
+    """
+    Лениво перебирает записи треков плейлиста за один проход
+
+    Args:
+        pls_path: Путь к плейлисту
+        start_offset: Смещение (в байтах), с которого начинать чтение
+        start_line: Номер строки, соответствующий смещению
+
+    Yields:
+        PlaylistEntry только для строк с треками
+    """
+    with open(pls_path, 'rb', buffering=READ_BUFFER_SIZE) as stream:
+        encoding = detect_encoding(stream.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+
+        if encoding.startswith('utf-16'):
+            # Построчное чтение UTF-16 возможно только через текстовый поток
+            text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline=None)
+            for line_number, line in enumerate(text, 1):
+                line = line.rstrip('\r\n')
+                track_path = parse_track_line(line)
+                if track_path:
+                    yield PlaylistEntry(line_number, track_path, line, 0)
+            return
+
+        if start_offset:
+            stream.seek(start_offset)
+        for entry in iter_lines(stream, encoding, start_offset, start_line):
+            if entry.path:
+                yield entry
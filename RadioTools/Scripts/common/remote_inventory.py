@@ -0,0 +1,269 @@
+"""
+Получение списка файлов на сервере (манифест) для удаленного копирования
+
+Основной способ - одна команда find на сервере через SSH exec, вывод
+которой разбирается по мере поступления. Если выполнение команд на сервере
+запрещено, используется параллельный обход папок через несколько SFTP-каналов.
+"""
+import posixpath
+import queue
+import shlex
+import socket
+import stat
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+FIND_CHUNK_SIZE = 65536
+# Сколько секунд ждать данных от find; без ответа за это время find считается недоступным
+# (например, при ForceCommand internal-sftp вместо find запускается sftp-server)
+FIND_TIMEOUT = 30
+
+
+class RemoteInventory:
+    def __init__(self, root: str, source: str):
+        self.root = root
+        self.source = source  # 'find' или 'sftp'
+        self.files: List[Tuple[str, int, int]] = []  # (путь, размер, время изменения)
+        self.dirs: Set[str] = set()
+        self.errors: List[str] = []
+
+    @property
+    def complete(self) -> bool:
+        """Все папки прочитаны; по неполному списку искать дубликаты нельзя"""
+        return not self.errors
+
+    def audio_files(self, extensions: Iterable[str]) -> List[Tuple[str, int, int]]:
+        """Возвращает только аудиофайлы с указанными расширениями"""
+        extensions = {ext.lower() for ext in extensions}
+        return [entry for entry in self.files
+                if posixpath.splitext(entry[0])[1].lower() in extensions]
+
+
+def _scan_via_find(transport, root: str) -> Optional[RemoteInventory]:
+    """Получает манифест одной командой find (None, если команда недоступна)"""
+    # -H: если корневая папка - символическая ссылка, обходится папка, на которую она указывает
+    command = (
+        f"find -H {shlex.quote(root)} "
+        r"\( -type d -printf 'd\t%T@\t0\t%p\0' \) -o "
+        r"\( -type f -printf 'f\t%T@\t%s\t%p\0' \)"
+    )
+
+    try:
+        channel = transport.open_session()
+        channel.settimeout(FIND_TIMEOUT)
+        channel.exec_command(command)
+        # find не читает ввод; закрытие ввода завершает программы, которые его ждут
+        channel.shutdown_write()
+    except Exception:
+        return None
+
+    inventory = RemoteInventory(root, 'find')
+    stderr = []
+
+    def drain_stderr():
+        # stderr читается отдельно, чтобы сервер не остановился на заполненном окне канала
+        while True:
+            try:
+                data = channel.recv_stderr(FIND_CHUNK_SIZE)
+            except (socket.timeout, OSError):
+                break
+            if not data:
+                break
+            stderr.append(data)
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    pending = b''
+    try:
+        while True:
+            chunk = channel.recv(FIND_CHUNK_SIZE)
+            if not chunk:
+                break
+            records = (pending + chunk).split(b'\0')
+            pending = records.pop()
+            for record in records:
+                _add_find_record(inventory, record)
+
+        deadline = time.monotonic() + FIND_TIMEOUT
+        while not channel.exit_status_ready():
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(0.05)
+        exit_status = channel.recv_exit_status()
+        stderr_thread.join(timeout=5)
+    except socket.timeout:
+        return None
+    finally:
+        channel.close()
+
+    if exit_status != 0:
+        message = b''.join(stderr).decode('utf-8', errors='replace').strip()
+        if not inventory.files and not inventory.dirs:
+            # find отсутствует или не поддерживает -printf
+            return None
+        inventory.errors.extend(line for line in message.splitlines() if line)
+
+    if root not in inventory.dirs:
+        # Корень не найден как папка - пустой список означал бы, что на сервере нет ни одного трека
+        return None
+
+    return inventory
+
+
+def _add_find_record(inventory: RemoteInventory, record: bytes):
+    """Разбирает одну запись вывода find: тип, время, размер, путь"""
+    try:
+        kind, mtime, size, path = record.decode('utf-8', errors='replace').split('\t', 3)
+    except ValueError:
+        return
+    if kind == 'd':
+        inventory.dirs.add(path)
+    else:
+        inventory.files.append((path, int(size), int(float(mtime))))
+
+
+def _scan_via_sftp(transport, root: str, workers: int) -> RemoteInventory:
+    """Параллельный обход папок через несколько SFTP-каналов"""
+    inventory = RemoteInventory(root, 'sftp')
+    directories = queue.Queue()
+    lock = threading.Lock()
+
+    # Каналы открываются заранее: сервер ограничивает их число (MaxSessions),
+    # и папки из очереди должны забирать только потоки, у которых канал есть
+    channels = []
+    for _ in range(max(1, workers)):
+        try:
+            channels.append(transport.open_sftp_client())
+        except Exception as e:
+            if not channels:
+                inventory.errors.append(f"Не удалось открыть SFTP-канал: {e}")
+            break
+    if not channels:
+        return inventory
+
+    def worker(sftp):
+        while True:
+            current_path = directories.get()
+            if current_path is None:
+                directories.task_done()
+                break
+            try:
+                entries = sftp.listdir_attr(current_path)
+            except Exception as e:
+                with lock:
+                    inventory.errors.append(f"{current_path}: {e}")
+                directories.task_done()
+                continue
+
+            files = []
+            for entry in entries:
+                full_path = posixpath.join(current_path, entry.filename)
+                if stat.S_ISDIR(entry.st_mode):
+                    with lock:
+                        inventory.dirs.add(full_path)
+                    directories.put(full_path)
+                else:
+                    files.append((full_path, entry.st_size or 0, entry.st_mtime or 0))
+            with lock:
+                inventory.files.extend(files)
+            directories.task_done()
+
+        sftp.close()
+
+    inventory.dirs.add(root)
+    directories.put(root)
+    threads = [threading.Thread(target=worker, args=(sftp,), daemon=True) for sftp in channels]
+    for thread in threads:
+        thread.start()
+
+    directories.join()
+    for _ in threads:
+        directories.put(None)
+    for thread in threads:
+        thread.join()
+
+    return inventory
+
+
+def scan_remote_inventory(transport, root: str, workers: int = 8,
+                          use_find: bool = True) -> RemoteInventory:
+    """
+    Получает список файлов и папок на сервере
+
+    Args:
+        transport: Открытый paramiko.Transport
+        root: Корневая папка на сервере
+        workers: Количество SFTP-каналов для обхода папок (если find недоступен)
+        use_find: Пытаться получить манифест командой find
+
+    Returns:
+        RemoteInventory со списком файлов, папок и ошибок чтения
+        (при ошибках список неполный, см. RemoteInventory.complete)
+    """
+    root = root.replace('\\', '/').rstrip('/') or '/'
+
+    if use_find:
+        inventory = _scan_via_find(transport, root)
+        if inventory is not None:
+            return inventory
+        print("Выполнение команд на сервере недоступно, используется обход папок через SFTP")
+
+    return _scan_via_sftp(transport, root, workers)
+
+
+def build_track_map(files: Iterable[Tuple[str, int, int]], normalize) -> Dict[str, str]:
+    """Строит словарь: нормализованное имя -> имя файла"""
+    tracks = {}
+    for path, _, _ in files:
+        filename = posixpath.basename(path)
+        tracks[normalize(posixpath.splitext(filename)[0])] = filename
+    return tracks
+
+
+class RemoteDirCache:
+    """Кэш известных папок на сервере на время сеанса копирования"""
+
+    def __init__(self, dirs: Iterable[str] = ()):
+        self.dirs = {posixpath.normpath(path) for path in dirs}
+
+    def __contains__(self, path: str) -> bool:
+        return posixpath.normpath(path) in self.dirs
+
+    def add(self, path: str):
+        self.dirs.add(posixpath.normpath(path))
+
+    def missing(self, paths: Iterable[str]) -> List[str]:
+        """Возвращает отсутствующие папки (включая родительские) в порядке создания"""
+        missing = set()
+        for path in paths:
+            current = posixpath.normpath(path)
+            while current not in self.dirs and current not in missing and current not in ('/', '.', ''):
+                missing.add(current)
+                current = posixpath.dirname(current)
+        return sorted(missing, key=lambda item: (item.count('/'), item))
+
+    def create_missing(self, sftp, paths: Iterable[str]) -> Tuple[int, List[str]]:
+        """
+        Создает на сервере все отсутствующие папки одним проходом
+
+        Returns:
+            Количество созданных папок и список ошибок
+        """
+        created = 0
+        errors = []
+        for path in self.missing(paths):
+            try:
+                sftp.mkdir(path)
+                created += 1
+            except IOError as e:
+                # Папка могла появиться после получения списка файлов
+                try:
+                    if not stat.S_ISDIR(sftp.stat(path).st_mode):
+                        raise IOError(f"{path} не является папкой")
+                except IOError:
+                    errors.append(f"{path}: {e}")
+                    continue
+            self.dirs.add(path)
+        return created, errors
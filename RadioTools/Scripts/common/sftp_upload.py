@@ -0,0 +1,276 @@
+"""
+Параллельная загрузка файлов по SFTP через несколько каналов одного соединения
+
+Каждый рабочий поток открывает собственный SFTP-канал поверх общего
+paramiko.Transport. Задания поступают через ограниченную очередь, поэтому
+основной поток не уходит далеко вперед от загрузки.
+
+Файл сначала записывается под временным именем .part, при повторе докачивается
+с уже записанного смещения, проверяется (размер или SHA-256) и только затем
+атомарно переименовывается в итоговое имя. В имя .part входят размер и время
+изменения локального файла: докачивается только часть того же самого файла.
+"""
+import hashlib
+import os
+import posixpath
+import queue
+import shlex
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+
+CHUNK_SIZE = 256 * 1024
+# Сколько секунд ждать ответа sha256sum; без ответа проверка по хэшу считается недоступной
+HASH_TIMEOUT = 60
+
+
+def part_path_for(remote_path: str, display_name: str, file_stat: os.stat_result) -> str:
+    """
+    Временное имя загрузки рядом с итоговым файлом
+
+    Имя не зависит от префикса даты, чтобы докачка работала и в следующем запуске,
+    но включает размер и время изменения локального файла: оставшийся .part
+    другого файла с тем же именем не будет дописан.
+    """
+    fingerprint = f"{file_stat.st_size:x}-{int(file_stat.st_mtime):x}"
+    return posixpath.join(posixpath.dirname(remote_path), f".{display_name}.{fingerprint}.part")
+
+
+class UploadJob:
+    def __init__(self, local_path: str, remote_path: str, display_name: str, context=None,
+                 part_path: Optional[str] = None):
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.display_name = display_name
+        self.context = context  # Произвольные данные вызывающего кода
+        self.part_path = part_path  # По умолчанию задается при загрузке (part_path_for)
+        self.size = 0
+        self.sent = 0  # Фактически переданные байты (без докачанной ранее части)
+        self.resumed_from = 0
+        self.attempts = 0
+        self.error = None
+
+
+class SftpUploadPool:
+    def __init__(self, transport, channels: int = 4, queue_size: int = 16,
+                 retries: int = 3, retry_delay: float = 1.0, verify: str = 'size',
+                 prepare: Optional[Callable] = None,
+                 on_done: Optional[Callable[[UploadJob], None]] = None):
+        """
+        Args:
+            transport: Открытый paramiko.Transport
+            channels: Количество параллельных SFTP-каналов
+            queue_size: Максимальное число заданий в очереди
+            retries: Количество повторов загрузки одного файла при ошибке
+            retry_delay: Базовая пауза между повторами (секунды)
+            verify: Проверка загруженного файла: 'size' или 'hash' (SHA-256 на сервере)
+            prepare: Функция prepare(sftp, job), вызываемая перед загрузкой
+            on_done: Функция on_done(job), вызываемая после завершения задания
+                     (job.error равен None при успехе)
+        """
+        self.transport = transport
+        self.channels = max(1, channels)
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.verify = verify
+        self.prepare = prepare
+        self.on_done = on_done
+        self.jobs = queue.Queue(maxsize=max(1, queue_size))
+        self.lock = threading.Lock()
+        self.threads = []
+        self.completed: List[UploadJob] = []
+        self.failed: List[UploadJob] = []
+        self.bytes_sent = 0
+        self.resumed_count = 0
+        self.hash_unavailable = False
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """Запускает рабочие потоки"""
+        self.started_at = time.monotonic()
+        for _ in range(self.channels):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, job: UploadJob):
+        """Ставит задание в очередь (блокируется, если очередь заполнена)"""
+        self.jobs.put(job)
+
+    def join(self):
+        """Дожидается завершения всех заданий и останавливает потоки"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Суммарная скорость загрузки (байт в секунду)"""
+        elapsed = self.elapsed
+        return self.bytes_sent / elapsed if elapsed > 0 else 0.0
+
+    def _open_channel(self):
+        return self.transport.open_sftp_client()
+
+    def _upload(self, sftp, job: UploadJob):
+        """Загружает файл во временный .part с докачкой, проверяет и переименовывает"""
+        file_stat = os.stat(job.local_path)
+        job.size = file_stat.st_size
+        if job.part_path is None:
+            job.part_path = part_path_for(job.remote_path, job.display_name, file_stat)
+
+        try:
+            offset = sftp.stat(job.part_path).st_size or 0
+        except IOError:
+            offset = 0
+        if offset > job.size:
+            offset = 0
+        if offset and not job.resumed_from:
+            job.resumed_from = offset
+
+        with open(job.local_path, 'rb') as local_file:
+            with sftp.open(job.part_path, 'r+b' if offset else 'wb') as remote_file:
+                remote_file.set_pipelined(True)
+                if offset:
+                    remote_file.seek(offset)
+                    local_file.seek(offset)
+                while True:
+                    block = local_file.read(CHUNK_SIZE)
+                    if not block:
+                        break
+                    remote_file.write(block)
+                    job.sent += len(block)
+                    with self.lock:
+                        self.bytes_sent += len(block)
+
+        self._verify(sftp, job)
+
+        try:
+            sftp.posix_rename(job.part_path, job.remote_path)
+        except IOError:
+            # Сервер без расширения posix-rename
+            sftp.rename(job.part_path, job.remote_path)
+
+    def _verify(self, sftp, job: UploadJob):
+        """Проверяет загруженный .part; при несовпадении удаляет его, чтобы повтор начался заново"""
+        remote_size = sftp.stat(job.part_path).st_size
+        problem = None
+        if remote_size != job.size:
+            problem = f"размер на сервере {remote_size} вместо {job.size}"
+        elif self.verify == 'hash':
+            remote_hash = self._remote_sha256(job.part_path)
+            if remote_hash is not None and remote_hash != _local_sha256(job.local_path):
+                problem = "контрольная сумма не совпадает"
+
+        if problem:
+            try:
+                sftp.remove(job.part_path)
+            except IOError:
+                pass
+            raise IOError(f"Ошибка проверки {job.display_name}: {problem}")
+
+    def _remote_sha256(self, path: str) -> Optional[str]:
+        """Вычисляет SHA-256 файла на сервере (None, если команды на сервере недоступны)"""
+        if self.hash_unavailable:
+            return None
+        try:
+            channel = self.transport.open_session()
+            try:
+                channel.settimeout(HASH_TIMEOUT)
+                channel.exec_command(f"sha256sum {shlex.quote(path)}")
+                # sha256sum не читает ввод; закрытие ввода завершает программы, которые его ждут
+                channel.shutdown_write()
+                output = b''
+                while True:
+                    data = channel.recv(4096)
+                    if not data:
+                        break
+                    output += data
+                deadline = time.monotonic() + HASH_TIMEOUT
+                while not channel.exit_status_ready():
+                    if time.monotonic() > deadline:
+                        raise socket.timeout()
+                    time.sleep(0.05)
+                exit_status = channel.recv_exit_status()
+            except socket.timeout:
+                raise IOError(f"нет ответа sha256sum за {HASH_TIMEOUT} с")
+            finally:
+                channel.close()
+            if exit_status != 0 or not output:
+                raise IOError("sha256sum недоступен")
+            return output.split()[0].decode('ascii').lower()
+        except Exception as e:
+            with self.lock:
+                if not self.hash_unavailable:
+                    self.hash_unavailable = True
+                    print(f"\nПроверка контрольной суммы на сервере недоступна ({e}), проверяется только размер")
+            return None
+
+    def _worker(self):
+        sftp = None
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+
+                while True:
+                    job.attempts += 1
+                    try:
+                        if sftp is None:
+                            sftp = self._open_channel()
+                        if self.prepare:
+                            self.prepare(sftp, job)
+                        self._upload(sftp, job)
+                        job.error = None
+                        break
+                    except Exception as e:
+                        job.error = e
+                        # Канал мог быть закрыт сервером - открываем новый при повторе
+                        if sftp is not None:
+                            try:
+                                sftp.close()
+                            except Exception:
+                                pass
+                            sftp = None
+                        if job.attempts > self.retries or not self.transport.is_active():
+                            break
+                        time.sleep(self.retry_delay * job.attempts)
+
+                with self.lock:
+                    if job.error is None:
+                        self.completed.append(job)
+                        if job.resumed_from:
+                            self.resumed_count += 1
+                    else:
+                        self.failed.append(job)
+                    if self.on_done:
+                        try:
+                            self.on_done(job)
+                        except Exception as e:
+                            print(f"\nОшибка обработки результата {job.display_name}: {e}")
+        finally:
+            if sftp is not None:
+                sftp.close()
+
+
+def _local_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
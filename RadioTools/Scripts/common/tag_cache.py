@@ -0,0 +1,116 @@
+"""
+Постоянный кэш тегов аудиофайлов (исполнитель и название)
+
+Теги сохраняются в SQLite по ключу путь + размер + время изменения.
+Для неизменных файлов повторные запуски (и другие скрипты, читающие теги
+той же библиотеки) не открывают файл через taglib.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from cache_utils import get_cache_path
+from track_names import normalize_track_names
+
+# Через сколько новых записей изменения сохраняются на диск (чтобы пережить прерванный запуск)
+COMMIT_EVERY = 100
+
+
+def file_key(path: str) -> str:
+    """Ключ кэша для файла (абсолютный путь без учета регистра в Windows)"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class TagCache:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_cache_path('tag_cache', 'tags', '.sqlite')
+        self.conn = sqlite3.connect(self.db_path)
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tags ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, artist TEXT, title TEXT)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def stat(path: str) -> Optional[Tuple[int, int]]:
+        """Размер и время изменения файла (None, если файл недоступен)"""
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[Tuple[str, str]]:
+        """Возвращает (исполнитель, название), если файл не менялся с момента записи в кэш"""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, artist, title FROM tags WHERE path = ?", (file_key(path),)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[2], row[3]
+
+    def tags_by_name(self, root: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Теги файлов папки root из кэша по нормализованному имени файла (normalize_track_name)
+
+        Файлы на диске не проверяются: теги могут быть устаревшими, поэтому годятся
+        только для подсказок (поиск похожих треков).
+        """
+        prefix = os.path.join(file_key(root), '')
+        rows = [(Path(path).stem, artist, title) for path, artist, title in self.conn.execute(
+            "SELECT path, artist, title FROM tags WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))]
+        tags = {}
+        for normalized_name, (_, artist, title) in zip(normalize_track_names(row[0] for row in rows), rows):
+            tags.setdefault(normalized_name, (artist, title))
+        return tags
+
+    def put(self, path: str, size: int, mtime_ns: int, artist: str, title: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tags (path, size, mtime_ns, artist, title) VALUES (?, ?, ?, ?, ?)",
+            (file_key(path), size, mtime_ns, artist, title))
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def evict_unseen(self, root: str, seen_paths: Iterable[str]) -> int:
+        """
+        Удаляет записи файлов папки root, не найденных при ее полном сканировании
+
+        Файлы на диске не проверяются, записи вне root не затрагиваются.
+        Пустой результат сканирования (например, диск не подключен) ничего не удаляет.
+
+        Args:
+            root: Просканированная папка
+            seen_paths: Все файлы, найденные в root при сканировании
+
+        Returns:
+            Количество удаленных записей
+        """
+        seen = {file_key(path) for path in seen_paths}
+        if not seen:
+            return 0
+        prefix = os.path.join(file_key(root), '')
+        unseen = [(path,) for (path,) in self.conn.execute(
+            "SELECT path FROM tags WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+            if path not in seen]
+        if unseen:
+            with self.conn:
+                self.conn.executemany("DELETE FROM tags WHERE path = ?", unseen)
+        return len(unseen)
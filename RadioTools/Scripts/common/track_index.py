@@ -0,0 +1,151 @@
+"""
+Постоянный инкрементальный индекс аудиофайлов папки (SQLite)
+
+Индекс хранит для каждого файла путь, размер, время изменения и
+нормализованное имя трека. При обновлении повторно читаются только те
+папки, у которых изменилось время модификации, остальные берутся из базы.
+"""
+import os
+import sqlite3
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from audio_scan import list_audio_directory, normalize_extensions
+from cache_utils import get_cache_path
+
+INDEX_VERSION = 1
+
+
+class TrackIndex:
+    def __init__(self, root: str, normalize: Callable[[str], str],
+                 extensions: Iterable[str], db_path: Optional[str] = None,
+                 normalizer_version: str = ''):
+        """
+        Args:
+            root: Корневая папка библиотеки
+            normalize: Функция нормализации имени трека (по имени без расширения)
+            extensions: Расширения аудиофайлов (в нижнем регистре, с точкой)
+            db_path: Путь к файлу базы (по умолчанию - в папке кэша)
+            normalizer_version: Версия нормализатора; при смене индекс перестраивается
+        """
+        self.root = os.path.abspath(root)
+        self.normalize = normalize
+        self.extensions = normalize_extensions(extensions)
+        self.db_path = db_path or get_cache_path(
+            'track_index', os.path.normcase(self.root), '.sqlite')
+        self.signature = f"{INDEX_VERSION}|{normalizer_version}|{','.join(sorted(self.extensions))}"
+        self.conn = sqlite3.connect(self.db_path)
+        self._init_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _init_schema(self):
+        """Создает таблицы и сбрасывает индекс при несовпадении версии"""
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, dir TEXT, name TEXT, "
+                "size INTEGER, mtime_ns INTEGER, normalized TEXT)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS files_dir ON files(dir)")
+
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            if row is None or row[0] != self.signature:
+                self.conn.execute("DELETE FROM dirs")
+                self.conn.execute("DELETE FROM files")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)",
+                    (self.signature,))
+
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """
+        Обновляет индекс, перечитывая только измененные папки
+
+        Args:
+            full: Перечитать все папки независимо от времени изменения
+
+        Returns:
+            Статистика: сколько папок проверено, перечитано и удалено
+        """
+        known_dirs = {}
+        children = {}
+        for path, parent, mtime_ns in self.conn.execute("SELECT path, parent, mtime_ns FROM dirs"):
+            known_dirs[path] = mtime_ns
+            children.setdefault(parent, []).append(path)
+
+        stats = {'dirs_checked': 0, 'dirs_listed': 0, 'dirs_removed': 0}
+        seen_dirs = set()
+        stack = [(self.root, None)]
+
+        with self.conn:
+            while stack:
+                current_dir, parent = stack.pop()
+                try:
+                    dir_mtime = os.stat(current_dir).st_mtime_ns
+                except OSError:
+                    continue
+
+                seen_dirs.add(current_dir)
+                stats['dirs_checked'] += 1
+
+                if not full and known_dirs.get(current_dir) == dir_mtime:
+                    # Содержимое папки не менялось - берем подпапки из индекса
+                    stack.extend((child, current_dir) for child in children.get(current_dir, ()))
+                    continue
+
+                stats['dirs_listed'] += 1
+                listing = self._list_directory(current_dir)
+                if listing is None:
+                    # Папку не удалось прочитать - оставляем прежние данные
+                    stack.extend((child, current_dir) for child in children.get(current_dir, ()))
+                    continue
+
+                subdirs, files = listing
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (current_dir,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, dir, name, size, mtime_ns, normalized) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", files)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                    (current_dir, parent, dir_mtime))
+                stack.extend((subdir, current_dir) for subdir in subdirs)
+
+            # Удаляем папки, которых больше нет (вместе с их файлами)
+            removed = [(path,) for path in known_dirs if path not in seen_dirs]
+            if removed:
+                self.conn.executemany("DELETE FROM files WHERE dir = ?", removed)
+                self.conn.executemany("DELETE FROM dirs WHERE path = ?", removed)
+            stats['dirs_removed'] = len(removed)
+
+        return stats
+
+    def _list_directory(self, directory: str) -> Optional[Tuple[list, list]]:
+        """Читает содержимое папки: подпапки и строки для таблицы files (None при ошибке)"""
+        try:
+            subdirs, audio_files = list_audio_directory(directory, self.extensions)
+        except OSError as e:
+            print(f"Ошибка чтения папки {directory}: {e}")
+            return None
+        files = [(audio_file.path, directory, audio_file.name, audio_file.size,
+                  audio_file.mtime_ns, self.normalize(audio_file.stem)) for audio_file in audio_files]
+        return subdirs, files
+
+    def get_tracks(self) -> Dict[str, str]:
+        """Возвращает словарь: нормализованное имя -> имя файла"""
+        return {normalized: name for normalized, name in
+                self.conn.execute("SELECT normalized, name FROM files")}
+
+    def iter_files(self) -> Iterator[Tuple[str, int, int]]:
+        """Перебирает файлы индекса: (путь, размер, время изменения в нс)"""
+        yield from self.conn.execute("SELECT path, size, mtime_ns FROM files")
@@ -0,0 +1,88 @@
+"""
+Нормализация имен треков для поиска дубликатов (общая для всех скриптов)
+
+Имя трека (без расширения) приводится к виду для сравнения:
+  - в начале удаляются префиксы даты, которые добавляет CopyAudio и радио:
+    2025-12-24_18-05_, 2025-12-24_8-05_, 2025-12-24_ и "2025-12-24 "
+    (несколько префиксов подряд удаляются все);
+  - пробелы по краям удаляются, повторяющиеся пробелы заменяются одним;
+  - имя приводится к нижнему регистру.
+Если после удаления префикса имя пустое, нормализуется имя целиком.
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+# Версия правил нормализации: при изменении правил индексы, хранящие
+# нормализованные имена (track_index.TrackIndex), перестраиваются
+NORMALIZER_VERSION = '2'
+
+# Префиксы даты одним шаблоном: 2025-12-24, затем необязательное время _18-05
+# и разделитель _ или пробелы; несколько префиксов подряд
+DATE_PREFIX_PATTERN = re.compile(r'(?:\d{4}-\d{2}-\d{2}(?:_\d{1,2}-\d{2})?(?:_|\s+)\s*)+')
+
+# Запоминаются результаты для стольких последних имен
+CACHE_SIZE = 65536
+
+
+def _collapse(text: str) -> str:
+    return ' '.join(text.split()).lower()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_track_name(track_name: str) -> str:
+    """
+    Нормализует имя трека (результаты запоминаются)
+
+    Args:
+        track_name: Имя файла трека без расширения
+
+    Returns:
+        Нормализованное имя
+    """
+    match = DATE_PREFIX_PATTERN.match(track_name)
+    if match:
+        normalized = _collapse(track_name[match.end():])
+        if normalized:
+            return normalized
+    return _collapse(track_name)
+
+
+def normalize_track_names(track_names: Iterable[str]) -> List[str]:
+    """
+    Нормализует список имен за один проход
+
+    Регистр меняется сразу для всех имен (одним вызовом lower для
+    объединенного текста), шаблон даты применяется только к именам,
+    начинающимся с цифры. Результат совпадает с normalize_track_name
+    для каждого имени, но кэш не используется и не заполняется.
+
+    Args:
+        track_names: Имена файлов треков без расширения
+
+    Returns:
+        Нормализованные имена в том же порядке
+    """
+    names = list(track_names)
+    if not names:
+        return []
+    text = '\n'.join(names)
+    if text.count('\n') != len(names) - 1:
+        # В именах есть переводы строк - объединять нельзя
+        return [normalize_track_name(name) for name in names]
+
+    match_prefix = DATE_PREFIX_PATTERN.match
+    result = []
+    append = result.append
+    # Нижний регистр не добавляет и не убирает цифры и пробельные символы,
+    # поэтому префикс можно искать и пробелы сжимать уже после lower
+    for line in text.lower().split('\n'):
+        if line[:1].isdigit():
+            match = match_prefix(line)
+            if match:
+                normalized = ' '.join(line[match.end():].split())
+                if normalized:
+                    append(normalized)
+                    continue
+        append(' '.join(line.split()))
+    return result